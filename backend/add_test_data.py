@@ -1,154 +1,200 @@
 """
 Скрипт для добавления тестовых данных в БД
+
+Данные вставляются пачками через app/services/bulk_loader.py - тем же
+загрузчиком, что и POST /api/documents/bulk. С параметром
+--synthetic-documents N дополнительно генерируется N синтетических документов
+(например, для проверки производительности на больших объемах):
+
+    python add_test_data.py --synthetic-documents 500000
 """
-from app.core.database import SessionLocal, engine, Base
+import argparse
+import asyncio
+import hashlib
+import random
+
+from sqlalchemy import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.core.migrations import upgrade_database
 from app.models.user import User
 from app.models.folder import Folder
 from app.models.document import Document
-from datetime import datetime
-import hashlib
+from app.services import bulk_loader
+
+# Слова для синтетических документов
+WORDS = (
+    "договор поставка отчет квартал бюджет проект согласование приказ служебная записка "
+    "сотрудник руководитель отдел закупка счет оплата акт выполненных работ план график "
+    "контрагент претензия регламент инструкция протокол совещания решение срок исполнения"
+).split()
+STATUSES = ["draft", "under_review", "approved", "rejected"]
+
+
+def test_users() -> list:
+    return [
+        {
+            "email": "admin@vaultdoc.ru",
+            "password_hash": hashlib.sha256(b"admin123").hexdigest(),
+            "full_name": "Администратор Системы",
+            "role": "admin",
+            "is_active": True
+        },
+        {
+            "email": "manager@vaultdoc.ru",
+            "password_hash": hashlib.sha256(b"manager123").hexdigest(),
+            "full_name": "Петров Петр Иванович",
+            "role": "manager",
+            "is_active": True
+        },
+        {
+            "email": "employee@vaultdoc.ru",
+            "password_hash": hashlib.sha256(b"employee123").hexdigest(),
+            "full_name": "Сидорова Анна Михайловна",
+            "role": "employee",
+            "is_active": True
+        }
+    ]
+
+
+def synthetic_content(rng: random.Random) -> str:
+    """Текст документа с правдоподобным распределением размера (от сотен байт до сотен КБ)"""
+    words = max(5, min(int(rng.lognormvariate(5.5, 1.2)), 50000))
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def synthetic_documents(count: int, owner_ids: list, folder_ids: list, seed: int = 42):
+    """Поток записей (номер, dict) для загрузчика - без накопления в памяти"""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        yield i, {
+            "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} №{i}",
+            "content": synthetic_content(rng),
+            "folder_id": rng.choice(folder_ids) if folder_ids and rng.random() < 0.9 else None,
+            "owner_id": rng.choice(owner_ids),
+            "status": rng.choice(STATUSES)
+        }
+
+
+async def records(rows: list):
+    for i, row in enumerate(rows, start=1):
+        yield i, row
+
+
+async def add_test_data(db):
+    print("Добавляем тестовых пользователей...")
+    users_table = User.__table__
+    inserted = await bulk_loader.insert_many(
+        db, users_table, test_users(), returning=[users_table.c.id, users_table.c.email]
+    )
+    # id берем из RETURNING, без повторных запросов по email
+    user_ids = {email: user_id for user_id, email in inserted}
+    admin = user_ids["admin@vaultdoc.ru"]
+    manager = user_ids["manager@vaultdoc.ru"]
+    employee = user_ids["employee@vaultdoc.ru"]
+
+    print("Добавляем тестовые папки...")
+    folder_ids = await bulk_loader.insert_folder_tree(db, [
+        {"name": "Общие документы", "owner_id": admin, "parent_index": None},
+        {"name": "Отчеты", "owner_id": admin, "parent_index": None},
+        {"name": "Проекты", "owner_id": manager, "parent_index": None},
+        {"name": "2024", "owner_id": admin, "parent_index": 1}  # Подпапка "Отчеты"
+    ])
+    general, reports, projects, reports_2024 = folder_ids
+    await db.commit()
+
+    print("Добавляем тестовые документы...")
+    documents = [
+        {
+            "title": "Добро пожаловать в VaultDoc!",
+            "content": "Это система управления документами компании. Здесь вы можете создавать, редактировать и совместно работать над документами.",
+            "folder_id": general,
+            "owner_id": admin,
+            "status": "approved"
+        },
+        {
+            "title": "Правила работы с документами",
+            "content": "1. Все важные документы должны быть утверждены руководителем.\n2. Не удаляйте документы без согласования.\n3. Используйте комментарии для обсуждения изменений.",
+            "folder_id": general,
+            "owner_id": admin,
+            "status": "approved"
+        },
+        {
+            "title": "Отчет за январь 2024",
+            "content": "В январе мы выполнили все поставленные задачи. Прибыль составила 1.2 млн рублей.",
+            "folder_id": reports_2024,
+            "owner_id": manager,
+            "status": "under_review"
+        },
+        {
+            "title": "План работ на февраль",
+            "content": "Основные задачи на февраль:\n1. Запуск нового проекта\n2. Обновление оборудования\n3. Обучение сотрудников",
+            "folder_id": projects,
+            "owner_id": employee,
+            "status": "draft"
+        },
+        {
+            "title": "Мои заметки",
+            "content": "Не забыть:\n- Подготовить презентацию\n- Созвон с клиентом в 15:00\n- Отправить отчет бухгалтерии",
+            "folder_id": None,  # Без папки
+            "owner_id": employee,
+            "status": "draft"
+        }
+    ]
+    report = await bulk_loader.load_documents(db, records(documents))
+
+    print(f"✅ Добавлено: {len(user_ids)} пользователей, {len(folder_ids)} папок, {report.inserted} документов")
+    print("👤 Пользователи:")
+    for user in (await db.execute(select(User))).scalars():
+        print(f"  - {user.email} ({user.role})")
+
+    print("\n📁 Папки:")
+    result = await db.execute(select(Folder.name, User.full_name).outerjoin(User, User.id == Folder.owner_id))
+    for name, owner_name in result:
+        print(f"  - {name} (владелец: {owner_name or '?'})")
+
+
+async def add_synthetic_documents(db, count: int):
+    print(f"Генерируем {count} синтетических документов...")
+    owner_ids = (await db.execute(select(User.id))).scalars().all()
+    folder_ids = (await db.execute(select(Folder.id))).scalars().all()
+    report = await bulk_loader.load_documents(
+        db, synthetic_documents(count, owner_ids, folder_ids)
+    )
+    print(f"✅ Загружено синтетических документов: {report.inserted} (способ: {report.method}, ошибок: {report.failed})")
+
+
+async def main(synthetic_count: int):
+    # Создаем/обновляем схему БД
+    upgrade_database()
+
+    async with AsyncSessionLocal() as db:
+        try:
+            # Проверяем, есть ли уже пользователи
+            user_count = await db.scalar(select(func.count()).select_from(User))
+
+            if user_count == 0:
+                await add_test_data(db)
+            else:
+                print(f"ℹ️ В БД уже есть {user_count} пользователей")
+
+            if synthetic_count:
+                await add_synthetic_documents(db, synthetic_count)
+                print(f"📄 Всего документов: {await db.scalar(select(func.count()).select_from(Document))}")
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Ошибка: {e}")
+            import traceback
+            traceback.print_exc()
+
 
-# Создаем таблицы
-Base.metadata.create_all(bind=engine)
-
-db = SessionLocal()
-
-try:
-    # Проверяем, есть ли уже пользователи
-    user_count = db.query(User).count()
-    
-    if user_count == 0:
-        print("Добавляем тестовых пользователей...")
-        
-        # Создаем тестовых пользователей
-        users = [
-            User(
-                email="admin@vaultdoc.ru",
-                password_hash=hashlib.sha256(b"admin123").hexdigest(),
-                full_name="Администратор Системы",
-                role="admin",
-                is_active=True
-            ),
-            User(
-                email="manager@vaultdoc.ru",
-                password_hash=hashlib.sha256(b"manager123").hexdigest(),
-                full_name="Петров Петр Иванович",
-                role="manager",
-                is_active=True
-            ),
-            User(
-                email="employee@vaultdoc.ru",
-                password_hash=hashlib.sha256(b"employee123").hexdigest(),
-                full_name="Сидорова Анна Михайловна",
-                role="employee",
-                is_active=True
-            )
-        ]
-        
-        for user in users:
-            db.add(user)
-        
-        db.commit()
-        
-        # Получаем ID созданных пользователей
-        admin = db.query(User).filter(User.email == "admin@vaultdoc.ru").first()
-        manager = db.query(User).filter(User.email == "manager@vaultdoc.ru").first()
-        employee = db.query(User).filter(User.email == "employee@vaultdoc.ru").first()
-        
-        print("Добавляем тестовые папки...")
-        
-        # Создаем тестовые папки
-        folders = [
-            Folder(
-                name="Общие документы",
-                owner_id=admin.id,
-                parent_id=None
-            ),
-            Folder(
-                name="Отчеты",
-                owner_id=admin.id,
-                parent_id=None
-            ),
-            Folder(
-                name="Проекты",
-                owner_id=manager.id,
-                parent_id=None
-            ),
-            Folder(
-                name="2024",
-                owner_id=admin.id,
-                parent_id=2  # Подпапка "Отчеты"
-            )
-        ]
-        
-        for folder in folders:
-            db.add(folder)
-        
-        db.commit()
-        
-        print("Добавляем тестовые документы...")
-        
-        # Создаем тестовые документы
-        documents = [
-            Document(
-                title="Добро пожаловать в VaultDoc!",
-                content="Это система управления документами компании. Здесь вы можете создавать, редактировать и совместно работать над документами.",
-                folder_id=1,  # Общие документы
-                owner_id=admin.id,
-                status="approved"
-            ),
-            Document(
-                title="Правила работы с документами",
-                content="1. Все важные документы должны быть утверждены руководителем.\n2. Не удаляйте документы без согласования.\n3. Используйте комментарии для обсуждения изменений.",
-                folder_id=1,  # Общие документы
-                owner_id=admin.id,
-                status="approved"
-            ),
-            Document(
-                title="Отчет за январь 2024",
-                content="В январе мы выполнили все поставленные задачи. Прибыль составила 1.2 млн рублей.",
-                folder_id=4,  # 2024 (в папке Отчеты)
-                owner_id=manager.id,
-                status="under_review"
-            ),
-            Document(
-                title="План работ на февраль",
-                content="Основные задачи на февраль:\n1. Запуск нового проекта\n2. Обновление оборудования\n3. Обучение сотрудников",
-                folder_id=3,  # Проекты
-                owner_id=employee.id,
-                status="draft"
-            ),
-            Document(
-                title="Мои заметки",
-                content="Не забыть:\n- Подготовить презентацию\n- Созвон с клиентом в 15:00\n- Отправить отчет бухгалтерии",
-                folder_id=None,  # Без папки
-                owner_id=employee.id,
-                status="draft"
-            )
-        ]
-        
-        for document in documents:
-            db.add(document)
-        
-        db.commit()
-        
-        print(f"✅ Добавлено: {len(users)} пользователей, {len(folders)} папок, {len(documents)} документов")
-        print("👤 Пользователи:")
-        for user in db.query(User).all():
-            print(f"  - {user.email} ({user.role})")
-        
-        print("\n📁 Папки:")
-        for folder in db.query(Folder).all():
-            owner = db.query(User).filter(User.id == folder.owner_id).first()
-            print(f"  - {folder.name} (владелец: {owner.full_name if owner else '?'})")
-            
-    else:
-        print(f"ℹ️ В БД уже есть {user_count} пользователей")
-        
-except Exception as e:
-    db.rollback()
-    print(f"❌ Ошибка: {e}")
-    import traceback
-    traceback.print_exc()
-finally:
-    db.close()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заполнение БД VaultDoc тестовыми данными")
+    parser.add_argument(
+        "--synthetic-documents",
+        type=int,
+        default=0,
+        help="Сколько синтетических документов сгенерировать дополнительно"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.synthetic_documents))
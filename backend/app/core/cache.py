@@ -0,0 +1,106 @@
+"""
+Ограниченный кэш в памяти процесса с вытеснением LRU и временем жизни записей
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Маркер отсутствия значения (None тоже может быть закэширован)
+MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш с ограничением по количеству записей и времени жизни (TTL)
+
+    Кэш локален для процесса: в многопроцессном запуске каждый воркер держит
+    свою копию, поэтому TTL ограничивает время, в течение которого воркер может
+    не увидеть изменение, сделанное другим воркером.
+
+    Каждое удаление увеличивает счетчик поколений. Код, заполняющий кэш из
+    БД, берет generation() до чтения и передает его в set: если ключ был
+    удален после этого, значение могло быть прочитано до изменения и не
+    записывается.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Поколение последнего удаления по ключу и последней массовой очистки
+        self._clock = 0
+        self._invalidated: Dict[Hashable, int] = {}
+        self._cleared = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        """Текущее поколение: передается в set после чтения значения из источника"""
+        with self._lock:
+            return self._clock
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and max(self._invalidated.get(key, 0), self._cleared) > generation:
+                # Ключ удален после чтения значения - оно может быть устаревшим
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _invalidate_all(self):
+        self._clock += 1
+        self._cleared = self._clock
+        self._invalidated.clear()
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self._clock += 1
+            self._invalidated[key] = self._clock
+            if len(self._invalidated) > self.max_entries:
+                # Журнал удалений ограничен как и сам кэш: считаем удаленным все
+                self._invalidate_all()
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]):
+        """Удалить все записи, ключ которых удовлетворяет условию"""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+            # Условие не применить к ключам, которых нет в кэше
+            self._invalidate_all()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._invalidate_all()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
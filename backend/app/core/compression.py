@@ -0,0 +1,182 @@
+"""
+Сжатие ответов с выбором кодировки по Accept-Encoding (br или gzip)
+
+Работает как ASGI-middleware и поддерживает потоковые ответы: каждый блок
+тела сжимается и сразу отправляется (с flush), поэтому NDJSON-выгрузка
+остается потоковой. Ответ меньше minimum_size отдается без сжатия.
+
+Не сжимаются:
+- ответы, уже имеющие Content-Encoding;
+- ответы на Range-запросы и с Accept-Ranges (диапазоны считаются по
+  несжатому представлению);
+- заведомо сжатые форматы (gzip, zip, изображения и т.п.);
+- 204/304 и ответы на HEAD;
+- поток событий text/event-stream (блок сжатия ждал бы minimum_size байт,
+  а событие должно уйти клиенту сразу).
+
+brotli - необязательная зависимость: без пакета brotli используется gzip.
+"""
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli не установлен
+    brotli = None
+
+# Типы содержимого, которые повторно не сжимаем
+INCOMPRESSIBLE_TYPES = (
+    "application/gzip",
+    "application/zip",
+    "application/octet-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Выбрать br или gzip по Accept-Encoding с учетом q-значений"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    best_q = 0.0
+    for name in candidates:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 - формат gzip
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None or "range" in headers:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, send: Send, encoding: str):
+        self.middleware = middleware
+        self.downstream = send
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        # None - решение еще не принято; True/False - сжимаем/передаем как есть
+        self.compress: Optional[bool] = None
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self.compressor: Optional[_Compressor] = None
+
+    def _eligible(self) -> bool:
+        status = self.start["status"]
+        headers = Headers(raw=self.start["headers"])
+        content_type = headers.get("content-type", "").lower()
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or "content-range" in headers or "accept-ranges" in headers:
+            return False
+        if content_type.startswith("text/event-stream"):
+            return False
+        return not content_type.startswith(INCOMPRESSIBLE_TYPES)
+
+    async def _send_start(self, compressed: bool):
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if compressed:
+            headers["Content-Encoding"] = self.encoding
+            del headers["Content-Length"]
+        await self.downstream(self.start)
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            if not self._eligible():
+                self.compress = False
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.compress is False:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compress is None:
+            # Копим начало ответа, пока не станет ясно, превышен ли порог
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if self.pending_size < self.middleware.minimum_size and more_body:
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+            if self.pending_size < self.middleware.minimum_size:
+                self.compress = False
+                await self._send_start(compressed=False)
+                await self.downstream({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            self.compress = True
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            await self._send_start(compressed=True)
+
+        await self.downstream({
+            "type": "http.response.body",
+            "body": self.compressor.compress(body, final=not more_body),
+            "more_body": more_body,
+        })
+
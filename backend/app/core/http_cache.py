@@ -0,0 +1,78 @@
+"""
+Условные GET-запросы (ETag / If-None-Match) и кэш ответов для чтения отдельных сущностей
+
+ETag строится из версии сущности и updated_at (а для документа - еще из версий
+связанных владельца и папки, чьи имена входят в ответ). Проверка ETag без кэша
+стоит одного запроса по первичному ключу без загрузки содержимого документа.
+
+Кэш ответов ограничен по количеству записей (LRU) и времени жизни (TTL); его
+сбрасывают эндпоинты, изменяющие данные, после COMMIT. Ответ, прочитанный
+из БД до такого сброса, в кэш не записывается (поколения TTLCache). В многопроцессном запуске изменения,
+сделанные другим воркером, становятся видны не позже чем через RESPONSE_CACHE_TTL.
+"""
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Response
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+response_cache = TTLCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+)
+
+
+def make_etag(kind: str, *parts) -> str:
+    """Сильный ETag из значений, определяющих представление сущности"""
+    raw = ":".join(
+        part.isoformat() if isinstance(part, datetime) else str(part) for part in (kind,) + parts
+    )
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверить заголовок If-None-Match (список ETag через запятую или *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Для If-None-Match используется слабое сравнение (RFC 9110, 13.1.2)
+    return etag in {value[2:] if value.startswith("W/") else value for value in candidates}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Клиент может хранить ответ, но обязан перепроверять его через If-None-Match
+    response.headers["Cache-Control"] = "no-cache"
+
+
+# ============ КЛЮЧИ И ИНВАЛИДАЦИЯ ============
+
+def document_key(document_id: int) -> tuple:
+    return ("document", document_id)
+
+
+def user_key(user_id: int) -> tuple:
+    return ("user", user_id)
+
+
+def invalidate_document(document_id: int):
+    response_cache.delete(document_key(document_id))
+
+
+def invalidate_user(user_id: int):
+    response_cache.delete(user_key(user_id))
+    # Имя и роль владельца входят в ответ по документу
+    invalidate_all_documents()
+
+
+def invalidate_all_documents():
+    response_cache.delete_where(lambda key: key[0] == "document")
@@ -0,0 +1,149 @@
+"""
+Учет SQL-запросов в рамках HTTP-запроса: число запросов, время БД и бюджеты
+
+События движка SQLAlchemy (before/after_cursor_execute) считают запросы и
+время их выполнения для текущего HTTP-запроса (contextvars). Middleware
+добавляет к ответу заголовок Server-Timing:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=3.1, total;dur=15.5
+
+app - время вне БД (Python, сериализация). Для потоковых ответов заголовок
+отражает запросы, выполненные до начала отправки тела; бюджет проверяется
+по завершении ответа с учетом всех запросов.
+
+Если маршрут выполнил больше запросов, чем его бюджет (QUERY_BUDGET или
+значение из декоратора query_budget), в лог пишется предупреждение, а при
+QUERY_BUDGET_STRICT=True выбрасывается QueryBudgetExceeded - в тестах через
+TestClient это приводит к падению теста.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Атрибут эндпоинта с индивидуальным бюджетом (см. query_budget)
+BUDGET_ATTRIBUTE = "__query_budget__"
+UNLIMITED = object()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Маршрут выполнил больше SQL-запросов, чем позволяет бюджет"""
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "started")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        db = self.db_seconds * 1000
+        return (
+            f'db;dur={db:.1f};desc="{self.queries} queries", '
+            f"app;dur={max(total - db, 0.0):.1f}, total;dur={total:.1f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Статистика текущего HTTP-запроса (None вне запроса)"""
+    return _current.get()
+
+
+def query_budget(limit: Optional[int]) -> Callable:
+    """Задать эндпоинту собственный бюджет запросов; None - без ограничения
+
+    Применяется под декоратором маршрута:
+
+        @app.post("/api/documents/bulk")
+        @query_budget(None)
+        async def bulk_import_documents(...): ...
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        setattr(endpoint, BUDGET_ATTRIBUTE, UNLIMITED if limit is None else limit)
+        return endpoint
+    return decorator
+
+
+# ============ СОБЫТИЯ ДВИЖКА ============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.db_seconds += time.perf_counter() - started.pop()
+    stats.queries += 1
+
+
+def instrument_engine(target: Engine):
+    """Подключить учет запросов к синхронному движку (для async - engine.sync_engine)"""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+# ============ MIDDLEWARE ============
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, app: ASGIApp, default_budget: int = 0, strict: bool = False):
+        self.app = app
+        # 0 - бюджет по умолчанию не проверяется
+        self.default_budget = default_budget
+        self.strict = strict
+
+    def _budget(self, scope: Scope) -> Optional[int]:
+        budget = getattr(scope.get("endpoint"), BUDGET_ATTRIBUTE, None)
+        if budget is UNLIMITED:
+            return None
+        if budget is None:
+            budget = self.default_budget
+        return budget or None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+        budget = self._budget(scope)
+        if budget is not None and stats.queries > budget:
+            route = getattr(scope.get("route"), "path", scope["path"])
+            message = (
+                f"{scope['method']} {route}: выполнено {stats.queries} SQL-запросов "
+                f"при бюджете {budget}"
+            )
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,158 @@
+"""
+Метрики Prometheus: HTTP-запросы по маршрутам, пул соединений, длительность SQL
+
+Маршрут в метках - шаблон пути ("/api/documents/{document_id}"), а не
+фактический URL, чтобы число временных рядов не зависело от данных.
+
+Несколько процессов-воркеров: если задана переменная окружения
+PROMETHEUS_MULTIPROC_DIR (ее выставляет run.py до импорта приложения),
+prometheus_client пишет значения каждого процесса в общие mmap-файлы этого
+каталога, а /metrics собирает их через MultiProcessCollector - ответ
+одинаков, какой бы воркер его ни отдал. Каталог очищается при старте сервера.
+
+Накладные расходы на запрос - несколько увеличений счетчиков без блокировок
+между процессами и без обращений к БД.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+UNMATCHED_ROUTE = "<unmatched>"
+
+# ============ ОПРЕДЕЛЕНИЯ МЕТРИК ============
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Число обработанных HTTP-запросов",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса (до отправки последнего блока тела)",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Число HTTP-запросов в обработке",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Размер тела ответа в байтах (после сжатия)",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Соединения пула, выданные запросам",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Постоянный размер пула соединений (без overflow)",
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения SQL-запроса",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+)
+
+
+def render_metrics() -> bytes:
+    """Текст метрик в формате Prometheus (всех воркеров в многопроцессном режиме)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+# ============ ПУЛ СОЕДИНЕНИЙ И SQL ============
+
+def _operation(statement: str) -> str:
+    # Первое слово запроса: SELECT, INSERT, UPDATE, DELETE, ...
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_query_started")
+    if started:
+        DB_QUERY_DURATION.labels(_operation(statement)).observe(time.perf_counter() - started.pop())
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_engine(target: Engine):
+    """Подключить метрики SQL и пула к синхронному движку (для async - engine.sync_engine)"""
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target.pool, "checkout", _on_checkout)
+    event.listen(target.pool, "checkin", _on_checkin)
+    if hasattr(target.pool, "size"):
+        DB_POOL_SIZE.set(target.pool.size())
+
+
+# ============ MIDDLEWARE ============
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
@@ -0,0 +1,53 @@
+"""
+Применение миграций схемы БД (Alembic) из кода и командной строки
+
+Схема БД задается только миграциями (каталог migrations/). Приложение при
+импорте DDL не выполняет: миграции применяются отдельным шагом до запуска
+воркеров:
+
+    python -m app.core.migrations        # то же, что alembic upgrade head
+
+БД, созданная до появления миграций (docker/init.sql, Base.metadata.create_all),
+сначала помечается базовой ревизией 0001 (таблицы docker/init.sql), а
+добавленное позже достраивает ревизия 0002.
+"""
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+# Ревизия, соответствующая схеме до появления миграций
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(database_url: Optional[str] = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["database_url"] = database_url or settings.DATABASE_URL
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(database_url: Optional[str] = None, revision: str = "head"):
+    """Применить миграции до revision (по умолчанию - последней)"""
+    config = alembic_config(database_url)
+    engine = create_engine(config.attributes["database_url"], poolclass=NullPool)
+    try:
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+    if "alembic_version" not in tables and "documents" in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    upgrade_database()
+    print("✅ Схема БД обновлена до последней миграции")
@@ -0,0 +1,68 @@
+"""
+Курсорная (keyset) пагинация
+
+Курсор - непрозрачная для клиента строка (base64 от JSON), в которой
+хранится ключ сортировки и значения этого ключа у последней строки
+страницы. Следующая страница выбирается условием "строго после курсора",
+поэтому стоимость запроса не зависит от глубины страницы (в отличие от OFFSET).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+# Поддерживаемые ключи сортировки для курсорного режима
+CURSOR_SORT_KEYS = ("id", "updated_at")
+# Наибольший размер страницы в курсорном режиме
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursorError(ValueError):
+    """Курсор поврежден или не соответствует текущему запросу"""
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Упаковать значения ключа сортировки в непрозрачный курсор"""
+    payload = {
+        "s": sort,
+        "v": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """Распаковать курсор и проверить, что он выдан для той же сортировки"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort = payload["s"]
+        values = payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Некорректный курсор")
+
+    if cursor_sort != sort:
+        raise InvalidCursorError(
+            f"Курсор выдан для сортировки '{cursor_sort}', а запрошена '{sort}'"
+        )
+
+    if sort == "id":
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise InvalidCursorError("Некорректный курсор")
+        return values
+
+    if len(values) != 2 or not isinstance(values[1], int):
+        raise InvalidCursorError("Некорректный курсор")
+    try:
+        return [datetime.fromisoformat(values[0]), values[1]]
+    except (TypeError, ValueError):
+        raise InvalidCursorError("Некорректный курсор")
+
+
+def next_cursor_for(sort: str, last_row: Optional[Any]) -> Optional[str]:
+    """Построить курсор следующей страницы по последней строке текущей"""
+    if last_row is None:
+        return None
+    if sort == "id":
+        return encode_cursor(sort, [last_row.id])
+    return encode_cursor(sort, [last_row.updated_at, last_row.id])
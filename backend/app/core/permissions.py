@@ -0,0 +1,250 @@
+"""
+Вычисление эффективных прав пользователя на документ
+
+Права (таблица permissions) выдаются на документ или на папку. Права на папку
+наследуются всеми вложенными папками и документами. Итоговые права для пары
+(пользователь, документ) определяются так:
+- неактивный пользователь не имеет прав;
+- администратор и владелец документа имеют все права;
+- иначе действует самое близкое явное право: право на сам документ, затем на
+  его папку, затем на родительскую папку и т.д. вверх по parent_id;
+- если явных прав нет - доступа нет.
+
+Все данные для решения читаются одним запросом с рекурсивным CTE по цепочке
+папок. Результат кэшируется в памяти процесса и ограничен по времени жизни
+(settings.PERMISSIONS_CACHE_TTL) для изменений из других процессов.
+
+Кэш сбрасывается при изменении прав, папок, документов и пользователей через
+ORM дважды: сразу при flush и еще раз после COMMIT. Между ними параллельный
+запрос еще видит старые данные и мог бы снова закэшировать их до истечения
+TTL. Массовые вставки мимо ORM (bulk_loader.insert_many) вызывают
+invalidate_on_commit. Отсутствие документа или пользователя не кэшируется:
+иначе только что вставленная строка оставалась бы невидимой до истечения TTL.
+"""
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import event, inspect, literal, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.models.document import Document
+from app.models.folder import Folder
+from app.models.permission import Permission
+from app.models.user import User
+
+# Ограничение глубины обхода папок (защита от циклов в parent_id)
+MAX_FOLDER_DEPTH = 64
+
+ACTIONS = ("can_view", "can_edit", "can_delete", "can_manage_access")
+
+# Таблицы, от которых зависят эффективные права
+SOURCE_TABLES = ("users", "folders", "documents", "permissions")
+
+# Ключ session.info: сбросы кэша, которые нужно повторить после COMMIT
+_PENDING = "permissions.pending_invalidations"
+
+
+@dataclass(frozen=True)
+class EffectivePermissions:
+    can_view: bool = False
+    can_edit: bool = False
+    can_delete: bool = False
+    can_manage_access: bool = False
+    # Откуда взяты права: admin, owner, document, folder:<id>, none
+    source: str = "none"
+
+    def allows(self, action: str) -> bool:
+        return bool(getattr(self, action))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+FULL_ACCESS = dict(can_view=True, can_edit=True, can_delete=True, can_manage_access=True)
+NO_ACCESS = EffectivePermissions()
+
+# Кэш (user_id, document_id) -> EffectivePermissions
+permission_cache = TTLCache(
+    max_entries=settings.PERMISSIONS_CACHE_MAX_ENTRIES,
+    ttl=settings.PERMISSIONS_CACHE_TTL,
+)
+
+
+def _resolution_query(user_id: int, document_id: int):
+    """Один запрос: владелец документа, роль пользователя и все применимые права"""
+    ancestry = (
+        select(Document.folder_id.label("folder_id"), literal(1).label("depth"))
+        .where(Document.id == document_id, Document.folder_id.isnot(None))
+        .cte("ancestry", recursive=True)
+    )
+    ancestry = ancestry.union_all(
+        select(Folder.parent_id, ancestry.c.depth + 1)
+        .join(ancestry, Folder.id == ancestry.c.folder_id)
+        .where(Folder.parent_id.isnot(None), ancestry.c.depth < MAX_FOLDER_DEPTH)
+    )
+
+    grant_columns = [Permission.entity_type, Permission.entity_id] + [
+        getattr(Permission, action) for action in ACTIONS
+    ]
+    grants = union_all(
+        select(*grant_columns, literal(0).label("depth")).where(
+            Permission.user_id == user_id,
+            Permission.entity_type == "document",
+            Permission.entity_id == document_id,
+        ),
+        select(*grant_columns, ancestry.c.depth)
+        .join(ancestry, Permission.entity_id == ancestry.c.folder_id)
+        .where(Permission.user_id == user_id, Permission.entity_type == "folder"),
+    ).subquery("grants")
+
+    return (
+        select(
+            Document.owner_id,
+            User.role,
+            User.is_active,
+            grants.c.entity_type,
+            grants.c.entity_id,
+            grants.c.depth,
+            *[grants.c[action] for action in ACTIONS],
+        )
+        .select_from(Document)
+        .join(User, User.id == user_id)
+        .outerjoin(grants, true())
+        .where(Document.id == document_id)
+    )
+
+
+async def resolve_permissions(
+    db: AsyncSession, user_id: int, document_id: int
+) -> Optional[EffectivePermissions]:
+    """Вычислить права пользователя на документ (None - нет документа или пользователя)"""
+    rows = (await db.execute(_resolution_query(user_id, document_id))).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    if not first.is_active:
+        return NO_ACCESS
+    if first.role == "admin":
+        return EffectivePermissions(**FULL_ACCESS, source="admin")
+    if first.owner_id == user_id:
+        return EffectivePermissions(**FULL_ACCESS, source="owner")
+
+    grants = [row for row in rows if row.entity_type is not None]
+    if not grants:
+        return NO_ACCESS
+    nearest = min(grants, key=lambda row: row.depth)
+    source = "document" if nearest.entity_type == "document" else f"folder:{nearest.entity_id}"
+    return EffectivePermissions(
+        **{action: bool(getattr(nearest, action)) for action in ACTIONS},
+        source=source,
+    )
+
+
+async def get_effective_permissions(
+    db: AsyncSession, user_id: int, document_id: int
+) -> Optional[EffectivePermissions]:
+    """Права пользователя на документ с использованием кэша"""
+    key = (user_id, document_id)
+    cached = permission_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    resolved = await resolve_permissions(db, user_id, document_id)
+    if resolved is not None:
+        permission_cache.set(key, resolved)
+    return resolved
+
+
+async def authorize(db: AsyncSession, user_id: int, document_id: int, action: str) -> bool:
+    """Проверить, может ли пользователь выполнить действие (can_view, can_edit, ...)"""
+    if action not in ACTIONS:
+        raise ValueError(f"Неизвестное действие: {action}")
+    resolved = await get_effective_permissions(db, user_id, document_id)
+    return resolved is not None and resolved.allows(action)
+
+
+# ============ ИНВАЛИДАЦИЯ КЭША ============
+
+def invalidate_user(user_id: int):
+    permission_cache.delete_where(lambda key: key[0] == user_id)
+
+
+def invalidate_document(document_id: int):
+    permission_cache.delete_where(lambda key: key[1] == document_id)
+
+
+def invalidate_all():
+    permission_cache.clear()
+
+
+def _invalidate(session: Optional[Session], invalidate: Callable, *args):
+    """Сбросить записи сейчас и еще раз после COMMIT сессии"""
+    invalidate(*args)
+    if session is not None:
+        session.info.setdefault(_PENDING, []).append((invalidate, args))
+
+
+def invalidate_on_commit(session: Session, table_name: str):
+    """Сбросить кэш после записи в table_name мимо ORM (массовые вставки)"""
+    if table_name in SOURCE_TABLES:
+        _invalidate(session, invalidate_all)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    for invalidate, args in session.info.pop(_PENDING, ()):
+        invalidate(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+def _changed(target, *attributes) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+@event.listens_for(Permission, "after_insert")
+@event.listens_for(Permission, "after_update")
+@event.listens_for(Permission, "after_delete")
+def _on_permission_change(mapper, connection, target):
+    session = object_session(target)
+    _invalidate(session, invalidate_user, target.user_id)
+    # Право могло быть перенесено на другого пользователя
+    history = inspect(target).attrs.user_id.history
+    for old_user_id in history.deleted or ():
+        _invalidate(session, invalidate_user, old_user_id)
+
+
+@event.listens_for(Folder, "after_update")
+def _on_folder_update(mapper, connection, target):
+    # Перенос папки меняет наследование для всего поддерева
+    if _changed(target, "parent_id"):
+        _invalidate(object_session(target), invalidate_all)
+
+
+@event.listens_for(Folder, "after_delete")
+def _on_folder_delete(mapper, connection, target):
+    _invalidate(object_session(target), invalidate_all)
+
+
+@event.listens_for(Document, "after_update")
+def _on_document_update(mapper, connection, target):
+    if _changed(target, "folder_id", "owner_id"):
+        _invalidate(object_session(target), invalidate_document, target.id)
+
+
+@event.listens_for(Document, "after_delete")
+def _on_document_delete(mapper, connection, target):
+    _invalidate(object_session(target), invalidate_document, target.id)
+
+
+@event.listens_for(User, "after_update")
+def _on_user_update(mapper, connection, target):
+    if _changed(target, "role", "is_active"):
+        _invalidate(object_session(target), invalidate_user, target.id)
@@ -0,0 +1,199 @@
+"""
+Чтение с реплик БД: зависимость get_read_db для безопасных GET-эндпоинтов
+
+Если в READ_REPLICA_URLS заданы реплики, get_read_db выдает сессию на одной
+из них (по кругу). Запись всегда идет через get_db на основную БД, поэтому ее
+ресурсы остаются для изменений. Сессия реплики помечена db.info["replica"] = True.
+
+Здоровье реплик:
+- соединение, которое не удалось открыть, выводит реплику из ротации сразу;
+- фоновая проверка (start_monitor) раз в READ_REPLICA_HEALTH_INTERVAL секунд
+  выполняет SELECT 1 и для PostgreSQL сравнивает отставание репликации с
+  READ_REPLICA_MAX_LAG_SECONDS; реплика возвращается в ротацию после успешной
+  проверки. Отставание считается по времени последней примененной транзакции
+  только пока применено не все принятое WAL (pg_last_wal_replay_lsn() меньше
+  pg_last_wal_receive_lsn()); при равных LSN оно нулевое.
+Если здоровых реплик нет, чтение идет с основной БД.
+
+Чтение своих записей: после успешного изменяющего запроса (POST/PUT/PATCH/
+DELETE) ReadYourWritesMiddleware ставит клиенту cookie на
+READ_YOUR_WRITES_SECONDS секунд; пока она действует, его GET-запросы читают
+основную БД и видят собственные изменения, даже если реплика отстает.
+Читающие POST-эндпоинты (пакетное чтение) помечаются декоратором read_only.
+
+Эндпоинты, чьи ответы кэшируются в памяти процесса (документ, пользователь,
+эффективные права), читают основную БД: иначе отстающая реплика могла бы
+заполнить кэш устаревшими данными для всех клиентов.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Callable, List, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine_options, to_async_url
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "vaultdoc_primary_until"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+READ_ONLY_ATTRIBUTE = "__read_only__"
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine: AsyncEngine = create_async_engine(
+            to_async_url(url), **engine_options(url, is_async=True)
+        )
+        self.healthy = True
+
+    def mark_down(self, reason: str):
+        if self.healthy:
+            logger.warning("Реплика %s выведена из ротации: %s", self.name, reason)
+        self.healthy = False
+
+    async def check(self):
+        """SELECT 1 и (для PostgreSQL) проверка отставания репликации"""
+        try:
+            async with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    # Все принятое WAL применено - отставания нет, даже если
+                    # основная БД давно ничего не писала и время последней
+                    # примененной транзакции старое
+                    lag = await conn.scalar(text(
+                        "SELECT CASE "
+                        "WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    ))
+                    if lag > settings.READ_REPLICA_MAX_LAG_SECONDS:
+                        self.mark_down(f"отставание {lag:.1f} с")
+                        return
+                else:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark_down(str(e))
+            return
+        if not self.healthy:
+            logger.info("Реплика %s возвращена в ротацию", self.name)
+        self.healthy = True
+
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._next = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
+
+    def candidates(self) -> List[Replica]:
+        """Здоровые реплики, начиная со следующей по кругу"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    async def check_all(self):
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(settings.READ_REPLICA_HEALTH_INTERVAL)
+            await self.check_all()
+
+    def start_monitor(self):
+        if self.replicas and self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_loop())
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+router = ReplicaRouter(settings.READ_REPLICA_URLS)
+
+
+def read_only(endpoint: Callable) -> Callable:
+    """Пометить эндпоинт с изменяющим методом как только читающий
+
+    Применяется под декоратором маршрута; после такого запроса клиент не
+    переключается на чтение с основной БД.
+    """
+    setattr(endpoint, READ_ONLY_ATTRIBUTE, True)
+    return endpoint
+
+
+def wants_primary(request: Request) -> bool:
+    """Клиент недавно писал - читает основную БД до истечения cookie"""
+    until = request.cookies.get(PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return db.info.get("replica", False)
+
+
+async def _open_replica_connection():
+    for replica in router.candidates():
+        try:
+            return await replica.engine.connect()
+        except Exception as e:
+            replica.mark_down(str(e))
+    return None
+
+
+# Dependency для получения сессии только для чтения (реплика или основная БД)
+async def get_read_db(request: Request):
+    conn = None if wants_primary(request) else await _open_replica_connection()
+    if conn is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    try:
+        async with AsyncSession(bind=conn, autoflush=False, expire_on_commit=False) as db:
+            db.info["replica"] = True
+            yield db
+    finally:
+        await conn.close()
+
+
+class ReadYourWritesMiddleware:
+    """Ставит cookie чтения с основной БД после успешного изменяющего запроса"""
+
+    def __init__(self, app: ASGIApp, window_seconds: int):
+        self.app = app
+        self.window = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if (
+                message["type"] == "http.response.start"
+                and 200 <= message["status"] < 300
+                and not getattr(scope.get("endpoint"), READ_ONLY_ATTRIBUTE, False)
+            ):
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_COOKIE}={time.time() + self.window:.3f}; Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,46 @@
 """
 Главный файл FastAPI приложения VaultDoc со ВСЕМИ эндпоинтами
 """
-from fastapi import FastAPI, Depends, HTTPException
+from typing import List
+from fastapi import Body, FastAPI, Depends, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, undefer
 from datetime import datetime
-from app.core.database import engine, Base, get_db
+from app.core import http_cache, permissions
+from app.core.cache import MISSING
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core import metrics
+from app.core.instrumentation import QueryInstrumentationMiddleware, instrument_engine, query_budget
+from app.core.database import AsyncSessionLocal, async_engine, get_db, ping, pool_status
+from app.core import replicas
+from app.core.replicas import ReadYourWritesMiddleware, get_read_db
+from app.core.pagination import CURSOR_SORT_KEYS, MAX_PAGE_SIZE, InvalidCursorError, decode_cursor, next_cursor_for
 from app.models.user import User
-from app.models.folder import Folder
-from app.models.document import Document
+from app.models.folder import Folder, FolderCycleError
+from app.models.document import Document, make_preview
 from app.models.permission import Permission
 from app.models.comment import DocumentComment
+from app.schemas import (
+    CommentListResponse,
+    DocumentBatchResponse,
+    DocumentListResponse,
+    DocumentResponse,
+    FolderDocumentsResponse,
+    FolderListResponse,
+    PermissionListResponse,
+    SearchResponse,
+    UserBatchResponse,
+    UserListResponse,
+    UserResponse,
+)
+from app.services import bulk_loader, changefeed, comments, content_store, export, search, statistics, versions
 
-# Создаем таблицы в БД
-Base.metadata.create_all(bind=engine)
+# Схема БД создается миграциями (python -m app.core.migrations), а не при импорте приложения
 
 # Создаем экземпляр FastAPI приложения
 app = FastAPI(
@@ -21,7 +48,17 @@ app = FastAPI(
     description="Корпоративный веб-сервис для управления документами - Курсовая работа РТУ МИРЭА",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson вместо стандартного json для всех ответов-словарей
+    default_response_class=ORJSONResponse
+)
+
+# Сжатие ответов (br/gzip по Accept-Encoding) начиная с COMPRESSION_MINIMUM_SIZE байт
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
 )
 
 # Настройка CORS
@@ -33,6 +70,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Число SQL-запросов и время БД в заголовке Server-Timing, контроль бюджета запросов
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    instrument_engine(async_engine.sync_engine)
+    for replica in replicas.router.replicas:
+        instrument_engine(replica.engine.sync_engine)
+    app.add_middleware(
+        QueryInstrumentationMiddleware,
+        default_budget=settings.QUERY_BUDGET,
+        strict=settings.QUERY_BUDGET_STRICT
+    )
+
+# Реплики для чтения: после записи клиент некоторое время читает основную БД
+if replicas.router.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+# Метрики Prometheus по маршрутам, пулу соединений и SQL-запросам
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(async_engine.sync_engine)
+    for replica in replicas.router.replicas:
+        metrics.instrument_engine(replica.engine.sync_engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.on_event("startup")
+async def start_replica_monitor():
+    """Фоновая проверка здоровья реплик для чтения (если они заданы)"""
+    replicas.router.start_monitor()
+
+@app.on_event("startup")
+async def start_change_feed():
+    """Слушатель NOTIFY ленты изменений (PostgreSQL) и очистка старых событий"""
+    changefeed.broker.start()
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    """Закрыть соединения пула при остановке воркера (после завершения начатых запросов)"""
+    await comments.batcher.close()
+    await changefeed.broker.close()
+    await replicas.router.close()
+    await async_engine.dispose()
+
 @app.get("/", tags=["Главная"])
 async def root():
     """Корневая страница API"""
@@ -49,11 +126,14 @@ async def root():
         "endpoints": {
             "documentation": "/docs",
             "health_check": "/health",
+            "health_check_db": "/health/db",
+            "metrics": "/metrics",
             "users_api": "/api/users",
             "folders_api": "/api/folders",
             "documents_api": "/api/documents",
             "permissions_api": "/api/permissions",
-            "statistics": "/api/statistics"
+            "statistics": "/api/statistics",
+            "export": "/api/export/{entity}"
         },
         "version": "1.0.0"
     }
@@ -67,13 +147,42 @@ async def health_check():
         "database": "PostgreSQL (все таблицы созданы)"
     }
 
+@app.get("/health/db", tags=["Система"])
+async def health_check_db():
+    """Проверка здоровья БД: время ответа и состояние пула соединений"""
+    try:
+        latency_ms = await ping(async_engine)
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"База данных недоступна: {str(e)}"
+        )
+    
+    return {
+        "status": "healthy",
+        "service": "VaultDoc API",
+        "database": {
+            "latency_ms": latency_ms,
+            "pool": pool_status(async_engine)
+        }
+    }
+
+@app.get("/metrics", tags=["Система"], include_in_schema=False)
+async def get_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Метрики отключены")
+    # Content-Type задан заголовком: media_type="text/..." Starlette дополнил бы еще одним charset
+    return Response(content=metrics.render_metrics(), headers={"Content-Type": metrics.METRICS_CONTENT_TYPE})
+
 # ============ ПОЛЬЗОВАТЕЛИ ============
 
-@app.get("/api/users", tags=["Пользователи"])
-async def get_users(db: Session = Depends(get_db)):
+@app.get("/api/users", tags=["Пользователи"], response_model=UserListResponse)
+async def get_users(db: AsyncSession = Depends(get_read_db)):
     """Получить список пользователей ИЗ БАЗЫ ДАННЫХ"""
     try:
-        users = db.query(User).all()
+        result = await db.execute(select(User))
+        users = result.scalars().all()
         
         return {
             "status": "success",
@@ -85,7 +194,7 @@ async def get_users(db: Session = Depends(get_db)):
                     "full_name": user.full_name,
                     "role": user.role,
                     "is_active": user.is_active,
-                    "created_at": user.created_at.isoformat() if user.created_at else None
+                    "created_at": user.created_at
                 }
                 for user in users
             ]
@@ -96,11 +205,50 @@ async def get_users(db: Session = Depends(get_db)):
             detail=f"Ошибка при получении пользователей: {str(e)}"
         )
 
-@app.get("/api/users/{user_id}", tags=["Пользователи"])
-async def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Получить пользователя по ID ИЗ БАЗЫ ДАННЫХ"""
+def user_etag(user_id: int, version, updated_at) -> str:
+    return http_cache.make_etag("user", user_id, version, updated_at)
+
+def user_payload(user: User) -> tuple:
+    """ETag и тело ответа GET /api/users/{id} (общие с пакетным чтением и кэшем)"""
+    etag = user_etag(user.id, user.version, user.updated_at)
+    payload = {
+        "status": "success",
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name,
+            "role": user.role,
+            "is_active": user.is_active,
+            "created_at": user.created_at
+        }
+    }
+    return etag, payload
+
+@app.get("/api/users/{user_id}", tags=["Пользователи"], response_model=UserResponse)
+async def get_user(
+    user_id: int,
+    response: Response,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить пользователя по ID ИЗ БАЗЫ ДАННЫХ
+
+    Поддерживает условный запрос: при совпадении If-None-Match с текущим ETag
+    возвращается 304 без тела.
+    """
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        key = http_cache.user_key(user_id)
+        cached = http_cache.response_cache.get(key)
+        if cached is not MISSING:
+            etag, payload = cached
+            if http_cache.etag_matches(if_none_match, etag):
+                return http_cache.not_modified(etag)
+            http_cache.set_etag_headers(response, etag)
+            return payload
+        
+        # Поколение кэша до чтения: изменение после него не даст записать старый ответ
+        generation = http_cache.response_cache.generation()
+        user = await db.get(User, user_id)
         
         if not user:
             raise HTTPException(
@@ -108,17 +256,13 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
                 detail=f"Пользователь с ID {user_id} не найден"
             )
         
-        return {
-            "status": "success",
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "role": user.role,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None
-            }
-        }
+        etag, payload = user_payload(user)
+        if http_cache.etag_matches(if_none_match, etag):
+            return http_cache.not_modified(etag)
+        
+        http_cache.response_cache.set(key, (etag, payload), generation=generation)
+        http_cache.set_etag_headers(response, etag)
+        return payload
     except HTTPException:
         raise
     except Exception as e:
@@ -127,17 +271,73 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
             detail=f"Ошибка при получении пользователя: {str(e)}"
         )
 
+def check_batch_ids(ids: List[int]):
+    if len(ids) > settings.BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {settings.BATCH_GET_MAX_IDS} ID в одном запросе"
+        )
+
+def batch_results(ids: List[int], found: dict, field: str) -> dict:
+    """Ответ пакетного чтения: элементы в порядке ids, found=false для отсутствующих"""
+    return {
+        "status": "success",
+        "count": sum(1 for item_id in ids if item_id in found),
+        "results": [
+            {"id": item_id, "found": item_id in found, field: found.get(item_id)}
+            for item_id in ids
+        ]
+    }
+
+@app.post("/api/users:batchGet", tags=["Пользователи"], response_model=UserBatchResponse)
+@replicas.read_only
+async def batch_get_users(
+    ids: List[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить пользователей по списку ID: {"ids": [...]}
+
+    Вместо запроса GET /api/users/{id} на каждого пользователя - один запрос
+    WHERE id IN (...) для тех, кого нет в кэше ответов. Результаты идут в
+    порядке ids (с повторами), count - число найденных.
+    """
+    check_batch_ids(ids)
+    try:
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(ids):
+            cached = http_cache.response_cache.get(http_cache.user_key(user_id))
+            if cached is MISSING:
+                missing.append(user_id)
+            else:
+                found[user_id] = cached[1]["user"]
+        
+        if missing:
+            generation = http_cache.response_cache.generation()
+            users = (await db.execute(select(User).where(User.id.in_(missing)))).scalars().all()
+            for user in users:
+                etag, payload = user_payload(user)
+                http_cache.response_cache.set(http_cache.user_key(user.id), (etag, payload), generation=generation)
+                found[user.id] = payload["user"]
+        
+        return batch_results(ids, found, "user")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении пользователей: {str(e)}"
+        )
+
 @app.put("/api/users/{user_id}", tags=["Пользователи"])
 async def update_user(
     user_id: int,
     full_name: str = None,
     role: str = None,
     is_active: bool = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить пользователя"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         
         if not user:
             raise HTTPException(
@@ -154,12 +354,21 @@ async def update_user(
                     status_code=400,
                     detail="Некорректная роль. Допустимые значения: admin, manager, accountant, employee"
                 )
+            await statistics.move(db, "users.role", user.role, role)
             user.role = role
         if is_active is not None:
             user.is_active = is_active
         
-        db.commit()
-        db.refresh(user)
+        user.version = (user.version or 0) + 1
+        await changefeed.record(db, "user.updated", user_id=user.id, data={
+            "full_name": user.full_name,
+            "role": user.role,
+            "is_active": user.is_active,
+            "version": user.version
+        })
+        await db.commit()
+        await db.refresh(user)
+        http_cache.invalidate_user(user.id)
         
         return {
             "status": "success",
@@ -175,7 +384,7 @@ async def update_user(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при обновлении пользователя: {str(e)}"
@@ -183,24 +392,26 @@ async def update_user(
 
 # ============ ПАПКИ ============
 
-@app.get("/api/folders", tags=["Папки"])
-async def get_folders(db: Session = Depends(get_db)):
+@app.get("/api/folders", tags=["Папки"], response_model=FolderListResponse)
+async def get_folders(db: AsyncSession = Depends(get_read_db)):
     """Получить список папок ИЗ БАЗЫ ДАННЫХ"""
     try:
-        folders = db.query(Folder).all()
+        # Владельцы подгружаются тем же запросом (JOIN), без запроса на каждую папку
+        result = await db.execute(select(Folder).options(joinedload(Folder.owner)))
+        folders = result.scalars().all()
         
-        # Получаем имена владельцев
         folders_with_owners = []
         for folder in folders:
-            owner = db.query(User).filter(User.id == folder.owner_id).first()
+            owner = folder.owner
             folders_with_owners.append({
                 "id": folder.id,
                 "name": folder.name,
                 "owner_id": folder.owner_id,
                 "owner_name": owner.full_name if owner else "Неизвестно",
                 "parent_id": folder.parent_id,
-                "created_at": folder.created_at.isoformat() if folder.created_at else None,
-                "updated_at": folder.updated_at.isoformat() if folder.updated_at else None
+                "path": folder.path,
+                "created_at": folder.created_at,
+                "updated_at": folder.updated_at
             })
         
         return {
@@ -214,43 +425,342 @@ async def get_folders(db: Session = Depends(get_db)):
             detail=f"Ошибка при получении папок: {str(e)}"
         )
 
+@app.post("/api/folders", tags=["Папки"])
+async def create_folder(
+    name: str,
+    owner_id: int,
+    parent_id: int = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Создать папку (path заполняется автоматически, см. app/models/folder.py)"""
+    try:
+        if await db.get(User, owner_id) is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Пользователь с ID {owner_id} не найден"
+            )
+        if parent_id is not None and await db.get(Folder, parent_id) is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Папка с ID {parent_id} не найдена"
+            )
+        
+        folder = Folder(name=name, owner_id=owner_id, parent_id=parent_id)
+        db.add(folder)
+        await statistics.bump(db, "folders")
+        await db.commit()
+        
+        return {
+            "status": "success",
+            "message": "Папка успешно создана",
+            "folder": {
+                "id": folder.id,
+                "name": folder.name,
+                "owner_id": folder.owner_id,
+                "parent_id": folder.parent_id,
+                "path": folder.path
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при создании папки: {str(e)}"
+        )
+
+@app.put("/api/folders/{folder_id}", tags=["Папки"])
+async def update_folder(
+    folder_id: int,
+    name: str = None,
+    parent_id: int = None,
+    move_to_root: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Переименовать или перенести папку (parent_id - новая родительская папка,
+    move_to_root=true - перенос в корень). Пути всего поддерева обновляются
+    одним запросом."""
+    try:
+        folder = await db.get(Folder, folder_id)
+        
+        if not folder:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Папка с ID {folder_id} не найдена"
+            )
+        
+        if name is not None:
+            folder.name = name
+        if move_to_root:
+            folder.parent_id = None
+        elif parent_id is not None:
+            parent = await db.get(Folder, parent_id)
+            if not parent:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Папка с ID {parent_id} не найдена"
+                )
+            if parent.id == folder.id or (folder.path and (parent.path or "").startswith(folder.path)):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Нельзя перенести папку внутрь ее собственного поддерева"
+                )
+            folder.parent_id = parent_id
+        
+        await changefeed.record(db, "folder.updated", folder_id=folder.id, data={
+            "name": folder.name,
+            "parent_id": folder.parent_id
+        })
+        await db.commit()
+        # Имя папки входит в ответ по документу
+        http_cache.invalidate_all_documents()
+        
+        return {
+            "status": "success",
+            "message": "Папка успешно обновлена",
+            "folder": {
+                "id": folder.id,
+                "name": folder.name,
+                "owner_id": folder.owner_id,
+                "parent_id": folder.parent_id,
+                "path": folder.path
+            }
+        }
+    except HTTPException:
+        raise
+    except FolderCycleError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при обновлении папки: {str(e)}"
+        )
+
+@app.get("/api/folders/{folder_id}/tree", tags=["Папки"])
+async def get_folder_tree(folder_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Дерево папки со всеми вложенными папками (один запрос по диапазону path)"""
+    try:
+        root = await db.get(Folder, folder_id)
+        
+        if not root:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Папка с ID {folder_id} не найдена"
+            )
+        
+        result = await db.execute(
+            select(Folder.id, Folder.name, Folder.owner_id, Folder.parent_id, Folder.path)
+            .where(Folder.path.like(f"{root.path}%"))
+            .order_by(Folder.path)
+        )
+        
+        # Сначала создаем все узлы, затем привязываем их к родителям
+        nodes = {}
+        for row in result:
+            nodes[row.id] = {
+                "id": row.id,
+                "name": row.name,
+                "owner_id": row.owner_id,
+                "parent_id": row.parent_id,
+                "path": row.path,
+                "children": []
+            }
+        for node in nodes.values():
+            if node["id"] != root.id and node["parent_id"] in nodes:
+                nodes[node["parent_id"]]["children"].append(node)
+        
+        return {
+            "status": "success",
+            "count": len(nodes),
+            "tree": nodes[root.id]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении дерева папок: {str(e)}"
+        )
+
+@app.get("/api/folders/{folder_id}/documents", tags=["Папки"], response_model=FolderDocumentsResponse)
+async def get_folder_documents(
+    folder_id: int,
+    recursive: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Документы папки; recursive=true - вместе со всеми вложенными папками"""
+    try:
+        root = await db.get(Folder, folder_id)
+        
+        if not root:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Папка с ID {folder_id} не найдена"
+            )
+        
+        query = select(Document).options(
+            joinedload(Document.owner),
+            joinedload(Document.folder)
+        )
+        if recursive:
+            query = query.join(Folder, Folder.id == Document.folder_id).where(
+                Folder.path.like(f"{root.path}%")
+            )
+        else:
+            query = query.where(Document.folder_id == folder_id)
+        
+        result = await db.execute(query.order_by(Document.id).offset(skip).limit(limit))
+        documents = result.scalars().all()
+        
+        return {
+            "status": "success",
+            "folder_id": folder_id,
+            "recursive": recursive,
+            "count": len(documents),
+            "skip": skip,
+            "limit": limit,
+            "documents": [
+                {
+                    "id": doc.id,
+                    "title": doc.title,
+                    "content_preview": doc.content_preview or "",
+                    "folder_id": doc.folder_id,
+                    "folder_name": doc.folder.name if doc.folder else None,
+                    "owner_id": doc.owner_id,
+                    "owner_name": doc.owner.full_name if doc.owner else None,
+                    "status": doc.status,
+                    "comment_count": doc.comment_count,
+                    "created_at": doc.created_at,
+                    "updated_at": doc.updated_at
+                }
+                for doc in documents
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении документов папки: {str(e)}"
+        )
+
 # ============ ДОКУМЕНТЫ ============
 
-@app.get("/api/documents", tags=["Документы"])
+@app.get("/api/documents", tags=["Документы"], response_model=DocumentListResponse)
 async def get_documents(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
-    db: Session = Depends(get_db)
+    pagination: str = "offset",
+    cursor: str = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Получить список документов ИЗ БАЗЫ ДАННЫХ"""
+    """Получить список документов ИЗ БАЗЫ ДАННЫХ
+
+    Режимы пагинации:
+    - offset (по умолчанию, оставлен для совместимости) - skip/limit;
+    - cursor - keyset-пагинация по (id) или (updated_at, id). Первая страница
+      запрашивается с pagination=cursor, следующие - с cursor=<next_cursor>.
+      Стоимость глубоких страниц равна стоимости первой.
+    """
     try:
-        query = db.query(Document)
+        use_cursor = pagination == "cursor" or cursor is not None
+        if pagination not in ("offset", "cursor"):
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректный режим пагинации. Допустимые значения: offset, cursor"
+            )
+        if use_cursor and sort not in CURSOR_SORT_KEYS:
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректная сортировка. Допустимые значения: id, updated_at"
+            )
+        if use_cursor and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"limit должен быть от 1 до {MAX_PAGE_SIZE}"
+            )
+        if skip < 0 or limit < 0:
+            raise HTTPException(
+                status_code=400,
+                detail="skip и limit не могут быть отрицательными"
+            )
+
+        # Владелец и папка подгружаются тем же запросом (JOIN), без N+1.
+        # Полный текст (content) не выбирается - в списке нужен только content_preview
+        query = select(Document).options(
+            joinedload(Document.owner),
+            joinedload(Document.folder)
+        )
         
         if status:
-            query = query.filter(Document.status == status)
+            query = query.where(Document.status == status)
         
-        documents = query.offset(skip).limit(limit).all()
+        next_cursor = None
+        if use_cursor:
+            if cursor:
+                try:
+                    values = decode_cursor(cursor, sort)
+                except InvalidCursorError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                if sort == "id":
+                    query = query.where(Document.id > values[0])
+                else:
+                    query = query.where(
+                        tuple_(Document.updated_at, Document.id) < tuple_(*values)
+                    )
+
+            if sort == "id":
+                query = query.order_by(Document.id.asc())
+            else:
+                query = query.order_by(Document.updated_at.desc(), Document.id.desc())
+
+            # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+            result = await db.execute(query.limit(limit + 1))
+            documents = result.scalars().all()
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_cursor = next_cursor_for(sort, documents[-1])
+        else:
+            result = await db.execute(query.offset(skip).limit(limit))
+            documents = result.scalars().all()
         
-        # Получаем дополнительную информацию
         documents_with_details = []
         for doc in documents:
-            owner = db.query(User).filter(User.id == doc.owner_id).first()
-            folder = db.query(Folder).filter(Folder.id == doc.folder_id).first() if doc.folder_id else None
+            owner = doc.owner
+            folder = doc.folder
             
             documents_with_details.append({
                 "id": doc.id,
                 "title": doc.title,
-                "content_preview": doc.content[:100] + "..." if len(doc.content) > 100 else doc.content,
+                "content_preview": doc.content_preview or "",
                 "folder_id": doc.folder_id,
                 "folder_name": folder.name if folder else None,
                 "owner_id": doc.owner_id,
                 "owner_name": owner.full_name if owner else None,
                 "status": doc.status,
-                "created_at": doc.created_at.isoformat() if doc.created_at else None,
-                "updated_at": doc.updated_at.isoformat() if doc.updated_at else None
+                "comment_count": doc.comment_count,
+                "created_at": doc.created_at,
+                "updated_at": doc.updated_at
             })
         
+        if use_cursor:
+            return {
+                "status": "success",
+                "count": len(documents),
+                "limit": limit,
+                "pagination": "cursor",
+                "sort": sort,
+                "next_cursor": next_cursor,
+                "documents": documents_with_details
+            }
+
         return {
             "status": "success",
             "count": len(documents),
@@ -258,43 +768,219 @@ async def get_documents(
             "limit": limit,
             "documents": documents_with_details
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при получении документов: {str(e)}"
         )
 
-@app.get("/api/documents/{document_id}", tags=["Документы"])
-async def get_document(document_id: int, db: Session = Depends(get_db)):
-    """Получить документ по ID ИЗ БАЗЫ ДАННЫХ"""
+@app.post("/api/documents/bulk", tags=["Документы"])
+@query_budget(None)  # Число запросов растет с объемом данных
+async def bulk_import_documents(
+    request: Request,
+    format: str = None,
+    owner_id: int = None,
+    method: str = "auto",
+    db: AsyncSession = Depends(get_db)
+):
+    """Массовый импорт документов из потока NDJSON или CSV
+
+    Формат определяется параметром format (ndjson, csv) или заголовком
+    Content-Type. Поля строки: title, content, folder_id, owner_id, status;
+    owner_id из параметров запроса используется для строк без owner_id.
+    Строки проверяются и вставляются пачками (method: auto, insert, copy),
+    ошибки отдельных строк возвращаются в отчете с номерами строк.
+    """
     try:
-        document = db.query(Document).filter(Document.id == document_id).first()
+        content_type = request.headers.get("content-type", "")
+        if format is None:
+            format = "csv" if "csv" in content_type else "ndjson"
+        if format not in ("ndjson", "csv"):
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректный формат. Допустимые значения: ndjson, csv"
+            )
+        if method not in ("auto", "insert", "copy"):
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректный способ загрузки. Допустимые значения: auto, insert, copy"
+            )
         
-        if not document:
+        lines = bulk_loader.iter_lines(request.stream())
+        records = bulk_loader.parse_csv(lines) if format == "csv" else bulk_loader.parse_ndjson(lines)
+        report = await bulk_loader.load_documents(
+            db, records, default_owner_id=owner_id, method=method
+        )
+        
+        return {
+            "status": "success",
+            "format": format,
+            "message": f"Импортировано документов: {report.inserted}",
+            **report.to_dict()
+        }
+    except HTTPException:
+        raise
+    except (bulk_loader.RowError, UnicodeDecodeError, ValueError) as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ошибка во входных данных: {str(e)}"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при импорте документов: {str(e)}"
+        )
+
+@app.get("/api/documents/search", tags=["Документы"], response_model=SearchResponse)
+async def search_documents(
+    q: str,
+    status: str = None,
+    folder_id: int = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Полнотекстовый поиск документов по заголовку и содержимому
+
+    Результаты упорядочены по релевантности, в snippet - фрагменты текста
+    с подсвеченными (<b>...</b>) совпадениями.
+    """
+    try:
+        if not q.strip():
             raise HTTPException(
-                status_code=404,
-                detail=f"Документ с ID {document_id} не найден"
+                status_code=400,
+                detail="Поисковый запрос не может быть пустым"
             )
         
-        owner = db.query(User).filter(User.id == document.owner_id).first()
-        folder = db.query(Folder).filter(Folder.id == document.folder_id).first() if document.folder_id else None
+        results = await search.search_documents(
+            db, q, status=status, folder_id=folder_id, skip=skip, limit=limit
+        )
         
         return {
             "status": "success",
-            "document": {
-                "id": document.id,
-                "title": document.title,
-                "content": document.content,
-                "folder_id": document.folder_id,
-                "folder_name": folder.name if folder else None,
-                "owner_id": document.owner_id,
-                "owner_name": owner.full_name if owner else None,
-                "owner_role": owner.role if owner else None,
-                "status": document.status,
-                "created_at": document.created_at.isoformat() if document.created_at else None,
-                "updated_at": document.updated_at.isoformat() if document.updated_at else None
-            }
+            "query": q,
+            "count": len(results),
+            "skip": skip,
+            "limit": limit,
+            "results": results
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при поиске документов: {str(e)}"
+        )
+
+def document_etag(document_id: int, version, updated_at, comment_count, owner_version, folder_updated_at) -> str:
+    # В ответ входят имя/роль владельца и имя папки, поэтому их версии - часть ETag;
+    # число комментариев меняется без изменения версии документа
+    return http_cache.make_etag(
+        "document", document_id, version, updated_at, comment_count, owner_version, folder_updated_at
+    )
+
+def document_payload(document: Document) -> tuple:
+    """ETag и тело ответа GET /api/documents/{id}
+
+    document загружен с content, owner и folder. Общие с пакетным чтением и кэшем.
+    """
+    owner = document.owner
+    folder = document.folder
+    etag = document_etag(
+        document.id,
+        document.version,
+        document.updated_at,
+        document.comment_count,
+        owner.version if owner else None,
+        folder.updated_at if folder else None
+    )
+    payload = {
+        "status": "success",
+        "document": {
+            "id": document.id,
+            "title": document.title,
+            "content": document.content,
+            "folder_id": document.folder_id,
+            "folder_name": folder.name if folder else None,
+            "owner_id": document.owner_id,
+            "owner_name": owner.full_name if owner else None,
+            "owner_role": owner.role if owner else None,
+            "status": document.status,
+            "comment_count": document.comment_count,
+            "created_at": document.created_at,
+            "updated_at": document.updated_at
         }
+    }
+    return etag, payload
+
+def cache_document_payload(document: Document, etag: str, payload: dict, generation: int):
+    """generation - поколение кэша, взятое до чтения документа из БД"""
+    # Большие документы не кэшируем, чтобы кэш оставался ограниченным по памяти
+    if len(document.content) <= settings.RESPONSE_CACHE_MAX_ITEM_CHARS:
+        http_cache.response_cache.set(http_cache.document_key(document.id), (etag, payload), generation=generation)
+
+@app.get("/api/documents/{document_id}", tags=["Документы"], response_model=DocumentResponse)
+async def get_document(
+    document_id: int,
+    response: Response,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить документ по ID ИЗ БАЗЫ ДАННЫХ
+
+    Поддерживает условный запрос: при совпадении If-None-Match с текущим ETag
+    возвращается 304, а содержимое документа даже не читается из БД.
+    """
+    try:
+        key = http_cache.document_key(document_id)
+        cached = http_cache.response_cache.get(key)
+        if cached is not MISSING:
+            etag, payload = cached
+            if http_cache.etag_matches(if_none_match, etag):
+                return http_cache.not_modified(etag)
+            http_cache.set_etag_headers(response, etag)
+            return payload
+        
+        if if_none_match:
+            # Проверка актуальности одним запросом по первичному ключу, без content
+            result = await db.execute(
+                select(Document.version, Document.updated_at, Document.comment_count, User.version, Folder.updated_at)
+                .outerjoin(User, User.id == Document.owner_id)
+                .outerjoin(Folder, Folder.id == Document.folder_id)
+                .where(Document.id == document_id)
+            )
+            row = result.first()
+            if row is not None:
+                etag = document_etag(document_id, *row)
+                if http_cache.etag_matches(if_none_match, etag):
+                    return http_cache.not_modified(etag)
+        
+        # Поколение кэша до чтения: изменение после него не даст записать старый ответ
+        generation = http_cache.response_cache.generation()
+        document = await db.get(
+            Document,
+            document_id,
+            options=[
+                undefer(Document.content),
+                joinedload(Document.owner),
+                joinedload(Document.folder)
+            ]
+        )
+        
+        if not document:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} не найден"
+            )
+        
+        etag, payload = document_payload(document)
+        cache_document_payload(document, etag, payload, generation)
+        http_cache.set_etag_headers(response, etag)
+        return payload
     except HTTPException:
         raise
     except Exception as e:
@@ -303,17 +989,64 @@ async def get_document(document_id: int, db: Session = Depends(get_db)):
             detail=f"Ошибка при получении документа: {str(e)}"
         )
 
+@app.post("/api/documents:batchGet", tags=["Документы"], response_model=DocumentBatchResponse)
+@replicas.read_only
+async def batch_get_documents(
+    ids: List[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получить документы по списку ID: {"ids": [...]}
+
+    Документы, которых нет в кэше ответов, читаются одним запросом
+    WHERE id IN (...) вместе с владельцами и папками (JOIN). Элементы
+    совпадают с ответом GET /api/documents/{id}, идут в порядке ids (с
+    повторами); для отсутствующих ID - found=false, count - число найденных.
+    """
+    check_batch_ids(ids)
+    try:
+        found = {}
+        missing = []
+        for document_id in dict.fromkeys(ids):
+            cached = http_cache.response_cache.get(http_cache.document_key(document_id))
+            if cached is MISSING:
+                missing.append(document_id)
+            else:
+                found[document_id] = cached[1]["document"]
+        
+        if missing:
+            generation = http_cache.response_cache.generation()
+            documents = (await db.execute(
+                select(Document)
+                .options(
+                    undefer(Document.content),
+                    joinedload(Document.owner),
+                    joinedload(Document.folder)
+                )
+                .where(Document.id.in_(missing))
+            )).scalars().all()
+            for document in documents:
+                etag, payload = document_payload(document)
+                cache_document_payload(document, etag, payload, generation)
+                found[document.id] = payload["document"]
+        
+        return batch_results(ids, found, "document")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении документов: {str(e)}"
+        )
+
 @app.put("/api/documents/{document_id}", tags=["Документы"])
 async def update_document(
     document_id: int,
     title: str = None,
     content: str = None,
     status: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновить документ"""
     try:
-        document = db.query(Document).filter(Document.id == document_id).first()
+        document = await db.get(Document, document_id)
         
         if not document:
             raise HTTPException(
@@ -321,22 +1054,36 @@ async def update_document(
                 detail=f"Документ с ID {document_id} не найден"
             )
         
+        if status is not None and status not in ["draft", "under_review", "approved", "rejected"]:
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректный статус. Допустимые значения: draft, under_review, approved, rejected"
+            )
+        
+        # Версия записывается до изменения документа: для дельты нужен прежний текст
+        await versions.record_revision(db, document, title=title, content=content, status=status)
+        
         # Обновляем только переданные поля
         if title is not None:
             document.title = title
         if content is not None:
             document.content = content
         if status is not None:
-            if status not in ["draft", "under_review", "approved", "rejected"]:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Некорректный статус. Допустимые значения: draft, under_review, approved, rejected"
-                )
+            await statistics.move(db, "documents.status", document.status, status)
             document.status = status
         
         document.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(document)
+        document.version = (document.version or 0) + 1
+        await changefeed.record(db, "document.updated", document_id=document.id, folder_id=document.folder_id, data={
+            "title": document.title,
+            "status": document.status,
+            "version": document.version,
+            "content_changed": content is not None
+        })
+        await db.commit()
+        await db.refresh(document)
+        http_cache.invalidate_document(document.id)
+        await search.on_document_changed(db, document)
         
         return {
             "status": "success",
@@ -345,46 +1092,344 @@ async def update_document(
                 "id": document.id,
                 "title": document.title,
                 "status": document.status,
-                "updated_at": document.updated_at.isoformat()
+                "updated_at": document.updated_at.isoformat(),
+                "version": document.version
             }
         }
     except HTTPException:
         raise
+    except IntegrityError:
+        # Версия с тем же номером уже записана параллельным изменением
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Документ одновременно изменен другим запросом, повторите попытку"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при обновлении документа: {str(e)}"
         )
 
+@app.get("/api/documents/{document_id}/versions", tags=["Документы"])
+async def get_document_versions(
+    document_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """История версий документа (без содержимого), новые первыми"""
+    try:
+        current_version = await db.scalar(select(Document.version).where(Document.id == document_id))
+        
+        if current_version is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} не найден"
+            )
+        
+        rows = await versions.list_versions(db, document_id, skip=skip, limit=limit)
+        
+        return {
+            "status": "success",
+            "document_id": document_id,
+            "current_version": current_version,
+            "count": len(rows),
+            "versions": [
+                {
+                    "version": row.version,
+                    "storage": row.kind,
+                    "title": row.title,
+                    "status": row.status,
+                    "stored_size": row.stored_size,
+                    "created_at": row.created_at.isoformat() if row.created_at else None
+                }
+                for row in rows
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении истории версий: {str(e)}"
+        )
+
+@app.get("/api/documents/{document_id}/versions/{version}", tags=["Документы"])
+async def get_document_version(
+    document_id: int,
+    version: int,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Содержимое документа в указанной версии"""
+    try:
+        restored = await versions.get_version(db, document_id, version)
+        
+        if restored is None:
+            # Документ без истории: доступна только текущая версия
+            document = await db.scalar(
+                select(Document).options(undefer(Document.content)).where(Document.id == document_id)
+            )
+            if document is None or document.version != version:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Версия {version} документа с ID {document_id} не найдена"
+                )
+            restored = {
+                "version": document.version,
+                "title": document.title,
+                "status": document.status,
+                "content": document.content,
+                "created_at": document.updated_at.isoformat() if document.updated_at else None,
+                "deltas_applied": 0
+            }
+        
+        return {
+            "status": "success",
+            "document_id": document_id,
+            "version": restored
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении версии документа: {str(e)}"
+        )
+
+@app.get("/api/documents/{document_id}/content", tags=["Документы"])
+async def get_document_content(
+    document_id: int,
+    range: str = Header(None),
+    if_range: str = Header(None),
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Содержимое документа как text/plain с поддержкой Range: bytes=...
+
+    Читаются и передаются только фрагменты, попадающие в запрошенный
+    диапазон, поэтому первую страницу большого документа можно получить,
+    не загружая весь текст.
+    """
+    try:
+        version = await db.scalar(select(Document.version).where(Document.id == document_id))
+        
+        if version is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} не найден"
+            )
+        
+        etag = http_cache.make_etag("content", document_id, version)
+        if http_cache.etag_matches(if_none_match, etag):
+            return http_cache.not_modified(etag)
+        
+        layout = await content_store.chunk_layout(db, document_id, version)
+        size = content_store.content_size(layout)
+        
+        # If-Range с другим ETag - содержимое изменилось, отдаем его целиком
+        requested = range if not if_range or if_range.strip() == etag else None
+        try:
+            byte_range = content_store.parse_range(requested, size)
+        except content_store.RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        
+        start, end = byte_range or (0, size - 1)
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start + 1),
+            "ETag": etag,
+            "Cache-Control": "no-cache"
+        }
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        
+        return StreamingResponse(
+            content_store.stream_range(document_id, version, layout, start, end),
+            status_code=206 if byte_range else 200,
+            media_type=content_store.CONTENT_MEDIA_TYPE,
+            headers=headers
+        )
+    except HTTPException:
+        raise
+    except content_store.ContentChanged:
+        raise HTTPException(
+            status_code=409,
+            detail="Документ одновременно изменен другим запросом, повторите попытку"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении содержимого документа: {str(e)}"
+        )
+
+@app.put("/api/documents/{document_id}/content", tags=["Документы"])
+@query_budget(None)  # Число запросов растет с объемом данных
+async def upload_document_content(
+    document_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Заменить содержимое документа телом запроса (text/plain, UTF-8)
+
+    Тело читается потоком и сразу записывается фрагментами; полный текст
+    Document.content собирается из фрагментов на стороне БД. В историю
+    версий такая правка попадает полным снимком.
+    """
+    try:
+        current = (await db.execute(
+            select(Document.version, Document.status, Document.folder_id).where(Document.id == document_id)
+        )).first()
+        
+        if current is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} не найден"
+            )
+        
+        if not await versions.has_history(db, document_id):
+            await versions.snapshot_stored_state(db, document_id)
+        
+        new_version = current.version + 1
+        size, chunk_count, head = await content_store.write_chunks(
+            db, document_id, new_version, request.stream()
+        )
+        
+        updated_at = datetime.utcnow()
+        result = await db.execute(
+            update(Document.__table__)
+            .where(Document.id == document_id, Document.version == current.version)
+            .values(
+                content=content_store.assembled_content(db, document_id, new_version),
+                content_preview=make_preview(head),
+                version=new_version,
+                updated_at=updated_at
+            )
+        )
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=409,
+                detail="Документ одновременно изменен другим запросом, повторите попытку"
+            )
+        await versions.snapshot_stored_state(db, document_id)
+        await changefeed.record(db, "document.updated", document_id=document_id, folder_id=current.folder_id, data={
+            "status": current.status,
+            "version": new_version,
+            "content_changed": True
+        })
+        await db.commit()
+        
+        http_cache.invalidate_document(document_id)
+        document = await db.get(Document, document_id)
+        await search.on_document_changed(db, document)
+        
+        return {
+            "status": "success",
+            "message": "Содержимое документа загружено",
+            "document": {
+                "id": document_id,
+                "version": new_version,
+                "size_bytes": size,
+                "chunks": chunk_count,
+                "updated_at": updated_at.isoformat()
+            }
+        }
+    except HTTPException:
+        await db.rollback()
+        raise
+    except content_store.ContentTooLarge as e:
+        await db.rollback()
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnicodeDecodeError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Содержимое должно быть текстом в кодировке UTF-8")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Документ одновременно изменен другим запросом, повторите попытку"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при загрузке содержимого документа: {str(e)}"
+        )
+
 # ============ КОММЕНТАРИИ ============
 
-@app.get("/api/documents/{document_id}/comments", tags=["Комментарии"])
-async def get_document_comments(document_id: int, db: Session = Depends(get_db)):
-    """Получить комментарии к документу"""
+@app.get("/api/documents/{document_id}/comments", tags=["Комментарии"], response_model=CommentListResponse)
+async def get_document_comments(
+    document_id: int,
+    limit: int = comments.DEFAULT_PAGE_SIZE,
+    order: str = "desc",
+    cursor: str = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить комментарии к документу постранично
+
+    order=desc - новые первыми (по умолчанию), asc - старые первыми. Следующая
+    страница запрашивается с cursor=<next_cursor>; total - число всех
+    комментариев документа (из счетчика, без COUNT).
+    """
     try:
-        comments = db.query(DocumentComment).filter(
-            DocumentComment.document_id == document_id
-        ).order_by(DocumentComment.created_at.desc()).all()
+        if order not in comments.COMMENT_ORDERS:
+            raise HTTPException(
+                status_code=400,
+                detail="Некорректный порядок. Допустимые значения: desc, asc"
+            )
+        if not 1 <= limit <= comments.MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"limit должен быть от 1 до {comments.MAX_PAGE_SIZE}"
+            )
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, comments.cursor_sort(order))
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        total = await db.scalar(select(Document.comment_count).where(Document.id == document_id))
+        if total is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} не найден"
+            )
+        
+        # Автор подгружается тем же запросом (JOIN)
+        result = await db.execute(comments.page_query(document_id, order, after, limit))
+        page = result.scalars().all()
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = comments.next_cursor(order, page[-1])
         
         comments_with_authors = []
-        for comment in comments:
-            author = db.query(User).filter(User.id == comment.user_id).first()
+        for comment in page:
+            author = comment.author
             comments_with_authors.append({
                 "id": comment.id,
                 "comment": comment.comment,
                 "user_id": comment.user_id,
                 "author_name": author.full_name if author else "Неизвестно",
                 "author_role": author.role if author else None,
-                "created_at": comment.created_at.isoformat() if comment.created_at else None
+                "created_at": comment.created_at
             })
         
         return {
             "status": "success",
             "document_id": document_id,
-            "count": len(comments),
+            "count": len(page),
+            "total": total,
+            "limit": limit,
+            "order": order,
+            "next_cursor": next_cursor,
             "comments": comments_with_authors
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -396,12 +1441,38 @@ async def add_comment(
     document_id: int,
     comment: str,
     user_id: int = 1,  # Временно, потом заменим на текущего пользователя
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Добавить комментарий к документу"""
+    """Добавить комментарий к документу
+
+    При COMMENTS_GROUP_COMMIT=True комментарий записывается в общей пачке с
+    другими одновременными комментариями (см. app/services/comments.py).
+    """
+    if settings.COMMENTS_GROUP_COMMIT:
+        try:
+            created = await comments.batcher.add(document_id, user_id, comment)
+        except comments.CommentTargetNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Ошибка при добавлении комментария: {str(e)}"
+            )
+        return {
+            "status": "success",
+            "message": "Комментарий успешно добавлен",
+            "comment": {
+                "id": created["id"],
+                "document_id": created["document_id"],
+                "comment": created["comment"],
+                "author_name": created["author_name"],
+                "created_at": created["created_at"].isoformat()
+            }
+        }
+    
     try:
         # Проверяем что документ существует
-        document = db.query(Document).filter(Document.id == document_id).first()
+        document = await db.get(Document, document_id)
         if not document:
             raise HTTPException(
                 status_code=404,
@@ -409,7 +1480,7 @@ async def add_comment(
             )
         
         # Проверяем что пользователь существует
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=404,
@@ -423,8 +1494,16 @@ async def add_comment(
         )
         
         db.add(new_comment)
-        db.commit()
-        db.refresh(new_comment)
+        await db.execute(comments.increment_count(document_id))
+        await statistics.bump(db, "comments")
+        await db.flush()
+        await changefeed.record(db, "comment.added", document_id=document_id, folder_id=document.folder_id, data={
+            "comment_id": new_comment.id,
+            "author_id": user_id
+        })
+        await db.commit()
+        await db.refresh(new_comment)
+        http_cache.invalidate_document(document_id)
         
         return {
             "status": "success",
@@ -440,7 +1519,7 @@ async def add_comment(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при добавлении комментария: {str(e)}"
@@ -448,30 +1527,35 @@ async def add_comment(
 
 # ============ ПРАВА ДОСТУПА ============
 
-@app.get("/api/permissions", tags=["Права доступа"])
+@app.get("/api/permissions", tags=["Права доступа"], response_model=PermissionListResponse)
 async def get_permissions(
     user_id: int = None,
     entity_type: str = None,
     entity_id: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить права доступа"""
     try:
-        query = db.query(Permission)
+        # Пользователь и выдавший право подгружаются тем же запросом (JOIN)
+        query = select(Permission).options(
+            joinedload(Permission.user),
+            joinedload(Permission.granter)
+        )
         
         if user_id:
-            query = query.filter(Permission.user_id == user_id)
+            query = query.where(Permission.user_id == user_id)
         if entity_type:
-            query = query.filter(Permission.entity_type == entity_type)
+            query = query.where(Permission.entity_type == entity_type)
         if entity_id:
-            query = query.filter(Permission.entity_id == entity_id)
+            query = query.where(Permission.entity_id == entity_id)
         
-        permissions = query.all()
+        result = await db.execute(query)
+        permissions = result.scalars().all()
         
         permissions_with_details = []
         for perm in permissions:
-            user = db.query(User).filter(User.id == perm.user_id).first()
-            granted_by = db.query(User).filter(User.id == perm.granted_by).first() if perm.granted_by else None
+            user = perm.user
+            granted_by = perm.granter
             
             permissions_with_details.append({
                 "id": perm.id,
@@ -486,7 +1570,7 @@ async def get_permissions(
                 "can_manage_access": perm.can_manage_access,
                 "granted_by_id": perm.granted_by,
                 "granted_by_name": granted_by.full_name if granted_by else None,
-                "granted_at": perm.granted_at.isoformat() if perm.granted_at else None
+                "granted_at": perm.granted_at
             })
         
         return {
@@ -500,47 +1584,115 @@ async def get_permissions(
             detail=f"Ошибка при получении прав доступа: {str(e)}"
         )
 
+@app.get("/api/documents/{document_id}/effective-permissions", tags=["Права доступа"])
+async def get_effective_permissions(
+    document_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Итоговые права пользователя на документ с учетом наследования от папок"""
+    try:
+        resolved = await permissions.get_effective_permissions(db, user_id, document_id)
+        
+        if resolved is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Документ с ID {document_id} или пользователь с ID {user_id} не найден"
+            )
+        
+        return {
+            "status": "success",
+            "user_id": user_id,
+            "document_id": document_id,
+            "permissions": resolved.to_dict()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при вычислении прав доступа: {str(e)}"
+        )
+
+# ============ ЛЕНТА ИЗМЕНЕНИЙ ============
+
+@app.get("/api/changes", tags=["Лента изменений"])
+@query_budget(None)  # Поток открыт долго, догрузка пропущенных событий - отдельные запросы
+async def stream_changes(
+    document_id: int = None,
+    folder_id: int = None,
+    user_id: int = None,
+    last_event_id: int = None,
+    last_event_id_header: str = Header(None, alias="Last-Event-ID")
+):
+    """Подписка на изменения документа, папки или пользователя (Server-Sent Events)
+
+    Ровно один из параметров document_id, folder_id, user_id. Подписка на
+    папку получает события документов, лежащих непосредственно в ней.
+    Возобновление - заголовок Last-Event-ID (EventSource передает его при
+    переподключении сам) или параметр last_event_id. Событие reset означает,
+    что часть пропущенных событий уже удалена и данные нужно перечитать.
+    """
+    targets = {"document_id": document_id, "folder_id": folder_id, "user_id": user_id}
+    selected = [(field, value) for field, value in targets.items() if value is not None]
+    if len(selected) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Укажите ровно один из параметров: document_id, folder_id, user_id"
+        )
+    key = selected[0]
+    
+    if last_event_id is None and last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректный заголовок Last-Event-ID")
+    
+    if changefeed.broker.subscriber_count >= settings.CHANGE_FEED_MAX_SUBSCRIBERS:
+        raise HTTPException(
+            status_code=503,
+            detail="Слишком много подписок на ленту изменений, повторите позже",
+            headers={"Retry-After": str(settings.CHANGE_FEED_HEARTBEAT_SECONDS)}
+        )
+    
+    try:
+        # Сессия только на проверку: поток не удерживает соединение с БД
+        async with AsyncSessionLocal() as db:
+            exists = await changefeed.target_exists(db, key)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при подписке на изменения: {str(e)}"
+        )
+    if not exists:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Объект {key[0]}={key[1]} не найден"
+        )
+    
+    return StreamingResponse(
+        changefeed.stream(key, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ============ СТАТИСТИКА ============
 
 @app.get("/api/statistics", tags=["Статистика"])
-async def get_statistics(db: Session = Depends(get_db)):
-    """Полная статистика системы"""
+async def get_statistics(db: AsyncSession = Depends(get_read_db)):
+    """Полная статистика системы
+
+    По умолчанию считается одним запросом с GROUP BY. При STATS_USE_COUNTERS=True
+    читается из таблицы счетчиков (устаревание не больше STATS_COUNTERS_MAX_AGE
+    секунд для изменений в обход API).
+    """
     try:
-        user_count = db.query(User).count()
-        folder_count = db.query(Folder).count()
-        document_count = db.query(Document).count()
-        permission_count = db.query(Permission).count()
-        comment_count = db.query(DocumentComment).count()
-        
-        # Статистика по статусам документов
-        status_stats = {}
-        for status in ["draft", "under_review", "approved", "rejected"]:
-            count = db.query(Document).filter(Document.status == status).count()
-            status_stats[status] = count
-        
-        # Статистика по ролям пользователей
-        role_stats = {}
-        for role in ["admin", "manager", "employee"]:
-            count = db.query(User).filter(User.role == role).count()
-            if count > 0:
-                role_stats[role] = count
+        stats, source = await statistics.get_statistics(db, on_replica=replicas.is_replica(db))
         
         return {
             "status": "success",
-            "statistics": {
-                "users": {
-                    "total": user_count,
-                    "by_role": role_stats
-                },
-                "folders": folder_count,
-                "documents": {
-                    "total": document_count,
-                    "by_status": status_stats
-                },
-                "permissions": permission_count,
-                "comments": comment_count,
-                "total_records": user_count + folder_count + document_count + permission_count + comment_count
-            },
+            "statistics": stats,
+            "source": source,
             "message": "Статистика системы VaultDoc"
         }
     except Exception as e:
@@ -548,3 +1700,69 @@ async def get_statistics(db: Session = Depends(get_db)):
             status_code=500,
             detail=f"Ошибка при получении статистики: {str(e)}"
         )
+
+# ============ ЭКСПОРТ ============
+
+@app.get("/api/export/{entity}", tags=["Экспорт"])
+@query_budget(None)  # Текст длинных документов читается отдельными запросами
+async def export_entity(
+    entity: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+    status: str = None,
+    folder_id: int = None,
+    owner_id: int = None,
+    document_id: int = None,
+    user_id: int = None,
+    entity_type: str = None,
+    entity_id: int = None,
+    updated_since: datetime = None,
+    created_since: datetime = None
+):
+    """Потоковая выгрузка documents, comments или permissions в NDJSON или CSV
+
+    Строки отдаются по мере чтения курсором БД, память не зависит от объема;
+    длинное содержимое документов читается и отдается частями.
+    Фильтры: documents - status, folder_id, owner_id, updated_since;
+    comments - document_id, user_id, created_since;
+    permissions - user_id, entity_type, entity_id.
+    С gzip=true отдается сжатый файл (.gz).
+    """
+    if entity not in export.EXPORTS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Неизвестная сущность: {entity}. Допустимые значения: {', '.join(export.EXPORTS)}"
+        )
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Некорректный формат. Допустимые значения: {', '.join(export.EXPORT_FORMATS)}"
+        )
+    
+    filters = {
+        "status": status,
+        "folder_id": folder_id,
+        "owner_id": owner_id,
+        "document_id": document_id,
+        "user_id": user_id,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "updated_since": updated_since,
+        "created_since": created_since
+    }
+    try:
+        # Проверяем фильтры до начала ответа: после первого байта статус уже не изменить
+        export.build_query(export.EXPORTS[entity], filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"{entity}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export.stream_rows(entity, format, filters, compress=gzip),
+        media_type="application/gzip" if gzip else export.EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            # Не буферизовать ответ на обратном прокси
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -4,5 +4,9 @@ from .folder import Folder
 from .document import Document
 from .permission import Permission
 from .comment import DocumentComment
+from .document_version import DocumentVersion
+from .document_chunk import DocumentContentChunk
+from .stat_counter import StatCounter
+from .change_event import ChangeEvent
 
-__all__ = ["User", "Folder", "Document", "Permission", "DocumentComment"]
+__all__ = ["User", "Folder", "Document", "Permission", "DocumentComment", "DocumentVersion", "DocumentContentChunk", "StatCounter", "ChangeEvent"]
@@ -0,0 +1,35 @@
+"""
+Модель события ленты изменений (документы, комментарии, пользователи, права)
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.core.database import Base
+
+class ChangeEvent(Base):
+    __tablename__ = "change_events"
+
+    id = Column(Integer, primary_key=True)
+    # Номер в порядке фиксации транзакций - id события SSE (Last-Event-ID);
+    # NULL, пока событие не пронумеровано (см. app/services/changefeed.py)
+    position = Column(Integer)
+    kind = Column(String(32), nullable=False)  # document.updated, comment.added, ...
+    # Без внешних ключей: события переживают удаленные объекты до очистки по сроку
+    document_id = Column(Integer)
+    folder_id = Column(Integer)
+    user_id = Column(Integer)
+    data = Column(Text)  # JSON с измененными полями
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Догрузка пропущенных событий подписки - диапазон по (объект, position)
+        Index("ix_change_events_document_id_position", "document_id", "position"),
+        Index("ix_change_events_folder_id_position", "folder_id", "position"),
+        Index("ix_change_events_user_id_position", "user_id", "position"),
+        # Чтение новых событий воркером по возрастанию position
+        Index("ix_change_events_position", "position", unique=True),
+        # Удаление событий старше CHANGE_FEED_RETENTION_HOURS
+        Index("ix_change_events_created_at", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ChangeEvent(id={self.id}, kind={self.kind})>"
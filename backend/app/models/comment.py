@@ -1,18 +1,29 @@
 """
 Модель комментария к документам
 """
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
 
 class DocumentComment(Base):
     __tablename__ = "document_comments"
     
-    id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     comment = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    document = relationship("Document", foreign_keys=[document_id])
+    author = relationship("User", foreign_keys=[user_id])
+    
+    __table_args__ = (
+        # Комментарии документа в порядке создания (GET /api/documents/{id}/comments)
+        Index("ix_document_comments_document_id_created_at_id", "document_id", "created_at", "id"),
+        # Комментарии пользователя (выгрузка с фильтром user_id, каскадное удаление)
+        Index("ix_document_comments_user_id", "user_id"),
+    )
+    
     def __repr__(self):
         return f"<Comment(id={self.id}, document_id={self.document_id})>"
@@ -1,21 +1,73 @@
 """
 Модель документа для базы данных
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import CheckConstraint, Column, Integer, String, Text, DateTime, ForeignKey, Index, event
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from app.core.database import Base
 
+# Длина превью содержимого для списков документов
+PREVIEW_LENGTH = 100
+
+
+def make_preview(content: str) -> str:
+    """Превью содержимого: первые PREVIEW_LENGTH символов"""
+    if content is None:
+        return None
+    return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
+
+
 class Document(Base):
     __tablename__ = "documents"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(500), nullable=False)
-    content = Column(Text, nullable=False)
-    folder_id = Column(Integer, ForeignKey("folders.id"))
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    status = Column(String(20), default="draft")  # draft, under_review, approved, rejected
+    # Полный текст может занимать мегабайты, поэтому он не загружается
+    # по умолчанию: списки используют content_preview, а там, где текст
+    # действительно нужен, запрос явно указывает undefer(Document.content)
+    content = deferred(Column(Text, nullable=False))
+    # Превью хранится отдельно и пересчитывается при каждой записи content
+    content_preview = Column(String(PREVIEW_LENGTH + 3))
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="SET NULL"))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(20), nullable=False, default="draft", server_default="draft")  # draft, under_review, approved, rejected
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Номер версии, увеличивается при каждом изменении (используется в ETag)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Число комментариев (ведется при добавлении комментария, см. app/services/comments.py)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    owner = relationship("User", foreign_keys=[owner_id])
+    folder = relationship("Folder", foreign_keys=[folder_id])
+    
+    __table_args__ = (
+        # Индексы под курсорную пагинацию GET /api/documents (с фильтром по статусу и без)
+        Index("ix_documents_updated_at_id", "updated_at", "id"),
+        Index("ix_documents_status_id", "status", "id"),
+        Index("ix_documents_status_updated_at_id", "status", "updated_at", "id"),
+        # Документы папки и поддерева папок (GET /api/folders/{id}/documents)
+        Index("ix_documents_folder_id_id", "folder_id", "id"),
+        # Документы владельца (выгрузка с фильтром owner_id, каскадное удаление пользователя)
+        Index("ix_documents_owner_id_id", "owner_id", "id"),
+        CheckConstraint(
+            "status IN ('draft', 'under_review', 'approved', 'rejected')",
+            name="documents_status_check",
+        ),
+    )
     
     def __repr__(self):
         return f"<Document(id={self.id}, title={self.title}, status={self.status})>"
+
+
+@event.listens_for(Document.content, "set")
+def _sync_content_preview(target, value, oldvalue, initiator):
+    """Поддерживать content_preview в актуальном состоянии при записи content"""
+    target.content_preview = make_preview(value)
+
+
+# Полнотекстовый поиск (только PostgreSQL) - вычисляемая колонка search_vector
+# (tsvector) с GIN-индексом создается миграцией
+# migrations/versions/0002_pre_migration_schema.py. Колонка не
+# отображается в модель, чтобы не загружаться вместе с документом и не мешать
+# работе на SQLite (там используется индекс в памяти, см. app/services/search.py)
@@ -0,0 +1,21 @@
+"""
+Модель фрагмента содержимого документа (хранилище для чтения по диапазонам)
+"""
+from sqlalchemy import Column, Integer, Text, ForeignKey
+from app.core.database import Base
+
+class DocumentContentChunk(Base):
+    __tablename__ = "document_content_chunks"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    # Document.version, для которой построены фрагменты. Предыдущий набор
+    # хранится, пока не записан следующий: его дочитывают начатые ответы
+    version = Column(Integer, primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    # Фрагмент текста из целых символов (не режет многобайтовые символы UTF-8)
+    data = Column(Text, nullable=False)
+    # Длина фрагмента в байтах UTF-8 - по ней вычисляются смещения для Range
+    byte_length = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<DocumentContentChunk(document_id={self.document_id}, version={self.version}, chunk_index={self.chunk_index})>"
@@ -0,0 +1,29 @@
+"""
+Модель версии документа (история изменений)
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, CheckConstraint, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+class DocumentVersion(Base):
+    __tablename__ = "document_versions"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)  # Совпадает с Document.version этой редакции
+    # snapshot - payload содержит полный текст; delta - изменения относительно
+    # предыдущей версии (см. app/services/versions.py)
+    kind = Column(String(10), nullable=False)
+    title = Column(String(500), nullable=False)
+    status = Column(String(20))
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Выборка цепочки версий документа - диапазон по этому индексу
+        UniqueConstraint("document_id", "version", name="uq_document_versions_document_id_version"),
+        CheckConstraint("kind IN ('snapshot', 'delta')", name="document_versions_kind_check"),
+    )
+
+    def __repr__(self):
+        return f"<DocumentVersion(document_id={self.document_id}, version={self.version}, kind={self.kind})>"
@@ -1,19 +1,78 @@
 """
 Модель папки для организации документов
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, event, func, inspect, literal, select, update
+from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime
 from app.core.database import Base
 
 class Folder(Base):
     __tablename__ = "folders"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))
-    parent_id = Column(Integer, ForeignKey("folders.id"))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    parent_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"))
+    # Материализованный путь от корня: "/1/4/9/". Все поддерево папки - это
+    # строки с path LIKE '<path папки>%', т.е. один диапазон по индексу
+    path = Column(String(1024))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    owner = relationship("User", foreign_keys=[owner_id])
+    parent = relationship("Folder", remote_side=[id], foreign_keys=[parent_id])
+    
+    __table_args__ = (
+        # varchar_pattern_ops - чтобы PostgreSQL использовал индекс для LIKE 'префикс%'
+        Index("ix_folders_path", "path", postgresql_ops={"path": "varchar_pattern_ops"}),
+        Index("ix_folders_parent_id", "parent_id"),
+        Index("ix_folders_owner_id", "owner_id"),
+    )
+    
     def __repr__(self):
         return f"<Folder(id={self.id}, name={self.name})>"
+
+
+class FolderCycleError(ValueError):
+    """Попытка перенести папку внутрь собственного поддерева"""
+
+
+def _parent_path(connection, parent_id):
+    if parent_id is None:
+        return "/"
+    folders = Folder.__table__
+    parent_path = connection.scalar(select(folders.c.path).where(folders.c.id == parent_id))
+    return parent_path or "/"
+
+
+@event.listens_for(Folder, "after_insert")
+def _set_folder_path(mapper, connection, target):
+    """Заполнить path новой папки (id известен только после INSERT)"""
+    folders = Folder.__table__
+    path = f"{_parent_path(connection, target.parent_id)}{target.id}/"
+    connection.execute(update(folders).where(folders.c.id == target.id).values(path=path))
+    set_committed_value(target, "path", path)
+
+
+@event.listens_for(Folder, "after_update")
+def _move_folder_subtree(mapper, connection, target):
+    """При смене parent_id переписать path у папки и всего ее поддерева одним UPDATE"""
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+
+    folders = Folder.__table__
+    old_path = connection.scalar(select(folders.c.path).where(folders.c.id == target.id))
+    new_path = f"{_parent_path(connection, target.parent_id)}{target.id}/"
+    if old_path and new_path.startswith(old_path) and new_path != old_path:
+        raise FolderCycleError("Нельзя перенести папку внутрь ее собственного поддерева")
+
+    if old_path:
+        connection.execute(
+            update(folders)
+            .where(folders.c.path.like(f"{old_path}%"))
+            .values(path=literal(new_path, String).concat(func.substr(folders.c.path, len(old_path) + 1)))
+        )
+    else:
+        connection.execute(update(folders).where(folders.c.id == target.id).values(path=new_path))
+    set_committed_value(target, "path", new_path)
@@ -1,15 +1,16 @@
 """
 Модель прав доступа для папок и документов
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, CheckConstraint, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
 
 class Permission(Base):
     __tablename__ = "permissions"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     entity_type = Column(String(10), nullable=False)  # 'folder' или 'document'
     entity_id = Column(Integer, nullable=False)       # ID папки или документа
     can_view = Column(Boolean, default=False)
@@ -19,5 +20,17 @@ class Permission(Base):
     granted_by = Column(Integer, ForeignKey("users.id"))
     granted_at = Column(DateTime, default=datetime.utcnow)
     
+    user = relationship("User", foreign_keys=[user_id])
+    granter = relationship("User", foreign_keys=[granted_by])
+    
+    __table_args__ = (
+        # Одно право на пару пользователь-объект; индекс ограничения обслуживает
+        # выборку прав пользователя и вычисление эффективных прав документа
+        UniqueConstraint("user_id", "entity_type", "entity_id", name="permissions_user_id_entity_type_entity_id_key"),
+        # Права на конкретный объект (GET /api/permissions?entity_type=...&entity_id=...)
+        Index("ix_permissions_entity_type_entity_id", "entity_type", "entity_id"),
+        CheckConstraint("entity_type IN ('folder', 'document')", name="permissions_entity_type_check"),
+    )
+    
     def __repr__(self):
         return f"<Permission(user_id={self.user_id}, entity={self.entity_type}:{self.entity_id})>"
@@ -0,0 +1,21 @@
+"""
+Модель счетчиков статистики (денормализованные агрегаты для /api/statistics)
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.core.database import Base
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    # scope - раздел статистики (users, users.role, documents, documents.status, ...),
+    # key - значение внутри раздела (total, роль, статус),
+    # shard - номер строки счетчика: значение счетчика - сумма по шардам
+    scope = Column(String(32), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<StatCounter({self.scope}:{self.key}#{self.shard}={self.value})>"
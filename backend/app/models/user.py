@@ -1,20 +1,28 @@
 """
 Модель пользователя для базы данных
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, CheckConstraint, UniqueConstraint
 from datetime import datetime
 from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    password_hash = Column(String, nullable=False)
-    full_name = Column(String, nullable=False)
-    role = Column(String, default="employee")  # employee, manager, admin
+    id = Column(Integer, primary_key=True)
+    email = Column(String(255), nullable=False)
+    password_hash = Column(String(255), nullable=False)
+    full_name = Column(String(255), nullable=False)
+    role = Column(String(20), nullable=False, default="employee", server_default="employee")  # employee, manager, accountant, admin
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Номер версии, увеличивается при каждом изменении (используется в ETag)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    __table_args__ = (
+        UniqueConstraint("email", name="users_email_key"),
+        CheckConstraint("role IN ('employee', 'manager', 'accountant', 'admin')", name="users_role_check"),
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, role={self.role})>"
@@ -0,0 +1,28 @@
+# Схемы ответов API VaultDoc (Pydantic v2)
+from .user import UserOut, UserListResponse, UserResponse, UserBatchItem, UserBatchResponse
+from .folder import FolderOut, FolderListResponse
+from .document import (
+    DocumentListItem,
+    DocumentOffsetPage,
+    DocumentCursorPage,
+    DocumentListResponse,
+    FolderDocumentsResponse,
+    DocumentDetail,
+    DocumentResponse,
+    DocumentBatchItem,
+    DocumentBatchResponse,
+    SearchResult,
+    SearchResponse,
+)
+from .comment import CommentOut, CommentListResponse
+from .permission import PermissionOut, PermissionListResponse
+
+__all__ = [
+    "UserOut", "UserListResponse", "UserResponse", "UserBatchItem", "UserBatchResponse",
+    "FolderOut", "FolderListResponse",
+    "DocumentListItem", "DocumentOffsetPage", "DocumentCursorPage", "DocumentListResponse",
+    "FolderDocumentsResponse", "DocumentDetail", "DocumentResponse",
+    "DocumentBatchItem", "DocumentBatchResponse", "SearchResult", "SearchResponse",
+    "CommentOut", "CommentListResponse",
+    "PermissionOut", "PermissionListResponse",
+]
@@ -0,0 +1,13 @@
+"""
+Общие настройки схем ответов API
+"""
+from pydantic import BaseModel
+
+
+class ResponseModel(BaseModel):
+    """Базовая схема ответа
+
+    Эндпоинты возвращают dict, FastAPI проверяет его по схеме и сериализует
+    средствами pydantic-core, после чего ORJSONResponse кодирует результат.
+    Даты передаются объектами datetime, без ручного isoformat().
+    """
@@ -0,0 +1,28 @@
+"""
+Схемы ответов для комментариев
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from .base import ResponseModel
+
+
+class CommentOut(ResponseModel):
+    id: int
+    comment: str
+    user_id: int
+    author_name: Optional[str] = None
+    author_role: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class CommentListResponse(ResponseModel):
+    status: str = "success"
+    document_id: int
+    count: int
+    # Всего комментариев у документа (documents.comment_count)
+    total: int
+    limit: int
+    order: str
+    next_cursor: Optional[str] = None
+    comments: List[CommentOut]
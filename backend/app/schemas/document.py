@@ -0,0 +1,107 @@
+"""
+Схемы ответов для документов
+"""
+from datetime import datetime
+from typing import List, Optional, Union
+
+from .base import ResponseModel
+
+
+class DocumentListItem(ResponseModel):
+    """Документ в списке: вместо полного текста - превью"""
+
+    id: int
+    title: str
+    content_preview: str = ""
+    folder_id: Optional[int] = None
+    folder_name: Optional[str] = None
+    owner_id: int
+    owner_name: Optional[str] = None
+    status: Optional[str] = None
+    comment_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class DocumentOffsetPage(ResponseModel):
+    status: str = "success"
+    count: int
+    skip: int
+    limit: int
+    documents: List[DocumentListItem]
+
+
+class DocumentCursorPage(ResponseModel):
+    status: str = "success"
+    count: int
+    limit: int
+    pagination: str
+    sort: str
+    next_cursor: Optional[str] = None
+    documents: List[DocumentListItem]
+
+
+# GET /api/documents отвечает одной из двух форм в зависимости от режима пагинации
+DocumentListResponse = Union[DocumentCursorPage, DocumentOffsetPage]
+
+
+class FolderDocumentsResponse(ResponseModel):
+    status: str = "success"
+    folder_id: int
+    recursive: bool
+    count: int
+    skip: int
+    limit: int
+    documents: List[DocumentListItem]
+
+
+class DocumentDetail(ResponseModel):
+    id: int
+    title: str
+    content: str
+    folder_id: Optional[int] = None
+    folder_name: Optional[str] = None
+    owner_id: int
+    owner_name: Optional[str] = None
+    owner_role: Optional[str] = None
+    status: Optional[str] = None
+    comment_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class DocumentResponse(ResponseModel):
+    status: str = "success"
+    document: DocumentDetail
+
+
+class DocumentBatchItem(ResponseModel):
+    id: int
+    found: bool
+    document: Optional[DocumentDetail] = None
+
+
+class DocumentBatchResponse(ResponseModel):
+    status: str = "success"
+    count: int
+    results: List[DocumentBatchItem]
+
+
+class SearchResult(ResponseModel):
+    id: int
+    title: str
+    folder_id: Optional[int] = None
+    owner_id: int
+    status: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    rank: float
+    snippet: str
+
+
+class SearchResponse(ResponseModel):
+    status: str = "success"
+    query: str
+    count: int
+    skip: int
+    limit: int
+    results: List[SearchResult]
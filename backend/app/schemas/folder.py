@@ -0,0 +1,24 @@
+"""
+Схемы ответов для папок
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from .base import ResponseModel
+
+
+class FolderOut(ResponseModel):
+    id: int
+    name: str
+    owner_id: Optional[int] = None
+    owner_name: Optional[str] = None
+    parent_id: Optional[int] = None
+    path: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class FolderListResponse(ResponseModel):
+    status: str = "success"
+    count: int
+    folders: List[FolderOut]
@@ -0,0 +1,29 @@
+"""
+Схемы ответов для прав доступа
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from .base import ResponseModel
+
+
+class PermissionOut(ResponseModel):
+    id: int
+    user_id: int
+    user_email: Optional[str] = None
+    user_name: Optional[str] = None
+    entity_type: str
+    entity_id: int
+    can_view: Optional[bool] = None
+    can_edit: Optional[bool] = None
+    can_delete: Optional[bool] = None
+    can_manage_access: Optional[bool] = None
+    granted_by_id: Optional[int] = None
+    granted_by_name: Optional[str] = None
+    granted_at: Optional[datetime] = None
+
+
+class PermissionListResponse(ResponseModel):
+    status: str = "success"
+    count: int
+    permissions: List[PermissionOut]
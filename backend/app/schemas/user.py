@@ -0,0 +1,39 @@
+"""
+Схемы ответов для пользователей
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from .base import ResponseModel
+
+
+class UserOut(ResponseModel):
+    id: int
+    email: str
+    full_name: str
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+
+class UserListResponse(ResponseModel):
+    status: str = "success"
+    count: int
+    users: List[UserOut]
+
+
+class UserResponse(ResponseModel):
+    status: str = "success"
+    user: UserOut
+
+
+class UserBatchItem(ResponseModel):
+    id: int
+    found: bool
+    user: Optional[UserOut] = None
+
+
+class UserBatchResponse(ResponseModel):
+    status: str = "success"
+    count: int
+    results: List[UserBatchItem]
@@ -0,0 +1,360 @@
+"""
+Массовая загрузка данных
+
+Используется эндпоинтом POST /api/documents/bulk и скриптами заполнения БД.
+Входной поток (NDJSON или CSV) читается построчно, строки проверяются и
+вставляются пачками: многострочным INSERT или, для PostgreSQL с asyncpg,
+командой COPY. Ошибки отдельных строк не прерывают загрузку и попадают в отчет.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import permissions
+from app.core.config import settings
+from app.models.document import Document, make_preview
+from app.models.folder import Folder
+from app.models.user import User
+from app.services import search, statistics
+
+DOCUMENT_STATUSES = ("draft", "under_review", "approved", "rejected")
+CSV_COLUMNS = ("title", "content", "folder_id", "owner_id", "status")
+TITLE_MAX_LENGTH = Document.__table__.c.title.type.length
+
+# Колонки documents, заполняемые при загрузке (search_vector вычисляется в БД)
+DOCUMENT_COLUMNS = (
+    "title", "content", "content_preview", "folder_id", "owner_id",
+    "status", "created_at", "updated_at", "version",
+)
+
+
+class RowError(ValueError):
+    """Ошибка в отдельной строке входных данных"""
+
+
+class BulkLoadReport:
+    """Итог загрузки: количество строк и ошибки по номерам строк"""
+
+    def __init__(self, method: str, max_errors: int):
+        self.method = method
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# ============ РАЗБОР ВХОДНОГО ПОТОКА ============
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Разбить поток байтов на строки, не накапливая весь поток в памяти
+
+    Делится только пришедшая порция; хвост незавершенной строки копится
+    списком и склеивается один раз, когда приходит ее перевод строки.
+    """
+    tail: List[bytes] = []
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            tail.append(lines[0])
+            lines[0] = b"".join(tail)
+            tail = []
+            for line in lines:
+                yield line.rstrip(b"\r").decode("utf-8")
+        if rest:
+            tail.append(rest)
+    if tail:
+        yield b"".join(tail).rstrip(b"\r").decode("utf-8")
+
+
+async def parse_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    """(номер строки, dict или RowError) для каждой непустой строки NDJSON"""
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(f"Некорректный JSON: {e}")
+            continue
+        if not isinstance(value, dict):
+            yield line_no, RowError("Ожидается JSON-объект")
+            continue
+        yield line_no, value
+
+
+async def parse_csv(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    """(номер строки, dict или RowError) для каждой записи CSV с заголовком
+
+    Запись может занимать несколько физических строк (перевод строки внутри
+    кавычек): строки объединяются, пока число кавычек в записи нечетное.
+    """
+    header = None
+    pending: List[str] = []
+    start_line = 0
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not pending:
+            start_line = line_no
+        pending.append(line)
+        record = "\n".join(pending)
+        if record.count('"') % 2:
+            continue
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            unknown = set(header) - set(CSV_COLUMNS)
+            if unknown:
+                raise RowError(f"Неизвестные колонки CSV: {', '.join(sorted(unknown))}")
+            continue
+        if len(values) != len(header):
+            yield start_line, RowError(
+                f"Ожидалось {len(header)} значений, получено {len(values)}"
+            )
+            continue
+        yield start_line, {name: (value if value != "" else None) for name, value in zip(header, values)}
+    if pending:
+        yield start_line, RowError("Незакрытая кавычка в последней записи")
+
+
+# ============ ПРОВЕРКА СТРОК ============
+
+def _optional_int(raw: dict, name: str) -> Optional[int]:
+    value = raw.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise RowError(f"Поле {name} должно быть целым числом")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"Поле {name} должно быть целым числом")
+
+
+def validate_document(raw: dict, default_owner_id: Optional[int], now: datetime) -> dict:
+    """Проверить строку и привести ее к значениям колонок documents"""
+    title = raw.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise RowError("Поле title обязательно")
+    if len(title) > TITLE_MAX_LENGTH:
+        raise RowError(f"Поле title длиннее {TITLE_MAX_LENGTH} символов")
+
+    content = raw.get("content")
+    if content is None:
+        content = ""
+    if not isinstance(content, str):
+        raise RowError("Поле content должно быть строкой")
+
+    status = raw.get("status") or "draft"
+    if status not in DOCUMENT_STATUSES:
+        raise RowError(f"Некорректный статус: {status}")
+
+    owner_id = _optional_int(raw, "owner_id")
+    if owner_id is None:
+        owner_id = default_owner_id
+    if owner_id is None:
+        raise RowError("Поле owner_id обязательно")
+
+    return {
+        "title": title,
+        "content": content,
+        "content_preview": make_preview(content),
+        "folder_id": _optional_int(raw, "folder_id"),
+        "owner_id": owner_id,
+        "status": status,
+        "created_at": now,
+        "updated_at": now,
+        "version": 1,
+    }
+
+
+# ============ ВСТАВКА ============
+
+def choose_method(db: AsyncSession, requested: str = "auto") -> str:
+    """copy - только для PostgreSQL через asyncpg, иначе многострочный INSERT"""
+    dialect = db.bind.dialect
+    copy_supported = dialect.name == "postgresql" and dialect.driver == "asyncpg"
+    if requested == "copy" and not copy_supported:
+        raise ValueError("COPY поддерживается только для PostgreSQL (asyncpg)")
+    if requested == "auto":
+        return "copy" if copy_supported else "insert"
+    return requested
+
+
+async def insert_many(
+    db: AsyncSession,
+    table: Table,
+    rows: Sequence[dict],
+    method: str = "insert",
+    returning: Sequence = (),
+) -> list:
+    """Вставить пачку строк; с returning - вернуть указанные колонки в порядке rows
+
+    События ORM при такой вставке не срабатывают, поэтому кэш прав
+    сбрасывается явно после COMMIT.
+    """
+    if not rows:
+        return []
+    permissions.invalidate_on_commit(db.sync_session, table.name)
+    if returning:
+        result = await db.execute(
+            insert(table).returning(*returning, sort_by_parameter_order=True), list(rows)
+        )
+        return result.all()
+    if method == "copy":
+        columns = list(rows[0].keys())
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+        return []
+    # SQLAlchemy собирает executemany в многострочные INSERT ... VALUES (...), (...)
+    await db.execute(insert(table), list(rows))
+    return []
+
+
+async def _existing_ids(db: AsyncSession, column, ids: set) -> set:
+    if not ids:
+        return set()
+    result = await db.execute(select(column).where(column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def _flush_documents(db: AsyncSession, batch: List[Tuple[int, dict]], report: BulkLoadReport):
+    """Проверить ссылки пачки (по одному запросу на таблицу) и вставить корректные строки"""
+    owners = await _existing_ids(db, User.id, {row["owner_id"] for _, row in batch})
+    folders = await _existing_ids(
+        db, Folder.id, {row["folder_id"] for _, row in batch if row["folder_id"] is not None}
+    )
+
+    rows = []
+    for line_no, row in batch:
+        if row["owner_id"] not in owners:
+            report.add_error(line_no, f"Пользователь с ID {row['owner_id']} не найден")
+        elif row["folder_id"] is not None and row["folder_id"] not in folders:
+            report.add_error(line_no, f"Папка с ID {row['folder_id']} не найдена")
+        else:
+            rows.append(row)
+
+    await insert_many(db, Document.__table__, rows, method=report.method)
+    await statistics.bump(db, "documents", "total", len(rows))
+    by_status: Dict[str, int] = {}
+    for row in rows:
+        by_status[row["status"]] = by_status.get(row["status"], 0) + 1
+    for status, count in by_status.items():
+        await statistics.bump(db, "documents.status", status, count)
+    await db.commit()
+    report.inserted += len(rows)
+
+
+async def load_documents(
+    db: AsyncSession,
+    records: AsyncIterable[Tuple[int, object]],
+    default_owner_id: Optional[int] = None,
+    method: str = "auto",
+    chunk_size: Optional[int] = None,
+) -> BulkLoadReport:
+    """Загрузить документы из потока записей; каждая пачка - отдельная транзакция"""
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    report = BulkLoadReport(choose_method(db, method), settings.BULK_MAX_ERRORS)
+    now = datetime.utcnow()
+    batch: List[Tuple[int, dict]] = []
+
+    async for line_no, raw in records:
+        report.received += 1
+        if isinstance(raw, RowError):
+            report.add_error(line_no, str(raw))
+            continue
+        try:
+            batch.append((line_no, validate_document(raw, default_owner_id, now)))
+        except RowError as e:
+            report.add_error(line_no, str(e))
+            continue
+        if len(batch) >= chunk_size:
+            await _flush_documents(db, batch, report)
+            batch = []
+
+    if batch:
+        await _flush_documents(db, batch, report)
+
+    if report.inserted:
+        # Резервный поисковый индекс перестроится при следующем поиске
+        search.search_index.clear()
+    return report
+
+
+async def insert_folder_tree(
+    db: AsyncSession, folders: Sequence[dict], method: str = "insert"
+) -> List[int]:
+    """Вставить папки с заполнением path без событий ORM на каждую папку
+
+    folders - список dict(name, owner_id, parent_index), где parent_index -
+    индекс родителя в этом же списке (родитель должен идти раньше) или None.
+    Папки вставляются по уровням дерева; возвращаются id в порядке folders.
+    """
+    table = Folder.__table__
+    ids: List[Optional[int]] = [None] * len(folders)
+    paths: List[Optional[str]] = [None] * len(folders)
+    now = datetime.utcnow()
+
+    pending = list(range(len(folders)))
+    while pending:
+        level = [i for i in pending if folders[i].get("parent_index") is None or ids[folders[i]["parent_index"]] is not None]
+        if not level:
+            raise ValueError("Родительская папка должна идти в списке раньше дочерней")
+        level_set = set(level)
+        pending = [i for i in pending if i not in level_set]
+
+        rows = []
+        for i in level:
+            parent_index = folders[i].get("parent_index")
+            rows.append({
+                "name": folders[i]["name"],
+                "owner_id": folders[i]["owner_id"],
+                "parent_id": ids[parent_index] if parent_index is not None else None,
+                "created_at": now,
+                "updated_at": now,
+            })
+        inserted = await insert_many(db, table, rows, returning=[table.c.id])
+        updates = []
+        for i, (folder_id,) in zip(level, inserted):
+            parent_index = folders[i].get("parent_index")
+            ids[i] = folder_id
+            paths[i] = f"{paths[parent_index] if parent_index is not None else '/'}{folder_id}/"
+            updates.append({"folder_id": folder_id, "folder_path": paths[i]})
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("folder_id"))
+            .values(path=bindparam("folder_path")),
+            updates,
+        )
+    await statistics.bump(db, "folders", "total", len(folders))
+    return ids
@@ -0,0 +1,429 @@
+"""
+Лента изменений: события документов, комментариев, пользователей и прав
+
+Изменяющие эндпоинты записывают событие в таблицу change_events в той же
+транзакции, что и само изменение (record/record_many; изменения прав -
+через события модели Permission). Клиент подписывается на документ, папку
+или пользователя (GET /api/changes, Server-Sent Events) и получает события
+сразу после COMMIT вместо периодического опроса.
+
+Порядок событий. id строки берется из последовательности при INSERT, а не
+при COMMIT: транзакция с меньшим id может зафиксироваться позже транзакции
+с большим. Поэтому курсор ленты (id события SSE, Last-Event-ID) - колонка
+position, номер в порядке фиксации:
+- PostgreSQL: событие записывается с position = NULL, после COMMIT
+  уведомление NOTIFY vaultdoc_changes будит воркеры. Воркер под
+  транзакционной advisory-блокировкой нумерует еще не пронумерованные
+  события (sequence_events). Нумерации выполняются строго по очереди, и
+  каждая фиксируется до начала следующей - видимые номера всегда образуют
+  непрерывный префикс: событие с меньшим номером не появится после того,
+  как прочитано событие с большим;
+- другие СУБД (SQLite в тестах и разработке): запись в БД идет по одной
+  транзакции, position = id в той же транзакции.
+
+Доставка:
+- PostgreSQL: каждый воркер держит одно соединение с LISTEN и по
+  уведомлению (и раз в CHANGE_FEED_HEARTBEAT_SECONDS - на случай потерянного
+  уведомления) читает новые события по position и раздает своим подписчикам.
+  LISTEN не работает через PgBouncer в режиме transaction pooling - такому
+  развертыванию нужен прямой DATABASE_URL к PostgreSQL;
+- другие СУБД: события раздаются внутри процесса после COMMIT сессии -
+  подписчики других воркеров их не получат.
+
+Возобновление и память: клиент, переподключившийся с Last-Event-ID,
+получает пропущенное из таблицы. Очередь подключения ограничена
+CHANGE_FEED_QUEUE_SIZE событиями: если клиент не успевает читать, очередь
+сбрасывается и подписка догружает события из таблицы после последней
+отправленной позиции. События хранятся CHANGE_FEED_RETENTION_HOURS часов;
+если Last-Event-ID старше, клиент получает событие reset и должен
+перечитать данные целиком.
+
+Данные события - измененные поля, а не содержимое документа или текст
+комментария.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.change_event import ChangeEvent
+from app.models.document import Document
+from app.models.folder import Folder
+from app.models.permission import Permission
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "vaultdoc_changes"
+# Ключ advisory-блокировки нумерации событий (PostgreSQL)
+SEQUENCE_LOCK_KEY = 0x76646366  # "vdcf"
+# Поле события -> модель объекта подписки
+SUBSCRIPTION_TARGETS = {
+    "document_id": Document,
+    "folder_id": Folder,
+    "user_id": User,
+}
+BACKFILL_PAGE_SIZE = 500
+PRUNE_INTERVAL_SECONDS = 3600
+# Ключ session.info: события транзакции, раздаваемые внутри процесса после COMMIT
+_PENDING = "change_events"
+# Маркер в очереди подписки: догрузить события из таблицы
+RESYNC = object()
+
+SubscriptionKey = Tuple[str, int]
+
+
+# ============ ЗАПИСЬ СОБЫТИЙ ============
+
+def _emit(connection, session: Optional[Session], kind: str, items: List[dict]):
+    """INSERT событий в текущей транзакции connection"""
+    table = ChangeEvent.__table__
+    created_at = datetime.utcnow()
+    rows = [
+        {
+            "kind": kind,
+            "document_id": item.get("document_id"),
+            "folder_id": item.get("folder_id"),
+            "user_id": item.get("user_id"),
+            "data": json.dumps(item.get("data") or {}, ensure_ascii=False, default=str),
+            "created_at": created_at,
+        }
+        for item in items
+    ]
+    ids = connection.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    if connection.dialect.name == "postgresql":
+        # Номер события назначит воркер после COMMIT (sequence_events)
+        connection.execute(select(func.pg_notify(CHANNEL, "")))
+        return
+    # Записи в БД идут по одной транзакции: порядок id совпадает с порядком COMMIT
+    connection.execute(update(table).where(table.c.id.in_(ids)).values(position=table.c.id))
+    if session is not None:
+        session.info.setdefault(_PENDING, []).extend(
+            {
+                "id": event_id,
+                "kind": kind,
+                "document_id": row["document_id"],
+                "folder_id": row["folder_id"],
+                "user_id": row["user_id"],
+                "data": json.loads(row["data"]),
+                "created_at": created_at.isoformat(),
+            }
+            for event_id, row in zip(ids, rows)
+        )
+
+
+async def record_many(db: AsyncSession, kind: str, items: List[dict]):
+    """Записать события в транзакции db; подписчики получат их после COMMIT
+
+    items - словари с ключами document_id, folder_id, user_id (объекты, к
+    которым относится событие) и data (измененные поля).
+    """
+    if items:
+        await db.run_sync(lambda session: _emit(session.connection(), session, kind, items))
+
+
+async def record(
+    db: AsyncSession,
+    kind: str,
+    document_id: Optional[int] = None,
+    folder_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    data: Optional[dict] = None,
+):
+    await record_many(db, kind, [{
+        "document_id": document_id,
+        "folder_id": folder_id,
+        "user_id": user_id,
+        "data": data,
+    }])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    for change in session.info.pop(_PENDING, ()):
+        broker.publish(change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+def _permission_event(connection, target: Permission, kind: str):
+    _emit(connection, object_session(target), kind, [{
+        "document_id": target.entity_id if target.entity_type == "document" else None,
+        "folder_id": target.entity_id if target.entity_type == "folder" else None,
+        "user_id": target.user_id,
+        "data": {
+            "entity_type": target.entity_type,
+            "entity_id": target.entity_id,
+            "can_view": target.can_view,
+            "can_edit": target.can_edit,
+            "can_delete": target.can_delete,
+            "can_manage_access": target.can_manage_access,
+        },
+    }])
+
+
+@event.listens_for(Permission, "after_insert")
+def _on_permission_insert(mapper, connection, target):
+    _permission_event(connection, target, "permission.granted")
+
+
+@event.listens_for(Permission, "after_update")
+def _on_permission_update(mapper, connection, target):
+    _permission_event(connection, target, "permission.updated")
+
+
+@event.listens_for(Permission, "after_delete")
+def _on_permission_delete(mapper, connection, target):
+    _permission_event(connection, target, "permission.revoked")
+
+
+async def sequence_events(db: AsyncSession):
+    """Пронумеровать зафиксированные события без position (PostgreSQL)
+
+    Блокировка держится до COMMIT: следующая нумерация начнется после того,
+    как номера этой станут видны всем.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(SEQUENCE_LOCK_KEY)))
+    await db.execute(text(
+        "UPDATE change_events SET position = nextval('change_events_position_seq') "
+        "WHERE id IN (SELECT id FROM change_events WHERE position IS NULL ORDER BY id)"
+    ))
+    await db.commit()
+
+
+# ============ ПОДПИСКИ ============
+
+class Subscription:
+    """Очередь событий одного подключения (не больше CHANGE_FEED_QUEUE_SIZE)"""
+
+    def __init__(self, key: SubscriptionKey, queue_size: int):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def deliver(self, change: dict):
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.resync()
+
+    def resync(self):
+        """Заменить очередь маркером догрузки: пропущенное прочитается из таблицы"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+
+
+class ChangeBroker:
+    """Раздача событий подписчикам процесса; для PostgreSQL - чтение по NOTIFY"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[SubscriptionKey, Set[Subscription]] = {}
+        self.subscriber_count = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+
+    def subscribe(self, key: SubscriptionKey) -> Subscription:
+        subscription = Subscription(key, self.queue_size)
+        self._subscriptions.setdefault(key, set()).add(subscription)
+        self.subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscriptions.get(subscription.key)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscriptions[subscription.key]
+        self.subscriber_count -= 1
+
+    def publish(self, change: dict):
+        for field in SUBSCRIPTION_TARGETS:
+            value = change.get(field)
+            if value is None:
+                continue
+            for subscription in tuple(self._subscriptions.get((field, value), ())):
+                subscription.deliver(change)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._wake.set()
+
+    async def _listen_loop(self):
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+                    lost = asyncio.Event()
+                    driver.add_termination_listener(lambda _: lost.set())
+                    await driver.add_listener(CHANNEL, self._on_notify)
+                    # Пока соединения не было, уведомления терялись
+                    self._wake.set()
+                    await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Соединение LISTEN ленты изменений потеряно: %s", e)
+            await asyncio.sleep(1)
+
+    async def _pump_loop(self):
+        """Нумерация новых событий и раздача их подписчикам в порядке position"""
+        async with AsyncSessionLocal() as db:
+            watermark = await db.scalar(select(func.max(ChangeEvent.position))) or 0
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.CHANGE_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await sequence_events(db)
+                    while True:
+                        rows = (await db.scalars(
+                            select(ChangeEvent)
+                            .where(ChangeEvent.position > watermark)
+                            .order_by(ChangeEvent.position)
+                            .limit(BACKFILL_PAGE_SIZE)
+                        )).all()
+                        for row in rows:
+                            watermark = row.position
+                            self.publish(_as_event(row))
+                        if len(rows) < BACKFILL_PAGE_SIZE:
+                            break
+            except Exception as e:
+                logger.warning("Ошибка чтения ленты изменений: %s", e)
+
+    async def _prune_loop(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await prune(db)
+            except Exception as e:
+                logger.warning("Ошибка очистки ленты изменений: %s", e)
+            await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+
+    def start(self):
+        """Запустить чтение событий по NOTIFY (PostgreSQL) и очистку старых событий"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        if async_engine.dialect.name == "postgresql":
+            self._tasks.append(loop.create_task(self._listen_loop()))
+            self._tasks.append(loop.create_task(self._pump_loop()))
+        self._tasks.append(loop.create_task(self._prune_loop()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+broker = ChangeBroker(queue_size=settings.CHANGE_FEED_QUEUE_SIZE)
+
+
+async def prune(db: AsyncSession):
+    """Удалить события старше CHANGE_FEED_RETENTION_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.CHANGE_FEED_RETENTION_HOURS)
+    await db.execute(delete(ChangeEvent).where(ChangeEvent.created_at < cutoff))
+    await db.commit()
+
+
+# ============ ПОТОК SSE ============
+
+async def target_exists(db: AsyncSession, key: SubscriptionKey) -> bool:
+    field, value = key
+    model = SUBSCRIPTION_TARGETS[field]
+    return await db.scalar(select(model.id).where(model.id == value)) is not None
+
+
+def _as_event(row: ChangeEvent) -> dict:
+    return {
+        "id": row.position,
+        "kind": row.kind,
+        "document_id": row.document_id,
+        "folder_id": row.folder_id,
+        "user_id": row.user_id,
+        "data": json.loads(row.data) if row.data else {},
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def format_event(change: dict) -> bytes:
+    return (
+        f"id: {change['id']}\n"
+        f"event: {change['kind']}\n"
+        f"data: {json.dumps(change, ensure_ascii=False)}\n\n"
+    ).encode("utf-8")
+
+
+async def _backfill(key: SubscriptionKey, after: int) -> AsyncIterator[dict]:
+    """События подписки с position > after по страницам (соединение не удерживается)"""
+    column = getattr(ChangeEvent, key[0])
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(ChangeEvent)
+                .where(column == key[1], ChangeEvent.position > after)
+                .order_by(ChangeEvent.position)
+                .limit(BACKFILL_PAGE_SIZE)
+            )).all()
+        for row in rows:
+            after = row.position
+            yield _as_event(row)
+        if len(rows) < BACKFILL_PAGE_SIZE:
+            return
+
+
+async def stream(key: SubscriptionKey, last_event_id: Optional[int]) -> AsyncIterator[bytes]:
+    """Поток SSE подписки: пропущенные после last_event_id события, затем новые"""
+    # Подписка до чтения таблицы - события между ними попадут в очередь
+    subscription = broker.subscribe(key)
+    try:
+        async with AsyncSessionLocal() as db:
+            oldest, newest = (await db.execute(
+                select(func.min(ChangeEvent.position), func.max(ChangeEvent.position))
+            )).one()
+        if last_event_id is None:
+            last_position = newest or 0
+        else:
+            last_position = last_event_id
+            if oldest is not None and last_event_id < oldest - 1:
+                # Часть событий после last_event_id уже удалена по сроку хранения
+                yield b"event: reset\ndata: {}\n\n"
+            subscription.deliver(RESYNC)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    subscription.queue.get(), settings.CHANGE_FEED_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if item is RESYNC:
+                async for change in _backfill(key, last_position):
+                    last_position = change["id"]
+                    yield format_event(change)
+                continue
+            # Позиции раздаются по возрастанию: меньшая или равная уже отправлена при догрузке
+            if item["id"] <= last_position:
+                continue
+            last_position = item["id"]
+            yield format_event(item)
+    finally:
+        broker.unsubscribe(subscription)
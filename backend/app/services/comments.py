@@ -0,0 +1,269 @@
+"""
+Комментарии к документам: постраничная выдача и счетчик комментариев документа
+
+Комментарии документа выдаются курсорными страницами по ключу
+(created_at, id) в обе стороны - новые первыми (desc) или старые первыми
+(asc). Запрос страницы - диапазон по индексу
+ix_document_comments_document_id_created_at_id, стоимость не зависит от
+числа комментариев и глубины страницы.
+
+Документ хранит число своих комментариев в documents.comment_count. Его
+увеличивает add_comment атомарным UPDATE ... SET comment_count = comment_count + 1
+в той же транзакции, что и INSERT комментария; списки и бейджи берут число
+из строки документа без COUNT(*). После массовой вставки комментариев в
+обход API счетчики пересчитываются recount_comments.
+
+Групповая запись (COMMENTS_GROUP_COMMIT=True): комментарии, пришедшие за
+COMMENTS_GROUP_COMMIT_WINDOW_MS, записываются одной транзакцией - один
+многострочный INSERT ... RETURNING, одно обновление счетчиков и один COMMIT
+(одна синхронизация журнала БД на пачку вместо одной на комментарий).
+События ленты изменений (comment.added) пачки - тоже один INSERT.
+Существование документа и автора проверяет БД внешними ключами; если пачка
+нарушает их, строки повторяются по одной в точках сохранения, и ошибку
+получает только автор неверной строки. Пачки копятся в пределах процесса.
+"""
+import asyncio
+import contextvars
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.core import http_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import encode_cursor
+from app.models.comment import DocumentComment
+from app.models.document import Document
+from app.models.user import User
+from app.services import changefeed, statistics
+
+COMMENT_ORDERS = ("desc", "asc")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def cursor_sort(order: str) -> str:
+    # Курсор, выданный для одного направления, не принимается для другого
+    return f"created_at_{order}"
+
+
+def page_query(document_id: int, order: str, after: Optional[List], limit: int):
+    """Страница комментариев документа (+1 строка - признак следующей страницы)"""
+    key = tuple_(DocumentComment.created_at, DocumentComment.id)
+    query = (
+        select(DocumentComment)
+        .options(joinedload(DocumentComment.author))
+        .where(DocumentComment.document_id == document_id)
+    )
+    if order == "desc":
+        if after:
+            query = query.where(key < tuple_(*after))
+        query = query.order_by(DocumentComment.created_at.desc(), DocumentComment.id.desc())
+    else:
+        if after:
+            query = query.where(key > tuple_(*after))
+        query = query.order_by(DocumentComment.created_at.asc(), DocumentComment.id.asc())
+    return query.limit(limit + 1)
+
+
+def next_cursor(order: str, last_comment: Optional[DocumentComment]) -> Optional[str]:
+    if last_comment is None:
+        return None
+    return encode_cursor(cursor_sort(order), [last_comment.created_at, last_comment.id])
+
+
+def increment_count(document_id: int, delta: int = 1):
+    """UPDATE счетчика комментариев документа (атомарно на стороне БД)"""
+    return (
+        update(Document.__table__)
+        .where(Document.__table__.c.id == document_id)
+        .values(comment_count=Document.__table__.c.comment_count + delta)
+    )
+
+
+async def recount_comments(db: AsyncSession, document_ids: Optional[Iterable[int]] = None):
+    """Пересчитать comment_count по таблице комментариев (все документы или указанные)
+
+    Выполняется в транзакции вызывающего кода.
+    """
+    documents = Document.__table__
+    comments = DocumentComment.__table__
+    count = (
+        select(func.count())
+        .where(comments.c.document_id == documents.c.id)
+        .scalar_subquery()
+    )
+    statement = update(documents).values(comment_count=count)
+    if document_ids is not None:
+        statement = statement.where(documents.c.id.in_(list(document_ids)))
+    await db.execute(statement)
+
+
+# ============ ГРУППОВАЯ ЗАПИСЬ ============
+
+class CommentTargetNotFound(LookupError):
+    """Документ или автор комментария не существует (нарушен внешний ключ)"""
+
+
+# (document_id, user_id, comment, created_at)
+PendingComment = Tuple[int, int, str, datetime]
+
+
+class CommentBatcher:
+    """Собирает одновременные комментарии в пачки с одной транзакцией на пачку"""
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: List[Tuple[PendingComment, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def add(self, document_id: int, user_id: int, comment: str) -> dict:
+        """Поставить комментарий в пачку и дождаться его записи
+
+        Возвращает созданный комментарий (id, document_id, user_id, comment,
+        author_name, created_at) или выбрасывает CommentTargetNotFound.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((document_id, user_id, comment, datetime.utcnow()), future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Пустой контекст: иначе задача унаследует contextvars запроса,
+            # открывшего окно, и SQL всей пачки засчитается в его бюджет запросов
+            task = asyncio.get_running_loop().create_task(
+                self._flush(batch), context=contextvars.Context()
+            )
+            # Ссылка на задачу - чтобы ее не собрал сборщик мусора до завершения
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def close(self):
+        """Записать накопленное и дождаться текущих пачек (остановка приложения)"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _flush(self, batch: List[Tuple[PendingComment, asyncio.Future]]):
+        try:
+            async with AsyncSessionLocal() as db:
+                results = await _write_batch(db, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # запрос отменен клиентом, комментарий при этом записан
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+async def _insert_rows(db: AsyncSession, items: List[PendingComment]) -> list:
+    table = DocumentComment.__table__
+    result = await db.execute(
+        insert(table).returning(
+            table.c.id, table.c.document_id, table.c.user_id, table.c.comment, table.c.created_at,
+            sort_by_parameter_order=True,
+        ),
+        [
+            {"document_id": document_id, "user_id": user_id, "comment": comment, "created_at": created_at}
+            for document_id, user_id, comment, created_at in items
+        ],
+    )
+    return result.all()
+
+
+async def _insert_one_by_one(db: AsyncSession, items: List[PendingComment]) -> list:
+    """Повтор пачки по строкам в точках сохранения: неверные строки - исключения"""
+    rows = []
+    for item in items:
+        try:
+            async with db.begin_nested():
+                rows.extend(await _insert_rows(db, [item]))
+        except IntegrityError:
+            document_exists = await db.scalar(select(Document.id).where(Document.id == item[0]))
+            rows.append(CommentTargetNotFound(
+                f"Пользователь с ID {item[1]} не найден" if document_exists
+                else f"Документ с ID {item[0]} не найден"
+            ))
+    return rows
+
+
+async def _write_batch(db: AsyncSession, items: List[PendingComment]) -> list:
+    """Записать пачку одной транзакцией; результат - словарь или исключение на строку"""
+    try:
+        async with db.begin_nested():
+            rows = await _insert_rows(db, items)
+    except IntegrityError:
+        rows = await _insert_one_by_one(db, items)
+
+    created = [row for row in rows if not isinstance(row, Exception)]
+    per_document: Dict[int, int] = {}
+    for row in created:
+        per_document[row.document_id] = per_document.get(row.document_id, 0) + 1
+    authors = {}
+    if created:
+        documents = Document.__table__
+        await db.execute(
+            update(documents)
+            .where(documents.c.id == bindparam("target_id"))
+            .values(comment_count=documents.c.comment_count + bindparam("delta")),
+            # Строки блокируются в порядке id: параллельные пачки (в т.ч. других
+            # воркеров) не захватят одни и те же документы в разном порядке
+            [{"target_id": document_id, "delta": delta} for document_id, delta in sorted(per_document.items())],
+        )
+        await statistics.bump(db, "comments", "total", len(created))
+        folders = dict((await db.execute(
+            select(Document.id, Document.folder_id).where(Document.id.in_(per_document))
+        )).all())
+        await changefeed.record_many(db, "comment.added", [
+            {
+                "document_id": row.document_id,
+                "folder_id": folders.get(row.document_id),
+                "data": {"comment_id": row.id, "author_id": row.user_id},
+            }
+            for row in created
+        ])
+        authors = dict((await db.execute(
+            select(User.id, User.full_name).where(User.id.in_({row.user_id for row in created}))
+        )).all())
+    await db.commit()
+
+    for document_id in per_document:
+        http_cache.invalidate_document(document_id)
+    return [
+        row if isinstance(row, Exception) else {
+            "id": row.id,
+            "document_id": row.document_id,
+            "user_id": row.user_id,
+            "comment": row.comment,
+            "author_name": authors.get(row.user_id),
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
+
+
+batcher = CommentBatcher(
+    window_ms=settings.COMMENTS_GROUP_COMMIT_WINDOW_MS,
+    max_batch=settings.COMMENTS_GROUP_COMMIT_MAX_BATCH,
+)
@@ -0,0 +1,308 @@
+"""
+Фрагментированное хранилище содержимого документов
+
+Текст документа дополнительно хранится фрагментами по CONTENT_CHUNK_SIZE
+символов в таблице document_content_chunks. Для каждого фрагмента известна
+длина в байтах UTF-8, поэтому запрос Range: bytes=a-b читает из БД только
+фрагменты, попадающие в диапазон, и отдает их потоком.
+
+Фрагменты помечены версией документа. Если документ изменен другим путем
+(PUT /api/documents/{id}, массовая загрузка), фрагменты перестраиваются при
+первом чтении новой версии - один раз на версию; каждый запрос перестройки
+ограничен этой версией, и если документ изменен во время чтения, перестройка
+прерывается ошибкой ContentChanged. Загрузка через
+PUT /api/documents/{id}/content пишет фрагменты сразу по мере чтения тела
+запроса, а Document.content собирается из них на стороне БД.
+
+Тело ответа читается после отправки Content-Length, в отдельной сессии.
+Поэтому новая версия фрагментов записывается рядом с предыдущей, а не
+вместо нее: ответ, начатый по предыдущей версии, дочитывает свои фрагменты.
+Удаляются наборы старше предыдущего. Если фрагмент все же пропал (версия
+сменилась дважды за время ответа), ответ обрывается ошибкой ChunkMissing,
+а не отдает укороченное или чужое содержимое.
+"""
+import codecs
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.document import Document
+from app.models.document_chunk import DocumentContentChunk
+
+# charset=utf-8 к text/* добавляет Starlette
+CONTENT_MEDIA_TYPE = "text/plain"
+# Сколько символов начала текста вернуть вызывающему коду для превью
+HEAD_LENGTH = 200
+# Сколько фрагментов перестройка читает из Document.content за один запрос
+REBUILD_BATCH = 16
+
+# (номер фрагмента, длина в байтах)
+Layout = List[Tuple[int, int]]
+
+
+class RangeNotSatisfiable(ValueError):
+    """Запрошенный диапазон лежит за пределами содержимого"""
+
+
+class ContentTooLarge(ValueError):
+    """Загружаемое содержимое больше CONTENT_MAX_UPLOAD_BYTES"""
+
+
+class ChunkMissing(RuntimeError):
+    """Фрагмент версии удален, пока отдавался ответ"""
+
+
+class ContentChanged(RuntimeError):
+    """Документ изменен, пока читался текст его версии"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Разобрать Range: bytes=a-b | a- | -n; вернуть (начало, конец) включительно
+
+    None - заголовка нет или он не поддерживается (несколько диапазонов, другие
+    единицы): по RFC 9110 такой Range можно игнорировать и отдать весь ответ.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Последние n байт
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+# ============ РАСКЛАДКА ФРАГМЕНТОВ ============
+
+async def _drop_superseded(db: AsyncSession, document_id: int):
+    """Удалить наборы фрагментов старше последнего записанного
+
+    Вызывается перед записью новой версии: последний набор становится
+    предыдущим и остается для начатых ответов.
+    """
+    chunks = DocumentContentChunk.__table__
+    latest = (
+        select(func.max(chunks.c.version))
+        .where(chunks.c.document_id == document_id)
+        .scalar_subquery()
+    )
+    await db.execute(delete(chunks).where(chunks.c.document_id == document_id, chunks.c.version < latest))
+
+
+async def iter_text(
+    db: AsyncSession, document_id: int, version: int, batch: int = REBUILD_BATCH
+) -> AsyncIterator[List[str]]:
+    """Текст версии документа порциями по batch фрагментов CONTENT_CHUNK_SIZE символов
+
+    Текст целиком не загружается: за один запрос БД отдает порцию фрагментов
+    через substr. Каждый запрос ограничен версией документа, поэтому порции
+    разных версий не смешиваются: если версия сменилась между запросами,
+    строка не находится и выбрасывается ContentChanged.
+    """
+    size = settings.CONTENT_CHUNK_SIZE
+    pinned = (Document.id == document_id, Document.version == version)
+    row = (await db.execute(select(func.length(Document.content)).where(*pinned))).one_or_none()
+    if row is None:
+        raise ContentChanged(f"Версия {version} документа {document_id} больше не актуальна")
+    count = max(1, -(-(row[0] or 0) // size))
+    for first in range(0, count, batch):
+        indexes = range(first, min(first + batch, count))
+        pieces = (await db.execute(
+            select(*(func.substr(Document.content, index * size + 1, size) for index in indexes))
+            .where(*pinned)
+        )).one_or_none()
+        if pieces is None:
+            raise ContentChanged(f"Документ {document_id} изменен во время чтения версии {version}")
+        yield [data or "" for data in pieces]
+
+
+async def _rebuild(db: AsyncSession, document_id: int, version: int) -> Layout:
+    """Перестроить фрагменты из Document.content (один раз на версию документа)
+
+    Порции текста из iter_text сразу записываются, и читается следующая.
+    Если документ изменен во время перестройки - ContentChanged, и
+    незафиксированная транзакция откатывается при закрытии сессии.
+    """
+    chunks = DocumentContentChunk.__table__
+    await _drop_superseded(db, document_id)
+    layout = []
+    async for pieces in iter_text(db, document_id, version):
+        rows = []
+        for data in pieces:
+            rows.append({
+                "document_id": document_id,
+                "chunk_index": len(layout) + len(rows),
+                "data": data,
+                "byte_length": len(data.encode("utf-8")),
+                "version": version,
+            })
+        await db.execute(insert(chunks), rows)
+        layout.extend((row["chunk_index"], row["byte_length"]) for row in rows)
+    await db.commit()
+    return layout
+
+
+async def _read_layout(db: AsyncSession, document_id: int, version: int) -> Layout:
+    chunks = DocumentContentChunk.__table__
+    result = await db.execute(
+        select(chunks.c.chunk_index, chunks.c.byte_length)
+        .where(chunks.c.document_id == document_id, chunks.c.version == version)
+        .order_by(chunks.c.chunk_index)
+    )
+    return [tuple(row) for row in result]
+
+
+async def chunk_layout(db: AsyncSession, document_id: int, version: int) -> Layout:
+    """Номера и байтовые длины фрагментов версии документа (без самого текста)
+
+    Сессия вызывающего кода только читает: отсутствующие фрагменты
+    перестраиваются в собственной сессии и транзакции.
+    """
+    layout = await _read_layout(db, document_id, version)
+    if layout:
+        return layout
+    async with AsyncSessionLocal() as rebuild_db:
+        try:
+            return await _rebuild(rebuild_db, document_id, version)
+        except IntegrityError:
+            # Фрагменты той же версии одновременно построил другой запрос
+            await rebuild_db.rollback()
+            return await _read_layout(rebuild_db, document_id, version)
+
+
+def content_size(layout: Layout) -> int:
+    return sum(byte_length for _, byte_length in layout)
+
+
+async def stream_range(
+    document_id: int, version: int, layout: Layout, start: int, end: int
+) -> AsyncIterator[bytes]:
+    """Байты [start, end] содержимого; читаются только нужные фрагменты
+
+    Выполняется в собственной сессии: тело ответа отдается после выхода из
+    эндпоинта. Отсутствующий фрагмент версии - ChunkMissing.
+    """
+    if end < start:
+        return
+    # Смещение начала каждого фрагмента
+    wanted = []
+    offset = 0
+    for index, byte_length in layout:
+        if offset + byte_length > start and offset <= end:
+            wanted.append((index, offset))
+        offset += byte_length
+    if not wanted:
+        return
+    offsets = dict(wanted)
+
+    chunks = DocumentContentChunk.__table__
+    query = (
+        select(chunks.c.chunk_index, chunks.c.data)
+        .where(
+            chunks.c.document_id == document_id,
+            chunks.c.version == version,
+            chunks.c.chunk_index.between(wanted[0][0], wanted[-1][0]),
+        )
+        .order_by(chunks.c.chunk_index)
+        .execution_options(yield_per=4)
+    )
+    expected = wanted[0][0]
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for index, data in result:
+            if index != expected:
+                break
+            raw = data.encode("utf-8")
+            chunk_start = offsets[index]
+            yield raw[max(0, start - chunk_start):end - chunk_start + 1]
+            expected += 1
+    if expected <= wanted[-1][0]:
+        raise ChunkMissing(
+            f"Фрагмент {expected} версии {version} документа {document_id} удален во время чтения"
+        )
+
+
+# ============ ЗАГРУЗКА ПО ЧАСТЯМ ============
+
+async def write_chunks(
+    db: AsyncSession, document_id: int, version: int, body: AsyncIterable[bytes]
+) -> Tuple[int, int, str]:
+    """Записать поток UTF-8 фрагментами версии version (в транзакции вызывающего кода)
+
+    Возвращает (размер в байтах, число фрагментов, начало текста). В памяти
+    одновременно не больше одного фрагмента и одного блока тела запроса.
+    """
+    chunks = DocumentContentChunk.__table__
+    chunk_size = settings.CONTENT_CHUNK_SIZE
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    await _drop_superseded(db, document_id)
+
+    total_bytes = 0
+    count = 0
+    head = ""
+    buffer = ""
+
+    async def flush(data: str):
+        nonlocal count
+        await db.execute(insert(chunks).values(
+            document_id=document_id,
+            chunk_index=count,
+            data=data,
+            byte_length=len(data.encode("utf-8")),
+            version=version,
+        ))
+        count += 1
+
+    async for block in body:
+        total_bytes += len(block)
+        if total_bytes > settings.CONTENT_MAX_UPLOAD_BYTES:
+            raise ContentTooLarge(
+                f"Содержимое больше {settings.CONTENT_MAX_UPLOAD_BYTES} байт"
+            )
+        text = decoder.decode(block)
+        if len(head) < HEAD_LENGTH:
+            head += text[:HEAD_LENGTH - len(head)]
+        buffer += text
+        while len(buffer) >= chunk_size:
+            await flush(buffer[:chunk_size])
+            buffer = buffer[chunk_size:]
+
+    # Незавершенная последовательность UTF-8 в конце - UnicodeDecodeError
+    buffer += decoder.decode(b"", final=True)
+    if buffer or not count:
+        await flush(buffer)
+    return total_bytes, count, head
+
+
+def assembled_content(db: AsyncSession, document_id: int, version: int):
+    """Скалярный подзапрос: текст версии, склеенный из фрагментов на стороне БД"""
+    chunks = DocumentContentChunk.__table__
+    if db.bind.dialect.name == "postgresql":
+        return (
+            select(func.string_agg(chunks.c.data, aggregate_order_by(literal_column("''"), chunks.c.chunk_index)))
+            .where(chunks.c.document_id == document_id, chunks.c.version == version)
+            .scalar_subquery()
+        )
+    ordered = (
+        select(chunks.c.data)
+        .where(chunks.c.document_id == document_id, chunks.c.version == version)
+        .order_by(chunks.c.chunk_index)
+        .subquery()
+    )
+    return select(func.group_concat(ordered.c.data, "")).scalar_subquery()
@@ -0,0 +1,227 @@
+"""
+Потоковая выгрузка таблиц в NDJSON или CSV для GET /api/export/{entity}
+
+Строки читаются курсором на стороне сервера (AsyncSession.stream с yield_per)
+порциями по EXPORT_BATCH_SIZE и сразу отдаются клиенту, поэтому память воркера
+не зависит от объема выгрузки. Выгрузка идет в собственной сессии: сессия
+запроса к моменту отправки тела ответа может быть уже закрыта.
+
+Длинный текст (содержимое документа) не читается в составе строки: если он
+длиннее INLINE_TEXT_CHARS, курсор отдает вместо него NULL и длину, а сам
+текст читается частями по CONTENT_CHUNK_SIZE символов (content_store.iter_text,
+с привязкой к версии документа) и сразу отправляется. Поэтому память
+ограничена объемом порции, а не числом строк в ней. На PostgreSQL выгрузка
+читает один снимок БД (REPEATABLE READ), и версия документа не меняется
+между чтением строки и ее текста.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import case, func, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.comment import DocumentComment
+from app.models.document import Document
+from app.models.permission import Permission
+from app.services import content_store
+
+EXPORT_BATCH_SIZE = 1000
+# Тексты длиннее выгружаются частями, а не в составе строки
+INLINE_TEXT_CHARS = 8192
+# Порция документов: не больше DOCUMENTS_BATCH_SIZE * INLINE_TEXT_CHARS символов текста
+DOCUMENTS_BATCH_SIZE = 100
+# charset=utf-8 к text/* добавляет Starlette
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportSpec:
+    """Выгружаемые колонки и допустимые фильтры (имя параметра -> (колонка, оператор))
+
+    streamed - колонка с длинным текстом документа, который выгружается
+    частями (нужны колонки id и version).
+    """
+
+    def __init__(self, table, columns, filters: Dict[str, tuple], batch_size: int, streamed: Optional[str]):
+        self.table = table
+        self.columns = columns
+        self.filters = filters
+        self.batch_size = batch_size
+        self.streamed = streamed
+
+
+def _spec(model, columns, filters, batch_size=EXPORT_BATCH_SIZE, streamed=None):
+    table = model.__table__
+    return ExportSpec(
+        table,
+        [table.c[name] for name in columns],
+        {name: (table.c[column], op) for name, (column, op) in filters.items()},
+        batch_size,
+        streamed,
+    )
+
+
+EXPORTS = {
+    "documents": _spec(
+        Document,
+        ["id", "title", "content", "folder_id", "owner_id", "status", "version", "created_at", "updated_at"],
+        {
+            "status": ("status", "eq"),
+            "folder_id": ("folder_id", "eq"),
+            "owner_id": ("owner_id", "eq"),
+            "updated_since": ("updated_at", "ge"),
+        },
+        batch_size=DOCUMENTS_BATCH_SIZE,
+        streamed="content",
+    ),
+    "comments": _spec(
+        DocumentComment,
+        ["id", "document_id", "user_id", "comment", "created_at"],
+        {
+            "document_id": ("document_id", "eq"),
+            "user_id": ("user_id", "eq"),
+            "created_since": ("created_at", "ge"),
+        },
+    ),
+    "permissions": _spec(
+        Permission,
+        ["id", "user_id", "entity_type", "entity_id", "can_view", "can_edit", "can_delete",
+         "can_manage_access", "granted_by", "granted_at"],
+        {
+            "user_id": ("user_id", "eq"),
+            "entity_type": ("entity_type", "eq"),
+            "entity_id": ("entity_id", "eq"),
+        },
+    ),
+}
+
+
+def build_query(spec: ExportSpec, filters: Dict[str, object]):
+    """SELECT по колонкам выгрузки; фильтры, не поддерживаемые сущностью, - ValueError
+
+    Вместо длинного текста колонки streamed выбирается NULL, а последней
+    колонкой добавляется длина текста.
+    """
+    columns = list(spec.columns)
+    if spec.streamed:
+        text = spec.table.c[spec.streamed]
+        columns = [
+            case((func.length(text) <= INLINE_TEXT_CHARS, text)).label(text.name) if column.name == text.name
+            else column
+            for column in columns
+        ]
+        columns.append(func.length(text))
+    query = select(*columns).order_by(spec.table.c.id)
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in spec.filters:
+            raise ValueError(f"Фильтр {name} не поддерживается. Допустимые: {', '.join(spec.filters)}")
+        column, op = spec.filters[name]
+        query = query.where(column >= value if op == "ge" else column == value)
+    return query
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(names, rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(names, map(_value, row))), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def _csv_chunk(rows, header=None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(header)
+    writer.writerows([_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def _text_frame(export_format: str, names, row, position: int) -> Tuple[str, str]:
+    """Строка выгрузки до и после значения колонки position, которое пишется частями"""
+    before = dict(zip(names[:position], map(_value, row[:position])))
+    after = dict(zip(names[position + 1:], map(_value, row[position + 1:])))
+    if export_format == "ndjson":
+        opening = json.dumps(before, ensure_ascii=False)[:-1] + (", " if before else "")
+        closing = (", " if after else "") + json.dumps(after, ensure_ascii=False)[1:]
+        return opening + json.dumps(names[position]) + ': "', '"' + closing + "\n"
+    opening = _csv_chunk([before.values()])[:-1] + "," if before else ""
+    closing = "," + _csv_chunk([after.values()])[:-1] if after else ""
+    # Поле, записываемое частями, всегда в кавычках
+    return opening + '"', '"' + closing + "\n"
+
+
+def _text_piece(export_format: str, piece: str) -> str:
+    if export_format == "ndjson":
+        return json.dumps(piece, ensure_ascii=False)[1:-1]
+    return piece.replace('"', '""')
+
+
+def _chunk(export_format: str, names, rows) -> str:
+    return _ndjson_chunk(names, rows) if export_format == "ndjson" else _csv_chunk(rows)
+
+
+async def stream_rows(
+    entity: str,
+    export_format: str,
+    filters: Dict[str, object],
+    compress: bool = False,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Тело ответа порциями; запрос проверяется до первого yield вызывающим кодом"""
+    spec = EXPORTS[entity]
+    query = build_query(spec, filters).execution_options(yield_per=batch_size or spec.batch_size)
+    names = [column.name for column in spec.columns]
+    if spec.streamed:
+        position = names.index(spec.streamed)
+        id_position, version_position = names.index("id"), names.index("version")
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 - формат gzip
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if export_format == "csv":
+        yield encode(_csv_chunk([], header=names))
+
+    async with AsyncSessionLocal() as db:
+        if db.bind.dialect.name == "postgresql":
+            # Один снимок БД на всю выгрузку: текст читается той же версии, что и строка
+            await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            if not spec.streamed:
+                data = encode(_chunk(export_format, names, rows))
+                if data:
+                    yield data
+                continue
+            inline = []
+            for *row, length in rows:
+                if length is None or length <= INLINE_TEXT_CHARS:
+                    inline.append(row)
+                    continue
+                if inline:
+                    yield encode(_chunk(export_format, names, inline))
+                    inline = []
+                opening, closing = _text_frame(export_format, names, row, position)
+                yield encode(opening)
+                pieces = content_store.iter_text(db, row[id_position], row[version_position], batch=1)
+                async for batch in pieces:
+                    for piece in batch:
+                        yield encode(_text_piece(export_format, piece))
+                yield encode(closing)
+            if inline:
+                yield encode(_chunk(export_format, names, inline))
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,269 @@
+"""
+Полнотекстовый поиск по документам
+
+В PostgreSQL поиск идет по вычисляемой колонке documents.search_vector
+(tsvector + GIN-индекс, см. migrations/versions/0002_pre_migration_schema.py):
+ранжирование через ts_rank_cd, подсветка фрагментов через ts_headline. Фрагменты строятся только
+для строк текущей страницы, а не для всех совпадений.
+
+Для остальных СУБД (SQLite в тестах) используется инвертированный индекс
+в памяти процесса. Он строится при первом поиске и обновляется при изменении
+документов через API.
+"""
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import cast, func, inspect, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import Document
+
+# Параметры подсветки фрагментов (ts_headline и резервный индекс)
+HIGHLIGHT_START = "<b>"
+HIGHLIGHT_STOP = "</b>"
+HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxFragments=2, MaxWords=20, MinWords=5, FragmentDelimiter= ... "
+)
+SNIPPET_RADIUS = 80
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбить текст на слова в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _result_row(row, rank: float, snippet: str) -> dict:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "folder_id": row.folder_id,
+        "owner_id": row.owner_id,
+        "status": row.status,
+        "updated_at": row.updated_at,
+        "rank": round(float(rank), 6),
+        "snippet": snippet,
+    }
+
+
+async def _search_postgres(
+    db: AsyncSession,
+    q: str,
+    status: Optional[str],
+    folder_id: Optional[int],
+    skip: int,
+    limit: int,
+) -> List[dict]:
+    ts_config = cast(literal(settings.SEARCH_TS_CONFIG), REGCONFIG)
+    ts_query = func.websearch_to_tsquery(ts_config, q)
+    search_vector = literal_column("documents.search_vector")
+    rank = func.ts_rank_cd(search_vector, ts_query).label("rank")
+
+    # Сначала ранжируем по индексу и отбираем страницу, и только для нее
+    # вызываем дорогой ts_headline по полному тексту
+    hits = select(Document.id, rank).where(search_vector.op("@@")(ts_query))
+    if status:
+        hits = hits.where(Document.status == status)
+    if folder_id is not None:
+        hits = hits.where(Document.folder_id == folder_id)
+    hits = hits.order_by(rank.desc(), Document.id).offset(skip).limit(limit).subquery()
+
+    snippet = func.ts_headline(ts_config, Document.content, ts_query, HEADLINE_OPTIONS)
+    query = select(
+        Document.id,
+        Document.title,
+        Document.folder_id,
+        Document.owner_id,
+        Document.status,
+        Document.updated_at,
+        hits.c.rank,
+        snippet.label("snippet"),
+    ).join(hits, hits.c.id == Document.id).order_by(hits.c.rank.desc(), Document.id)
+
+    result = await db.execute(query)
+    return [_result_row(row, row.rank, row.snippet) for row in result]
+
+
+class InvertedIndex:
+    """Инвертированный индекс в памяти: слово -> {id документа: частота}
+
+    Хранит только постинги и поля для фильтрации, без текста документов.
+    Ранжирование - TF-IDF с нормализацией на длину документа, заголовок
+    весит больше содержимого (как веса A/B в PostgreSQL).
+    """
+
+    TITLE_WEIGHT = 4
+
+    def __init__(self):
+        self.built = False
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Set[str]] = {}
+        self.doc_length: Dict[int, int] = {}
+        self.doc_meta: Dict[int, tuple] = {}
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, doc_id: int, title: str, content: str, status: str, folder_id: Optional[int]):
+        self.remove(doc_id)
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokenize(title):
+            counts[token] += self.TITLE_WEIGHT
+        for token in tokenize(content):
+            counts[token] += 1
+        for token, tf in counts.items():
+            self.postings[token][doc_id] = tf
+        self.doc_terms[doc_id] = set(counts)
+        self.doc_length[doc_id] = sum(counts.values()) or 1
+        self.doc_meta[doc_id] = (status, folder_id)
+
+    def remove(self, doc_id: int):
+        for token in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+        self.doc_length.pop(doc_id, None)
+        self.doc_meta.pop(doc_id, None)
+
+    def search(self, terms: List[str], status: Optional[str], folder_id: Optional[int]) -> List[tuple]:
+        """Документы, содержащие все слова запроса: [(id, rank)] по убыванию rank"""
+        if not terms:
+            return []
+        posting_lists = []
+        for term in set(terms):
+            docs = self.postings.get(term)
+            if not docs:
+                return []
+            posting_lists.append((term, docs))
+        # Пересечение начинаем с самого короткого списка
+        posting_lists.sort(key=lambda item: len(item[1]))
+        candidates = set(posting_lists[0][1])
+        for _, docs in posting_lists[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        total = len(self.doc_length) or 1
+        scored = []
+        for doc_id in candidates:
+            doc_status, doc_folder_id = self.doc_meta[doc_id]
+            if status and doc_status != status:
+                continue
+            if folder_id is not None and doc_folder_id != folder_id:
+                continue
+            rank = 0.0
+            for _, docs in posting_lists:
+                idf = math.log(1 + total / len(docs))
+                rank += docs[doc_id] / self.doc_length[doc_id] * idf
+            scored.append((doc_id, rank))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+
+# Индекс процесса для СУБД без полнотекстового поиска
+search_index = InvertedIndex()
+
+
+def highlight_snippet(content: str, terms: List[str]) -> str:
+    """Фрагмент текста вокруг первого найденного слова с подсветкой слов запроса"""
+    if not content:
+        return ""
+    wanted = set(terms)
+    first = None
+    for match in TOKEN_RE.finditer(content):
+        if match.group(0).lower() in wanted:
+            first = match
+            break
+    if first is None:
+        start, end = 0, min(len(content), SNIPPET_RADIUS * 2)
+    else:
+        start = max(0, first.start() - SNIPPET_RADIUS)
+        end = min(len(content), first.end() + SNIPPET_RADIUS)
+
+    fragment = content[start:end]
+    fragment = TOKEN_RE.sub(
+        lambda m: f"{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}" if m.group(0).lower() in wanted else m.group(0),
+        fragment,
+    )
+    prefix = "... " if start > 0 else ""
+    suffix = " ..." if end < len(content) else ""
+    return f"{prefix}{fragment}{suffix}"
+
+
+async def _ensure_index(db: AsyncSession):
+    if search_index.built:
+        return
+    result = await db.execute(
+        select(Document.id, Document.title, Document.content, Document.status, Document.folder_id)
+    )
+    for row in result:
+        search_index.add(row.id, row.title, row.content, row.status, row.folder_id)
+    search_index.built = True
+
+
+async def _search_in_memory(
+    db: AsyncSession,
+    q: str,
+    status: Optional[str],
+    folder_id: Optional[int],
+    skip: int,
+    limit: int,
+) -> List[dict]:
+    await _ensure_index(db)
+    terms = tokenize(q)
+    page = search_index.search(terms, status, folder_id)[skip:skip + limit]
+    if not page:
+        return []
+
+    ranks = dict(page)
+    result = await db.execute(
+        select(
+            Document.id,
+            Document.title,
+            Document.content,
+            Document.folder_id,
+            Document.owner_id,
+            Document.status,
+            Document.updated_at,
+        ).where(Document.id.in_(ranks))
+    )
+    rows = {row.id: row for row in result}
+    return [
+        _result_row(rows[doc_id], ranks[doc_id], highlight_snippet(rows[doc_id].content, terms))
+        for doc_id, _ in page
+        if doc_id in rows
+    ]
+
+
+async def search_documents(
+    db: AsyncSession,
+    q: str,
+    status: Optional[str] = None,
+    folder_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> List[dict]:
+    """Найти документы по заголовку и содержимому"""
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgres(db, q, status, folder_id, skip, limit)
+    return await _search_in_memory(db, q, status, folder_id, skip, limit)
+
+
+async def on_document_changed(db: AsyncSession, document: Document):
+    """Обновить резервный индекс после изменения документа через API"""
+    if not search_index.built:
+        return
+    if "content" in inspect(document).unloaded:
+        # Текст не менялся и не загружен (колонка отложенная) - читаем его отдельно
+        content = await db.scalar(select(Document.content).where(Document.id == document.id))
+    else:
+        content = document.content
+    search_index.add(document.id, document.title, content, document.status, document.folder_id)
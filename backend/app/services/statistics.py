@@ -0,0 +1,217 @@
+"""
+Статистика системы для GET /api/statistics
+
+Два способа получения данных:
+- агрегаты: один запрос UNION ALL из GROUP BY по всем таблицам;
+- счетчики (settings.STATS_USE_COUNTERS): чтение таблицы stat_counters за O(1).
+  Эндпоинты, меняющие данные, вызывают bump() в той же транзакции, поэтому
+  изменения через API видны сразу. Изменения в обход API (скрипты, ручной SQL)
+  попадают в счетчики при полном пересчете, который выполняется, если счетчики
+  старше settings.STATS_COUNTERS_MAX_AGE секунд - это и есть граница устаревания.
+  Счетчик хранится в settings.STATS_COUNTER_SHARDS строках (шардах): транзакция
+  изменяет строки своего шарда, а чтение суммирует шарды, поэтому параллельные
+  записи не ждут друг друга на одной строке.
+  Если статистика читается с реплики, пересчет выполняется на основной БД.
+"""
+import random
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, null, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.comment import DocumentComment
+from app.models.document import Document
+from app.models.folder import Folder
+from app.models.permission import Permission
+from app.models.stat_counter import StatCounter
+from app.models.user import User
+
+# Статусы документов выводятся всегда, даже с нулевым количеством
+DOCUMENT_STATUSES = ["draft", "under_review", "approved", "rejected"]
+# Роли пользователей, для которых счетчики заводятся заранее
+USER_ROLES = ["admin", "manager", "accountant", "employee"]
+
+META_SCOPE = "meta"
+REFRESHED_AT_KEY = "refreshed_at"
+# Служебные счетчики (META_SCOPE) хранятся в одном шарде
+META_SHARD = 0
+# Ключ session.info с номером шарда, который изменяют транзакции сессии
+SHARD_INFO_KEY = "stat_counter_shard"
+
+# (раздел, ключ, количество)
+CounterRow = Tuple[str, str, int]
+
+
+def _aggregate_query():
+    """Все счетчики одним запросом: GROUP BY по ролям и статусам + общие количества"""
+    return union_all(
+        select(literal("users.role"), User.role, func.count()).group_by(User.role),
+        select(literal("documents.status"), Document.status, func.count()).group_by(Document.status),
+        select(literal("folders"), null(), func.count()).select_from(Folder),
+        select(literal("permissions"), null(), func.count()).select_from(Permission),
+        select(literal("comments"), null(), func.count()).select_from(DocumentComment),
+    )
+
+
+async def aggregate_counters(db: AsyncSession) -> list:
+    """Посчитать счетчики по данным таблиц"""
+    rows = []
+    users_total = 0
+    documents_total = 0
+    for scope, key, count in await db.execute(_aggregate_query()):
+        if scope == "users.role":
+            users_total += count
+        elif scope == "documents.status":
+            documents_total += count
+        rows.append((scope, key if key is not None else "total", count))
+    rows.append(("users", "total", users_total))
+    rows.append(("documents", "total", documents_total))
+    return rows
+
+
+def build_statistics(rows: Iterable[CounterRow]) -> dict:
+    """Собрать ответ эндпоинта из строк счетчиков"""
+    counters: Dict[str, Dict[str, int]] = {}
+    for scope, key, value in rows:
+        counters.setdefault(scope, {})[key] = value
+
+    def total(scope: str) -> int:
+        return counters.get(scope, {}).get("total", 0)
+
+    by_status = {status: 0 for status in DOCUMENT_STATUSES}
+    by_status.update(counters.get("documents.status", {}))
+    by_status.pop("total", None)
+    by_role = {
+        role: count
+        for role, count in counters.get("users.role", {}).items()
+        if role != "total" and count > 0
+    }
+
+    user_count = total("users")
+    folder_count = total("folders")
+    document_count = total("documents")
+    permission_count = total("permissions")
+    comment_count = total("comments")
+    return {
+        "users": {
+            "total": user_count,
+            "by_role": by_role
+        },
+        "folders": folder_count,
+        "documents": {
+            "total": document_count,
+            "by_status": by_status
+        },
+        "permissions": permission_count,
+        "comments": comment_count,
+        "total_records": user_count + folder_count + document_count + permission_count + comment_count
+    }
+
+
+async def rebuild_counters(db: AsyncSession) -> list:
+    """Полностью пересчитать таблицу stat_counters"""
+    rows = await aggregate_counters(db)
+    await db.execute(delete(StatCounter))
+    counters = {(scope, key): value for scope, key, value in rows}
+    # Нулевые счетчики для известных статусов и ролей, чтобы bump() их находил
+    for status in DOCUMENT_STATUSES:
+        counters.setdefault(("documents.status", status), 0)
+    for role in USER_ROLES:
+        counters.setdefault(("users.role", role), 0)
+    # Значение - в шарде 0, остальные шарды нулевые
+    values = [
+        {"scope": scope, "key": key, "shard": shard, "value": value if shard == 0 else 0}
+        for (scope, key), value in counters.items()
+        for shard in range(settings.STATS_COUNTER_SHARDS)
+    ]
+    values.append({"scope": META_SCOPE, "key": REFRESHED_AT_KEY, "shard": META_SHARD, "value": int(time.time())})
+    await db.execute(insert(StatCounter), values)
+    await db.commit()
+    return rows
+
+
+async def read_counters(db: AsyncSession, rebuild: bool = True) -> Optional[list]:
+    """Прочитать счетчики; пересчитать, если их нет или они старше допустимого
+
+    rebuild=False (сессия реплики только для чтения) - вместо пересчета None.
+    """
+    result = await db.execute(
+        select(StatCounter.scope, StatCounter.key, func.sum(StatCounter.value))
+        .group_by(StatCounter.scope, StatCounter.key)
+    )
+    rows = []
+    refreshed_at = 0
+    for scope, key, value in result:
+        if scope == META_SCOPE:
+            if key == REFRESHED_AT_KEY:
+                refreshed_at = value
+            continue
+        rows.append((scope, key, value))
+
+    if time.time() - refreshed_at <= settings.STATS_COUNTERS_MAX_AGE:
+        return rows
+    if not rebuild:
+        return None
+
+    try:
+        return await rebuild_counters(db)
+    except IntegrityError:
+        # Параллельный запрос пересчитал счетчики раньше нас
+        await db.rollback()
+        return None
+
+
+async def get_statistics(db: AsyncSession, on_replica: bool = False) -> Tuple[dict, str]:
+    """Статистика и ее источник ("counters" или "aggregate")
+
+    on_replica=True - db подключена к реплике только для чтения: устаревшие
+    счетчики пересчитываются в отдельной сессии основной БД.
+    """
+    if settings.STATS_USE_COUNTERS:
+        rows = await read_counters(db, rebuild=not on_replica)
+        if rows is None and on_replica:
+            async with AsyncSessionLocal() as primary:
+                rows = await read_counters(primary)
+        if rows is not None:
+            return build_statistics(rows), "counters"
+    return build_statistics(await aggregate_counters(db)), "aggregate"
+
+
+async def bump(db: AsyncSession, scope: str, key: str = "total", delta: int = 1):
+    """Изменить счетчик на delta в текущей транзакции (до commit вызывающего)
+
+    Сессия выбирает случайный шард один раз, и все ее изменения попадают в
+    строки этого шарда. Если счетчика еще нет (например, первая запись с
+    новой ролью или число шардов увеличено), счетчики помечаются устаревшими
+    и будут пересчитаны при следующем чтении.
+    """
+    if not settings.STATS_USE_COUNTERS or delta == 0 or key is None:
+        return
+    shard = db.info.setdefault(SHARD_INFO_KEY, random.randrange(settings.STATS_COUNTER_SHARDS))
+    result = await db.execute(
+        update(StatCounter)
+        .where(StatCounter.scope == scope, StatCounter.key == key, StatCounter.shard == shard)
+        .values(value=StatCounter.value + delta)
+    )
+    if result.rowcount == 0:
+        await db.execute(
+            update(StatCounter)
+            .where(
+                StatCounter.scope == META_SCOPE,
+                StatCounter.key == REFRESHED_AT_KEY,
+                StatCounter.shard == META_SHARD,
+            )
+            .values(value=0)
+        )
+
+
+async def move(db: AsyncSession, scope: str, old_key: Optional[str], new_key: Optional[str]):
+    """Перенести единицу из одного ключа раздела в другой (смена статуса/роли)"""
+    if old_key == new_key:
+        return
+    await bump(db, scope, old_key, -1)
+    await bump(db, scope, new_key, 1)
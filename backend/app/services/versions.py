@@ -0,0 +1,223 @@
+"""
+История версий документов с дельта-сжатием
+
+Каждое изменение документа записывает строку document_versions с номером,
+равным новому Document.version. Содержимое хранится одним из двух способов:
+- snapshot: полный текст (каждые VERSION_SNAPSHOT_INTERVAL версий, а также
+  если дельта получилась не меньше самого текста);
+- delta: построчная разница с предыдущей версией - список операций
+  ["=", n] (взять n строк), ["-", n] (пропустить n строк), ["+", [строки]];
+  строки после последней операции берутся без изменений.
+
+Объем дельты пропорционален объему правки, а не размеру документа.
+Восстановление версии - ближайший снимок не позже нее и не больше
+VERSION_SNAPSHOT_INTERVAL - 1 дельт, загружаемых одним запросом.
+
+Первая запись истории для документа (созданного до ее появления или через
+массовую загрузку) - снимок состояния до изменения.
+"""
+import difflib
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import DateTime, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.document_version import DocumentVersion
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+
+def make_delta(old: str, new: str) -> list:
+    """Построчная разница old -> new в виде списка операций"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops: List[list] = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    # Хвост без изменений не храним - он подразумевается
+    if ops and ops[-1][0] == "=":
+        ops.pop()
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    lines = base.splitlines(keepends=True)
+    result: List[str] = []
+    position = 0
+    for op in ops:
+        if op[0] == "=":
+            result.extend(lines[position:position + op[1]])
+            position += op[1]
+        elif op[0] == "-":
+            position += op[1]
+        else:
+            result.extend(op[1])
+    result.extend(lines[position:])
+    return "".join(result)
+
+
+async def _load_content(db: AsyncSession, document_id: int) -> str:
+    # Сессия без autoflush: читается сохраненное в БД содержимое, а не измененное в памяти
+    return await db.scalar(select(Document.content).where(Document.id == document_id))
+
+
+async def record_revision(
+    db: AsyncSession,
+    document: Document,
+    title: Optional[str] = None,
+    content: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Записать версию document.version + 1 (вызывается до изменения документа)
+
+    title/content/status - новые значения, None - поле не меняется. Запись
+    выполняется в транзакции вызывающего кода.
+    """
+    versions = DocumentVersion.__table__
+    last_version, last_snapshot = (await db.execute(
+        select(
+            func.max(versions.c.version),
+            func.max(versions.c.version).filter(versions.c.kind == SNAPSHOT),
+        ).where(versions.c.document_id == document.id)
+    )).one()
+
+    old_content = None
+    if last_version is None:
+        # Истории еще нет: сохраняем исходное состояние полным снимком
+        old_content = await _load_content(db, document.id)
+        db.add(DocumentVersion(
+            document_id=document.id,
+            version=document.version,
+            kind=SNAPSHOT,
+            title=document.title,
+            status=document.status,
+            payload=old_content,
+        ))
+        last_snapshot = document.version
+
+    new_version = document.version + 1
+    if content is not None and old_content is None:
+        old_content = await _load_content(db, document.id)
+
+    kind, payload = DELTA, "[]"
+    if new_version - last_snapshot >= settings.VERSION_SNAPSHOT_INTERVAL:
+        kind = SNAPSHOT
+    elif content is not None and content != old_content:
+        payload = json.dumps(make_delta(old_content, content), ensure_ascii=False)
+        if len(payload) >= len(content):
+            kind = SNAPSHOT
+    if kind == SNAPSHOT:
+        if content is None:
+            content = old_content if old_content is not None else await _load_content(db, document.id)
+        payload = content
+
+    db.add(DocumentVersion(
+        document_id=document.id,
+        version=new_version,
+        kind=kind,
+        title=title if title is not None else document.title,
+        status=status if status is not None else document.status,
+        payload=payload,
+    ))
+
+
+async def has_history(db: AsyncSession, document_id: int) -> bool:
+    versions = DocumentVersion.__table__
+    return await db.scalar(
+        select(versions.c.id).where(versions.c.document_id == document_id).limit(1)
+    ) is not None
+
+
+async def snapshot_stored_state(db: AsyncSession, document_id: int):
+    """Записать текущее состояние строки documents полным снимком средствами БД
+
+    Используется загрузкой содержимого по частям: текст копируется INSERT ...
+    SELECT и не проходит через память воркера (дельта для таких правок не строится).
+    """
+    documents = Document.__table__
+    versions = DocumentVersion.__table__
+    await db.execute(
+        insert(versions).from_select(
+            ["document_id", "version", "kind", "title", "status", "payload", "created_at"],
+            select(
+                documents.c.id,
+                documents.c.version,
+                literal(SNAPSHOT),
+                documents.c.title,
+                documents.c.status,
+                documents.c.content,
+                literal(datetime.utcnow(), DateTime),
+            ).where(documents.c.id == document_id),
+        )
+    )
+
+
+async def list_versions(db: AsyncSession, document_id: int, skip: int = 0, limit: int = 50) -> list:
+    """Версии документа (без содержимого), новые первыми"""
+    versions = DocumentVersion.__table__
+    result = await db.execute(
+        select(
+            versions.c.version,
+            versions.c.kind,
+            versions.c.title,
+            versions.c.status,
+            func.length(versions.c.payload).label("stored_size"),
+            versions.c.created_at,
+        )
+        .where(versions.c.document_id == document_id)
+        .order_by(versions.c.version.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def get_version(db: AsyncSession, document_id: int, version: int) -> Optional[dict]:
+    """Восстановить версию: ближайший снимок + дельты до нее (один запрос)"""
+    versions = DocumentVersion.__table__
+    base_version = (
+        select(func.max(versions.c.version))
+        .where(
+            versions.c.document_id == document_id,
+            versions.c.kind == SNAPSHOT,
+            versions.c.version <= version,
+        )
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(versions)
+        .where(
+            versions.c.document_id == document_id,
+            versions.c.version >= base_version,
+            versions.c.version <= version,
+        )
+        .order_by(versions.c.version)
+    )).all()
+    if not rows or rows[-1].version != version:
+        return None
+
+    content = rows[0].payload
+    for row in rows[1:]:
+        content = row.payload if row.kind == SNAPSHOT else apply_delta(content, json.loads(row.payload))
+
+    target = rows[-1]
+    return {
+        "version": target.version,
+        "title": target.title,
+        "status": target.status,
+        "content": content,
+        "created_at": target.created_at.isoformat() if target.created_at else None,
+        "deltas_applied": len(rows) - 1,
+    }
@@ -0,0 +1,46 @@
+"""
+Скрипт заполнения documents.content_preview для существующих документов
+
+Добавляет колонку, если ее еще нет, и заполняет превью пачками прямо в БД,
+не загружая полный текст документов в Python.
+"""
+from sqlalchemy import inspect, text
+from app.core.database import engine
+from app.models.document import PREVIEW_LENGTH
+
+BATCH_SIZE = 5000
+
+
+def backfill_content_preview():
+    """Добавление и заполнение колонки content_preview"""
+    columns = [c["name"] for c in inspect(engine).get_columns("documents")]
+    with engine.begin() as conn:
+        if "content_preview" not in columns:
+            print("🔄 Добавляем колонку content_preview...")
+            conn.execute(text(
+                f"ALTER TABLE documents ADD COLUMN content_preview VARCHAR({PREVIEW_LENGTH + 3})"
+            ))
+
+    total = 0
+    while True:
+        # Каждая пачка - отдельная короткая транзакция
+        with engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    "UPDATE documents SET content_preview = CASE "
+                    "WHEN length(content) > :length THEN substr(content, 1, :length) || '...' "
+                    "ELSE content END "
+                    "WHERE id IN (SELECT id FROM documents WHERE content_preview IS NULL LIMIT :batch)"
+                ),
+                {"length": PREVIEW_LENGTH, "batch": BATCH_SIZE}
+            )
+        if result.rowcount == 0:
+            break
+        total += result.rowcount
+        print(f"   📄 Обработано документов: {total}")
+
+    print(f"✅ Превью заполнено для {total} документов")
+
+
+if __name__ == "__main__":
+    backfill_content_preview()
@@ -0,0 +1,45 @@
+"""
+Скрипт заполнения folders.path (материализованный путь) для существующих папок
+
+Добавляет колонку и индекс, если их еще нет, и заполняет пути по уровням
+дерева: сначала корневые папки, затем их дочерние и т.д.
+"""
+from sqlalchemy import inspect, text
+from app.core.database import engine
+from app.models.folder import Folder
+
+
+def backfill_folder_paths():
+    """Добавление и заполнение колонки path"""
+    columns = [c["name"] for c in inspect(engine).get_columns("folders")]
+    with engine.begin() as conn:
+        if "path" not in columns:
+            print("🔄 Добавляем колонку path...")
+            conn.execute(text("ALTER TABLE folders ADD COLUMN path VARCHAR(1024)"))
+        for index in Folder.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE folders SET path = NULL"))
+        total = conn.execute(text(
+            "UPDATE folders SET path = '/' || CAST(id AS VARCHAR) || '/' "
+            "WHERE parent_id IS NULL"
+        )).rowcount
+        # Каждый проход заполняет следующий уровень дерева
+        while True:
+            updated = conn.execute(text(
+                "UPDATE folders SET path = ("
+                "SELECT p.path FROM folders p WHERE p.id = folders.parent_id"
+                ") || CAST(id AS VARCHAR) || '/' "
+                "WHERE path IS NULL "
+                "AND parent_id IN (SELECT id FROM folders WHERE path IS NOT NULL)"
+            )).rowcount
+            if updated == 0:
+                break
+            total += updated
+
+    print(f"✅ Путь заполнен для {total} папок")
+
+
+if __name__ == "__main__":
+    backfill_folder_paths()
@@ -0,0 +1,127 @@
+"""
+Командная строка бенчмарков: generate, run, compare (см. benchmarks/__init__.py)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _configure_database(database_url):
+    # Настройки читаются при импорте app.core.config, поэтому URL задается до импорта app
+    os.environ["DATABASE_URL"] = database_url or os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+
+async def _generate(scale: str, seed: int) -> dict:
+    from app.core.database import AsyncSessionLocal
+    from app.core.migrations import upgrade_database
+    from benchmarks.datagen import generate
+
+    upgrade_database()
+    async with AsyncSessionLocal() as db:
+        return await generate(db, scale, seed=seed)
+
+
+async def _run(args) -> dict:
+    from sqlalchemy import func, select
+
+    from app.core.database import AsyncSessionLocal, async_engine
+    from app.core.migrations import upgrade_database
+    from app.models.user import User
+    from benchmarks import runner
+    from benchmarks.datagen import generate
+    from benchmarks.scenarios import load_fixtures, select_scenarios
+
+    upgrade_database()
+    scenarios = select_scenarios(args.scenario, read_only=args.read_only)
+    generated = None
+    async with AsyncSessionLocal() as db:
+        if args.scale and not await db.scalar(select(func.count()).select_from(User)):
+            print(f"📦 Генерируем данные масштаба {args.scale}...")
+            generated = await generate(db, args.scale, seed=args.seed)
+        fixtures = await load_fixtures(db, seed=args.seed)
+
+    print(f"🏁 Сценариев: {len(scenarios)}, запросов на сценарий: {args.requests}, "
+          f"параллельность: {args.concurrency}")
+    results = await runner.run(scenarios, fixtures, args.requests, args.concurrency, args.warmup)
+    await async_engine.dispose()
+
+    meta = runner.environment_info()
+    meta.update({
+        "scale": args.scale,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "read_only": args.read_only,
+        "datagen": generated,
+    })
+    return {"meta": meta, "scenarios": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Бенчмарки VaultDoc API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="Заполнить пустую БД синтетическими данными")
+    generate_parser.add_argument("--scale", required=True, choices=["10k", "100k", "1m"])
+    generate_parser.add_argument("--database-url")
+    generate_parser.add_argument("--seed", type=int, default=42)
+
+    run_parser = commands.add_parser("run", help="Прогнать сценарии и сохранить результаты в JSON")
+    run_parser.add_argument("--scale", choices=["10k", "100k", "1m"],
+                            help="Сгенерировать данные этого масштаба, если БД пуста")
+    run_parser.add_argument("--database-url")
+    run_parser.add_argument("--requests", type=int, default=200, help="Запросов на сценарий")
+    run_parser.add_argument("--concurrency", type=int, default=4)
+    run_parser.add_argument("--warmup", type=int, default=10)
+    run_parser.add_argument("--scenario", action="append", help="Только указанные сценарии (можно повторять)")
+    run_parser.add_argument("--read-only", action="store_true", help="Пропустить сценарии, изменяющие данные")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="Файл результатов (по умолчанию benchmarks/results/<время>.json)")
+
+    compare_parser = commands.add_parser("compare", help="Сравнить два файла результатов")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Допустимый рост задержки, %%")
+    compare_parser.add_argument("--fail-on-regression", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        from benchmarks.compare import compare, load
+
+        lines, regressions = compare(load(args.baseline), load(args.candidate), args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print("\n⚠️ Регрессии:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        return
+
+    _configure_database(args.database_url)
+
+    if args.command == "generate":
+        result = asyncio.run(_generate(args.scale, args.seed))
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    report = asyncio.run(_run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.utcnow().strftime("%Y%m%d-%H%M%S") + f"-{report['meta']['git_revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Результаты сохранены: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Сравнение двух прогонов бенчмарка (JSON из python -m benchmarks run)
+"""
+import json
+from typing import List, Optional, Tuple
+
+METRICS = ("p50", "p95", "p99")
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _delta(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Строки отчета и список регрессий (рост задержки больше threshold % или SQL-запросов)"""
+    lines = [
+        f"База:     {baseline['meta'].get('git_revision')} ({baseline['meta'].get('database')}, "
+        f"{baseline['meta'].get('scale')})",
+        f"Кандидат: {candidate['meta'].get('git_revision')} ({candidate['meta'].get('database')}, "
+        f"{candidate['meta'].get('scale')})",
+        "",
+        f"{'сценарий':<28}" + "".join(f"{metric:>25}" for metric in METRICS) + f"{'SQL/запрос':>14}{'RPS':>20}",
+    ]
+    regressions = []
+    old_results = baseline["scenarios"]
+    new_results = candidate["scenarios"]
+
+    for name in sorted(set(old_results) | set(new_results)):
+        if name not in old_results or name not in new_results:
+            lines.append(f"{name:<28} есть только в {'кандидате' if name in new_results else 'базе'}")
+            continue
+        old, new = old_results[name], new_results[name]
+        row = f"{name:<28}"
+        for metric in METRICS:
+            before, after = old["latency_ms"][metric], new["latency_ms"][metric]
+            delta = _delta(before, after)
+            row += f"{before:>9.2f} → {after:>7.2f} {'' if delta is None else f'{delta:+.0f}%':>5}"
+            if delta is not None and delta > threshold:
+                regressions.append(f"{name}: {metric} {before:.2f} → {after:.2f} мс ({delta:+.0f}%)")
+
+        old_queries = old["queries_per_request"]["mean"]
+        new_queries = new["queries_per_request"]["mean"]
+        row += f"{old_queries!s:>6} → {new_queries!s:<5}"
+        if old_queries is not None and new_queries is not None and new_queries > old_queries:
+            regressions.append(f"{name}: SQL-запросов на запрос {old_queries} → {new_queries}")
+
+        row += f"{old['throughput_rps']!s:>9} → {new['throughput_rps']!s:<8}"
+        lines.append(row)
+
+    return lines, regressions
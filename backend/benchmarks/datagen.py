@@ -0,0 +1,248 @@
+"""
+Генератор синтетических данных для бенчмарков
+
+Масштаб задается числом документов (10k / 100k / 1m), остальные сущности
+выводятся из него пропорционально. Данные вставляются тем же загрузчиком,
+что и POST /api/documents/bulk (app/services/bulk_loader.py), пачками по
+settings.BULK_CHUNK_SIZE. Генерация детерминирована (фиксированный seed).
+"""
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models.comment import DocumentComment
+from app.models.document import Document
+from app.models.permission import Permission
+from app.models.user import User
+from app.services import bulk_loader, comments, statistics
+
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+MAX_FOLDER_DEPTH = 5
+EMAIL_DOMAIN = "bench.vaultdoc.test"
+
+WORDS = (
+    "договор поставка отчет квартал бюджет проект согласование приказ служебная записка "
+    "сотрудник руководитель отдел закупка счет оплата акт выполненных работ план график "
+    "контрагент претензия регламент инструкция протокол совещания решение срок исполнения "
+    "смета спецификация приложение дополнительное соглашение реестр заявка поручение"
+).split()
+STATUSES = ["draft", "under_review", "approved", "rejected"]
+COMMENTS = [
+    "Нужно добавить раздел по бюджету",
+    "Согласен, добавьте пожалуйста",
+    "Проверьте сроки исполнения",
+    "Замечаний нет",
+    "Прошу уточнить формулировку пункта 3",
+    "Отправил на согласование руководителю",
+]
+
+
+class ScalePlan:
+    """Количество сущностей каждого вида для выбранного масштаба"""
+
+    def __init__(self, documents: int):
+        self.documents = documents
+        self.users = max(10, documents // 100)
+        self.folders = max(10, documents // 50)
+        self.permissions = documents // 10
+        self.comments = documents
+
+    def to_dict(self) -> dict:
+        return {
+            "users": self.users,
+            "folders": self.folders,
+            "documents": self.documents,
+            "permissions": self.permissions,
+            "comments": self.comments,
+        }
+
+
+def plan_for(scale: str) -> ScalePlan:
+    if scale not in SCALES:
+        raise ValueError(f"Неизвестный масштаб: {scale}. Допустимые значения: {', '.join(SCALES)}")
+    return ScalePlan(SCALES[scale])
+
+
+def synthetic_content(rng: random.Random) -> str:
+    """Текст с логнормальным распределением размера: в основном 1-5 КБ, изредка сотни КБ"""
+    words = max(5, min(int(rng.lognormvariate(5.5, 1.2)), 50000))
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _chunks(total: int):
+    chunk_size = settings.BULK_CHUNK_SIZE
+    for start in range(0, total, chunk_size):
+        yield start, min(chunk_size, total - start)
+
+
+async def _generate_users(db, plan: ScalePlan, rng: random.Random) -> List[int]:
+    table = User.__table__
+    password_hash = hashlib.sha256(b"bench").hexdigest()
+    now = datetime.utcnow()
+    user_ids = []
+    for start, size in _chunks(plan.users):
+        rows = []
+        for i in range(start, start + size):
+            # Каждый 50-й - администратор, каждый 10-й - менеджер
+            role = "admin" if i % 50 == 0 else "manager" if i % 10 == 0 else "employee"
+            rows.append({
+                "email": f"user{i}@{EMAIL_DOMAIN}",
+                "password_hash": password_hash,
+                "full_name": f"Пользователь {i}",
+                "role": role,
+                "is_active": rng.random() > 0.02,
+                "created_at": now,
+                "updated_at": now,
+                "version": 1,
+            })
+        inserted = await bulk_loader.insert_many(db, table, rows, returning=[table.c.id])
+        user_ids.extend(user_id for (user_id,) in inserted)
+        await db.commit()
+    return user_ids
+
+
+async def _generate_folders(db, plan: ScalePlan, user_ids: List[int], rng: random.Random) -> List[int]:
+    folders = []
+    depths = []
+    for i in range(plan.folders):
+        # Около трети папок - корневые, остальные вкладываются в уже созданные
+        parent_index = rng.randrange(i) if i and rng.random() > 0.3 else None
+        if parent_index is not None and depths[parent_index] >= MAX_FOLDER_DEPTH:
+            parent_index = None
+        depths.append(1 if parent_index is None else depths[parent_index] + 1)
+        folders.append({
+            "name": f"{rng.choice(WORDS).capitalize()} {i}",
+            "owner_id": rng.choice(user_ids),
+            "parent_index": parent_index,
+        })
+    folder_ids = await bulk_loader.insert_folder_tree(db, folders)
+    await db.commit()
+    return folder_ids
+
+
+async def _documents(count: int, user_ids: List[int], folder_ids: List[int], rng: random.Random):
+    for i in range(1, count + 1):
+        yield i, {
+            "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} №{i}",
+            "content": synthetic_content(rng),
+            "folder_id": rng.choice(folder_ids) if rng.random() < 0.9 else None,
+            "owner_id": rng.choice(user_ids),
+            "status": rng.choice(STATUSES),
+        }
+
+
+async def _generate_permissions(db, plan, user_ids, folder_ids, document_ids, rng: random.Random):
+    table = Permission.__table__
+    method = bulk_loader.choose_method(db)
+    now = datetime.utcnow()
+    # (user_id, entity_type, entity_id) уникальны: ограничение
+    # permissions_user_id_entity_type_entity_id_key (app/models/permission.py, миграция 0001)
+    seen = set()
+    for _, size in _chunks(plan.permissions):
+        rows = []
+        while len(rows) < size:
+            on_folder = rng.random() < 0.4
+            key = (
+                rng.choice(user_ids),
+                "folder" if on_folder else "document",
+                rng.choice(folder_ids if on_folder else document_ids),
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            can_edit = rng.random() < 0.3
+            rows.append({
+                "user_id": key[0],
+                "entity_type": key[1],
+                "entity_id": key[2],
+                "can_view": True,
+                "can_edit": can_edit,
+                "can_delete": can_edit and rng.random() < 0.2,
+                "can_manage_access": False,
+                "granted_by": user_ids[0],
+                "granted_at": now,
+            })
+        await bulk_loader.insert_many(db, table, rows, method=method)
+        await db.commit()
+
+
+async def _generate_comments(db, plan, user_ids, document_ids, rng: random.Random):
+    table = DocumentComment.__table__
+    method = bulk_loader.choose_method(db)
+    now = datetime.utcnow()
+    for _, size in _chunks(plan.comments):
+        rows = [
+            {
+                # Квадрат случайного числа - комментарии сосредоточены на части документов
+                "document_id": document_ids[int(len(document_ids) * rng.random() ** 2)],
+                "user_id": rng.choice(user_ids),
+                "comment": rng.choice(COMMENTS),
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+            }
+            for _ in range(size)
+        ]
+        await bulk_loader.insert_many(db, table, rows, method=method)
+        await db.commit()
+    # Комментарии вставлены в обход API - счетчики документов пересчитываются разом
+    await comments.recount_comments(db)
+    await db.commit()
+
+
+async def generate(db, scale: str, seed: int = 42, log=print) -> dict:
+    """Заполнить пустую БД данными выбранного масштаба; вернуть количества и время"""
+    plan = plan_for(scale)
+    if await db.scalar(select(func.count()).select_from(User)):
+        raise RuntimeError("БД не пуста: генератор заполняет только пустую БД")
+
+    rng = random.Random(seed)
+    timings = {}
+
+    started = time.perf_counter()
+    log(f"Пользователи: {plan.users}")
+    user_ids = await _generate_users(db, plan, rng)
+    timings["users"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    log(f"Папки: {plan.folders}")
+    folder_ids = await _generate_folders(db, plan, user_ids, rng)
+    timings["folders"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    log(f"Документы: {plan.documents}")
+    report = await bulk_loader.load_documents(db, _documents(plan.documents, user_ids, folder_ids, rng))
+    if report.failed:
+        raise RuntimeError(f"Не удалось загрузить документы: {report.errors[:5]}")
+    document_ids = (await db.execute(select(Document.id).order_by(Document.id))).scalars().all()
+    timings["documents"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    log(f"Права доступа: {plan.permissions}")
+    await _generate_permissions(db, plan, user_ids, folder_ids, document_ids, rng)
+    timings["permissions"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    log(f"Комментарии: {plan.comments}")
+    await _generate_comments(db, plan, user_ids, document_ids, rng)
+    timings["comments"] = time.perf_counter() - started
+
+    if settings.STATS_USE_COUNTERS:
+        # Пользователи, права и комментарии вставлены без bump() - пересчитываем
+        await statistics.rebuild_counters(db)
+
+    return {
+        "scale": scale,
+        "seed": seed,
+        "counts": plan.to_dict(),
+        "method": report.method,
+        "seconds": {name: round(value, 3) for name, value in timings.items()},
+    }
@@ -0,0 +1,174 @@
+"""
+Прогон сценариев внутри процесса через ASGI-клиент httpx
+
+Для каждого сценария:
+1. прогрев (запросы не учитываются);
+2. последовательный проход для подсчета SQL-запросов на один HTTP-запрос
+   (счетчик глобальный, поэтому считаем без параллельности);
+3. нагрузочный проход с заданной параллельностью: задержки p50/p95/p99 и
+   пропускная способность.
+"""
+import asyncio
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+import httpx
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.main import app
+
+from benchmarks.scenarios import Fixtures, Scenario
+
+QUERY_PROFILE_REQUESTS = 20
+
+
+class QueryCounter:
+    """Число SQL-запросов, выполненных движком с момента reset()"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _is_error(response: httpx.Response) -> bool:
+    return response.status_code >= 400
+
+
+async def _send(client: httpx.AsyncClient, scenario: Scenario, fixtures: Fixtures, i: int) -> httpx.Response:
+    method, url, kwargs = scenario.build(fixtures, i)
+    return await client.request(method, url, **kwargs)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    fixtures: Fixtures,
+    counter: QueryCounter,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    for i in range(warmup):
+        await _send(client, scenario, fixtures, i)
+
+    # Запросы к БД на один HTTP-запрос
+    profiled = min(QUERY_PROFILE_REQUESTS, requests)
+    queries = []
+    for i in range(profiled):
+        counter.reset()
+        await _send(client, scenario, fixtures, warmup + i)
+        queries.append(counter.count)
+
+    # Нагрузка
+    latencies: List[float] = []
+    statuses = {}
+    errors = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            response = await _send(client, scenario, fixtures, warmup + profiled + i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if _is_error(response) and len(errors) < 5:
+                errors.append(f"{response.status_code}: {response.text[:200]}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    failed = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "write": scenario.write,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": failed,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "error_samples": errors,
+        "latency_ms": {
+            "min": round(latencies[0], 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+    }
+
+
+async def run(
+    scenarios: List[Scenario],
+    fixtures: Fixtures,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    log=print,
+) -> dict:
+    counter = QueryCounter(async_engine)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for scenario in scenarios:
+            result = await run_scenario(client, scenario, fixtures, counter, requests, concurrency, warmup)
+            results[scenario.name] = result
+            latency = result["latency_ms"]
+            log(
+                f"{scenario.name:<28} p50={latency['p50']:>8.2f}мс p95={latency['p95']:>8.2f}мс "
+                f"p99={latency['p99']:>8.2f}мс {result['throughput_rps']:>8.1f} RPS "
+                f"SQL/запрос={result['queries_per_request']['mean']} ошибок={result['errors']}"
+            )
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment_info() -> dict:
+    dialect = async_engine.dialect
+    return {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "database": f"{dialect.name}+{dialect.driver}",
+        "settings": {
+            "DB_POOL_SIZE": settings.DB_POOL_SIZE,
+            "DB_MAX_OVERFLOW": settings.DB_MAX_OVERFLOW,
+            "STATS_USE_COUNTERS": settings.STATS_USE_COUNTERS,
+            "RESPONSE_CACHE_TTL": settings.RESPONSE_CACHE_TTL,
+            "PERMISSIONS_CACHE_TTL": settings.PERMISSIONS_CACHE_TTL,
+        },
+    }
@@ -0,0 +1,172 @@
+"""
+Сценарии нагрузки: по одному на каждый эндпоинт API (и на основные режимы)
+
+Сценарий по номеру запроса строит (метод, URL, параметры httpx), выбирая
+идентификаторы из выборки, подготовленной по данным БД (см. Fixtures), чтобы
+запросы распределялись по разным строкам, а не били в одну и ту же.
+Сценарии с write=True изменяют данные и пропускаются с флагом --read-only.
+"""
+import json
+import random
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from app.core.pagination import encode_cursor
+from app.models.document import Document
+from app.models.folder import Folder
+from app.models.user import User
+
+from benchmarks.datagen import COMMENTS, WORDS
+
+SAMPLE_SIZE = 200
+
+
+class Fixtures:
+    """Выборка существующих идентификаторов для построения запросов"""
+
+    def __init__(self, user_ids: List[int], folder_ids: List[int], root_folder_ids: List[int],
+                 document_ids: List[int], middle_document_id: int, seed: int = 42):
+        self.user_ids = user_ids
+        self.folder_ids = folder_ids
+        self.root_folder_ids = root_folder_ids or folder_ids
+        self.document_ids = document_ids
+        self.middle_document_id = middle_document_id
+        self.rng = random.Random(seed)
+
+    def pick(self, values: List[int], i: int) -> int:
+        return values[i % len(values)]
+
+
+async def load_fixtures(db, seed: int = 42) -> Fixtures:
+    """Случайная выборка id (ORDER BY random() по таблицам бенчмарка допустим)"""
+    async def sample(column, *where):
+        query = select(column).where(*where).order_by(func.random()).limit(SAMPLE_SIZE)
+        return (await db.execute(query)).scalars().all()
+
+    document_ids = await sample(Document.id)
+    if not document_ids:
+        raise RuntimeError("В БД нет документов: сначала сгенерируйте данные")
+    max_id = await db.scalar(select(func.max(Document.id)))
+    return Fixtures(
+        user_ids=await sample(User.id),
+        folder_ids=await sample(Folder.id),
+        root_folder_ids=await sample(Folder.id, Folder.parent_id.is_(None)),
+        document_ids=document_ids,
+        middle_document_id=max_id // 2,
+        seed=seed,
+    )
+
+
+class Scenario:
+    def __init__(self, name: str, build: Callable[[Fixtures, int], tuple], write: bool = False):
+        self.name = name
+        self.build = build
+        self.write = write
+
+
+def _ndjson_batch(fx: Fixtures, i: int, size: int = 50) -> bytes:
+    lines = [
+        json.dumps({
+            "title": f"Бенчмарк {i}-{n}",
+            "content": " ".join(fx.rng.choice(WORDS) for _ in range(200)),
+            "folder_id": fx.pick(fx.folder_ids, i + n),
+            "status": "draft",
+        }, ensure_ascii=False)
+        for n in range(size)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+SCENARIOS: List[Scenario] = [
+    # Система
+    Scenario("root", lambda fx, i: ("GET", "/", {})),
+    Scenario("health", lambda fx, i: ("GET", "/health", {})),
+    Scenario("health_db", lambda fx, i: ("GET", "/health/db", {})),
+
+    # Пользователи
+    Scenario("users_list", lambda fx, i: ("GET", "/api/users", {})),
+    Scenario("user_get", lambda fx, i: ("GET", f"/api/users/{fx.pick(fx.user_ids, i)}", {})),
+    Scenario("user_update", lambda fx, i: (
+        "PUT", f"/api/users/{fx.pick(fx.user_ids, i)}", {"params": {"full_name": f"Пользователь {i}"}}
+    ), write=True),
+
+    # Папки
+    Scenario("folders_list", lambda fx, i: ("GET", "/api/folders", {})),
+    Scenario("folder_create", lambda fx, i: (
+        "POST", "/api/folders",
+        {"params": {"name": f"Бенчмарк {i}", "owner_id": fx.pick(fx.user_ids, i),
+                    "parent_id": fx.pick(fx.folder_ids, i)}}
+    ), write=True),
+    Scenario("folder_rename", lambda fx, i: (
+        "PUT", f"/api/folders/{fx.pick(fx.folder_ids, i)}", {"params": {"name": f"Папка {i}"}}
+    ), write=True),
+    Scenario("folder_tree", lambda fx, i: ("GET", f"/api/folders/{fx.pick(fx.root_folder_ids, i)}/tree", {})),
+    Scenario("folder_documents", lambda fx, i: (
+        "GET", f"/api/folders/{fx.pick(fx.folder_ids, i)}/documents", {"params": {"limit": 50}}
+    )),
+    Scenario("folder_documents_recursive", lambda fx, i: (
+        "GET", f"/api/folders/{fx.pick(fx.root_folder_ids, i)}/documents",
+        {"params": {"recursive": "true", "limit": 50}}
+    )),
+
+    # Документы
+    Scenario("documents_offset_first", lambda fx, i: ("GET", "/api/documents", {"params": {"limit": 50}})),
+    Scenario("documents_offset_deep", lambda fx, i: (
+        "GET", "/api/documents", {"params": {"limit": 50, "skip": fx.middle_document_id}}
+    )),
+    Scenario("documents_cursor_deep", lambda fx, i: (
+        "GET", "/api/documents",
+        {"params": {"limit": 50, "pagination": "cursor",
+                    "cursor": encode_cursor("id", [fx.middle_document_id])}}
+    )),
+    Scenario("documents_by_status", lambda fx, i: (
+        "GET", "/api/documents",
+        {"params": {"limit": 50, "status": ("draft", "approved")[i % 2], "pagination": "cursor"}}
+    )),
+    Scenario("documents_bulk", lambda fx, i: (
+        "POST", "/api/documents/bulk",
+        {"params": {"format": "ndjson", "owner_id": fx.pick(fx.user_ids, i)}, "content": _ndjson_batch(fx, i)}
+    ), write=True),
+    Scenario("documents_search", lambda fx, i: (
+        "GET", "/api/documents/search", {"params": {"q": f"{WORDS[i % len(WORDS)]} {WORDS[(i * 7) % len(WORDS)]}"}}
+    )),
+    Scenario("document_get", lambda fx, i: ("GET", f"/api/documents/{fx.pick(fx.document_ids, i)}", {})),
+    Scenario("document_update", lambda fx, i: (
+        "PUT", f"/api/documents/{fx.pick(fx.document_ids, i)}",
+        {"params": {"status": ("draft", "under_review", "approved")[i % 3]}}
+    ), write=True),
+
+    # Комментарии
+    Scenario("comments_list", lambda fx, i: ("GET", f"/api/documents/{fx.pick(fx.document_ids, i)}/comments", {})),
+    Scenario("comment_add", lambda fx, i: (
+        "POST", f"/api/documents/{fx.pick(fx.document_ids, i)}/comments",
+        {"params": {"comment": COMMENTS[i % len(COMMENTS)], "user_id": fx.pick(fx.user_ids, i)}}
+    ), write=True),
+
+    # Права доступа
+    Scenario("permissions_by_user", lambda fx, i: (
+        "GET", "/api/permissions", {"params": {"user_id": fx.pick(fx.user_ids, i)}}
+    )),
+    Scenario("effective_permissions", lambda fx, i: (
+        "GET", f"/api/documents/{fx.pick(fx.document_ids, i)}/effective-permissions",
+        {"params": {"user_id": fx.pick(fx.user_ids, i * 3)}}
+    )),
+
+    # Статистика
+    Scenario("statistics", lambda fx, i: ("GET", "/api/statistics", {})),
+]
+
+
+def select_scenarios(names: Optional[List[str]] = None, read_only: bool = False) -> List[Scenario]:
+    by_name: Dict[str, Scenario] = {scenario.name: scenario for scenario in SCENARIOS}
+    if names:
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Неизвестные сценарии: {', '.join(unknown)}")
+        selected = [by_name[name] for name in names]
+    else:
+        selected = list(SCENARIOS)
+    if read_only:
+        selected = [scenario for scenario in selected if not scenario.write]
+    return selected
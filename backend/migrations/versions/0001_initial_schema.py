@@ -0,0 +1,101 @@
+"""Исходная схема: таблицы docker/init.sql
+
+Базовая ревизия, в точности повторяет docker/init.sql до появления миграций.
+БД, созданная этим скриптом, помечается ревизией без выполнения
+(alembic stamp 0001 или python -m app.core.migrations); колонки и таблицы,
+добавленные позже, создает ревизия 0002.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamp(name):
+    return sa.Column(name, sa.DateTime(), server_default=sa.func.current_timestamp())
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False, server_default="employee"),
+        sa.Column("is_active", sa.Boolean(), server_default=sa.true()),
+        _timestamp("created_at"),
+        sa.UniqueConstraint("email", name="users_email_key"),
+        sa.CheckConstraint("role IN ('employee', 'manager', 'admin')", name="users_role_check"),
+    )
+
+    op.create_table(
+        "folders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("folders.id", ondelete="CASCADE")),
+        _timestamp("created_at"),
+        _timestamp("updated_at"),
+    )
+
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(500), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("folder_id", sa.Integer(), sa.ForeignKey("folders.id", ondelete="SET NULL")),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="draft"),
+        _timestamp("created_at"),
+        _timestamp("updated_at"),
+        sa.CheckConstraint(
+            "status IN ('draft', 'under_review', 'approved', 'rejected')",
+            name="documents_status_check",
+        ),
+    )
+
+    op.create_table(
+        "permissions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("entity_type", sa.String(10), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("can_view", sa.Boolean(), server_default=sa.false()),
+        sa.Column("can_edit", sa.Boolean(), server_default=sa.false()),
+        sa.Column("can_delete", sa.Boolean(), server_default=sa.false()),
+        sa.Column("can_manage_access", sa.Boolean(), server_default=sa.false()),
+        sa.Column("granted_by", sa.Integer(), sa.ForeignKey("users.id")),
+        _timestamp("granted_at"),
+        sa.UniqueConstraint(
+            "user_id", "entity_type", "entity_id", name="permissions_user_id_entity_type_entity_id_key"
+        ),
+        sa.CheckConstraint("entity_type IN ('folder', 'document')", name="permissions_entity_type_check"),
+    )
+
+    op.create_table(
+        "document_comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=False),
+        _timestamp("created_at"),
+    )
+
+
+def downgrade():
+    for table in (
+        "document_comments",
+        "permissions",
+        "documents",
+        "folders",
+        "users",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,150 @@
+"""Колонки и таблицы, добавленные до появления миграций
+
+Схема приложения успела вырасти до перехода на Alembic: версии сущностей
+(ETag), превью содержимого, материализованный путь папок, полнотекстовый
+поиск, история версий, фрагменты содержимого и счетчики статистики. В БД,
+созданной docker/init.sql (ревизия 0001), их нет; в БД, созданной
+Base.metadata.create_all, есть часть из них. Поэтому каждая колонка, таблица
+и индекс создаются, только если их еще нет, а новые колонки заполняются по
+существующим данным (path - по уровням дерева, превью - одним UPDATE).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Длина превью - app.models.document.PREVIEW_LENGTH на момент ревизии
+PREVIEW_LENGTH = 100
+
+
+def _timestamp(name):
+    return sa.Column(name, sa.DateTime(), server_default=sa.func.current_timestamp())
+
+
+def _columns(inspector, table):
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def _fill_folder_paths(bind):
+    bind.execute(sa.text(
+        "UPDATE folders SET path = '/' || CAST(id AS VARCHAR) || '/' "
+        "WHERE path IS NULL AND parent_id IS NULL"
+    ))
+    # Каждый проход заполняет следующий уровень дерева
+    while bind.execute(sa.text(
+        "UPDATE folders SET path = ("
+        "SELECT p.path FROM folders p WHERE p.id = folders.parent_id"
+        ") || CAST(id AS VARCHAR) || '/' "
+        "WHERE path IS NULL "
+        "AND parent_id IN (SELECT id FROM folders WHERE path IS NOT NULL)"
+    )).rowcount:
+        pass
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    postgresql = bind.dialect.name == "postgresql"
+
+    users = _columns(inspector, "users")
+    if "updated_at" not in users:
+        # SQLite не добавляет колонку с непостоянным DEFAULT - заполняем UPDATE
+        op.add_column("users", sa.Column("updated_at", sa.DateTime()))
+        op.execute("UPDATE users SET updated_at = created_at")
+    if "version" not in users:
+        op.add_column("users", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+    if "path" not in _columns(inspector, "folders"):
+        op.add_column("folders", sa.Column("path", sa.String(1024)))
+    _fill_folder_paths(bind)
+    op.create_index(
+        "ix_folders_path", "folders", ["path"],
+        postgresql_ops={"path": "varchar_pattern_ops"}, if_not_exists=True
+    )
+    op.create_index("ix_folders_parent_id", "folders", ["parent_id"], if_not_exists=True)
+
+    documents = _columns(inspector, "documents")
+    if "content_preview" not in documents:
+        op.add_column("documents", sa.Column("content_preview", sa.String(PREVIEW_LENGTH + 3)))
+    op.execute(
+        "UPDATE documents SET content_preview = CASE "
+        f"WHEN length(content) > {PREVIEW_LENGTH} THEN substr(content, 1, {PREVIEW_LENGTH}) || '...' "
+        "ELSE content END "
+        "WHERE content_preview IS NULL"
+    )
+    if "version" not in documents:
+        op.add_column("documents", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    if postgresql and "search_vector" not in documents:
+        # Полнотекстовый поиск: заголовок (вес A) и содержимое (вес B)
+        op.execute(
+            "ALTER TABLE documents ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{settings.SEARCH_TS_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{settings.SEARCH_TS_CONFIG}', coalesce(content, '')), 'B')"
+            ") STORED"
+        )
+    if postgresql:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_documents_search_vector ON documents USING GIN (search_vector)")
+
+    if "document_versions" not in tables:
+        op.create_table(
+            "document_versions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("kind", sa.String(10), nullable=False),
+            sa.Column("title", sa.String(500), nullable=False),
+            sa.Column("status", sa.String(20)),
+            sa.Column("payload", sa.Text(), nullable=False),
+            _timestamp("created_at"),
+            sa.UniqueConstraint("document_id", "version", name="uq_document_versions_document_id_version"),
+            sa.CheckConstraint("kind IN ('snapshot', 'delta')", name="document_versions_kind_check"),
+        )
+
+    if "document_content_chunks" not in tables:
+        op.create_table(
+            "document_content_chunks",
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("chunk_index", sa.Integer(), primary_key=True),
+            sa.Column("data", sa.Text(), nullable=False),
+            sa.Column("byte_length", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+
+    if "stat_counters" not in tables:
+        # Счетчики заполняются при первом запросе статистики (app/services/statistics.py)
+        op.create_table(
+            "stat_counters",
+            sa.Column("scope", sa.String(32), primary_key=True),
+            sa.Column("key", sa.String(64), primary_key=True),
+            sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+            _timestamp("updated_at"),
+        )
+
+
+def downgrade():
+    for table in ("stat_counters", "document_content_chunks", "document_versions"):
+        op.drop_table(table)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_documents_search_vector")
+        op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS search_vector")
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_column("version")
+        batch.drop_column("content_preview")
+    op.drop_index("ix_folders_parent_id", table_name="folders")
+    op.drop_index("ix_folders_path", table_name="folders")
+    with op.batch_alter_table("folders") as batch:
+        batch.drop_column("path")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("version")
+        batch.drop_column("updated_at")
@@ -0,0 +1,55 @@
+"""Индексы под фильтры и сортировки эндпоинтов
+
+- documents (updated_at, id), (status, id), (status, updated_at, id) -
+  курсорная пагинация GET /api/documents с фильтром по статусу и без;
+- documents (folder_id, id) - документы папки, (owner_id, id) - документы
+  владельца (выгрузка, каскадное удаление пользователя);
+- document_comments (document_id, created_at, id) - комментарии документа
+  в порядке создания, (user_id) - комментарии пользователя;
+- permissions (entity_type, entity_id) - права на объект (права пользователя
+  обслуживает индекс ограничения UNIQUE (user_id, entity_type, entity_id));
+- folders (owner_id) - папки пользователя.
+
+В PostgreSQL индексы строятся CREATE INDEX CONCURRENTLY - без блокировки
+записи в таблицы. IF NOT EXISTS - часть индексов уже есть в БД, созданных
+через Base.metadata.create_all.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_documents_updated_at_id", "documents", ["updated_at", "id"]),
+    ("ix_documents_status_id", "documents", ["status", "id"]),
+    ("ix_documents_status_updated_at_id", "documents", ["status", "updated_at", "id"]),
+    ("ix_documents_folder_id_id", "documents", ["folder_id", "id"]),
+    ("ix_documents_owner_id_id", "documents", ["owner_id", "id"]),
+    ("ix_document_comments_document_id_created_at_id", "document_comments", ["document_id", "created_at", "id"]),
+    ("ix_document_comments_user_id", "document_comments", ["user_id"]),
+    ("ix_permissions_entity_type_entity_id", "permissions", ["entity_type", "entity_id"]),
+    ("ix_folders_owner_id", "folders", ["owner_id"]),
+]
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, if_not_exists=True, postgresql_concurrently=concurrently
+            )
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=concurrently)
@@ -0,0 +1,32 @@
+"""Счетчик комментариев documents.comment_count
+
+Колонка добавляется со значением по умолчанию 0 и заполняется одним
+UPDATE по таблице комментариев (индекс ix_document_comments_document_id_created_at_id
+из 0003 обслуживает подсчет по document_id).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.add_column(sa.Column("comment_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE documents SET comment_count = ("
+        "SELECT count(*) FROM document_comments WHERE document_comments.document_id = documents.id"
+        ")"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_column("comment_count")
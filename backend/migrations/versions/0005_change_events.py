@@ -0,0 +1,38 @@
+"""Таблица событий ленты изменений change_events
+
+События записываются в транзакции изменения и хранятся
+CHANGE_FEED_RETENTION_HOURS часов: по ним подписчик, переподключившийся с
+Last-Event-ID, получает пропущенное (см. app/services/changefeed.py).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(32), nullable=False),
+        sa.Column("document_id", sa.Integer()),
+        sa.Column("folder_id", sa.Integer()),
+        sa.Column("user_id", sa.Integer()),
+        sa.Column("data", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index("ix_change_events_document_id_id", "change_events", ["document_id", "id"])
+    op.create_index("ix_change_events_folder_id_id", "change_events", ["folder_id", "id"])
+    op.create_index("ix_change_events_user_id_id", "change_events", ["user_id", "id"])
+    op.create_index("ix_change_events_created_at", "change_events", ["created_at"])
+
+
+def downgrade():
+    op.drop_table("change_events")
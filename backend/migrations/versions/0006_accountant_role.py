@@ -0,0 +1,29 @@
+"""Роль accountant в ограничении users_role_check
+
+Ограничение из docker/init.sql допускало только employee, manager и admin,
+а PUT /api/users/{id} принимает и accountant.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _replace_role_check(roles):
+    with op.batch_alter_table("users") as batch:
+        batch.drop_constraint("users_role_check", type_="check")
+        batch.create_check_constraint("users_role_check", f"role IN ({roles})")
+
+
+def upgrade():
+    _replace_role_check("'employee', 'manager', 'accountant', 'admin'")
+
+
+def downgrade():
+    _replace_role_check("'employee', 'manager', 'admin'")
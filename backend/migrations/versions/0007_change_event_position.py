@@ -0,0 +1,48 @@
+"""Номер события ленты изменений в порядке фиксации (change_events.position)
+
+id события берется из последовательности при INSERT, и транзакция с меньшим
+id может зафиксироваться позже: курсор по id терял такие события. Курсор
+ленты - position, его назначает воркер после COMMIT (PostgreSQL,
+последовательность change_events_position_seq) или запись в той же
+транзакции (SQLite). Существующим событиям position = id; индексы
+догрузки переводятся на position.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+SUBSCRIPTION_COLUMNS = ("document_id", "folder_id", "user_id")
+
+
+def upgrade():
+    op.add_column("change_events", sa.Column("position", sa.Integer()))
+    op.execute("UPDATE change_events SET position = id")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE SEQUENCE change_events_position_seq")
+        op.execute(
+            "SELECT setval('change_events_position_seq', "
+            "COALESCE((SELECT max(position) FROM change_events), 0) + 1, false)"
+        )
+    for column in SUBSCRIPTION_COLUMNS:
+        op.drop_index(f"ix_change_events_{column}_id", table_name="change_events")
+        op.create_index(f"ix_change_events_{column}_position", "change_events", [column, "position"])
+    op.create_index("ix_change_events_position", "change_events", ["position"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_change_events_position", table_name="change_events")
+    for column in SUBSCRIPTION_COLUMNS:
+        op.drop_index(f"ix_change_events_{column}_position", table_name="change_events")
+        op.create_index(f"ix_change_events_{column}_id", "change_events", [column, "id"])
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP SEQUENCE change_events_position_seq")
+    with op.batch_alter_table("change_events") as batch:
+        batch.drop_column("position")
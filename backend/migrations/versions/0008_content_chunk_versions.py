@@ -0,0 +1,59 @@
+"""Версия в первичном ключе фрагментов содержимого
+
+Первичный ключ document_content_chunks - (document_id, version, chunk_index):
+новая версия фрагментов записывается рядом с предыдущей, а не вместо нее,
+и ответ, начатый по предыдущей версии, дочитывает свои фрагменты.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+PRIMARY_KEY = "document_content_chunks_pkey"
+OLD_COLUMNS = ["document_id", "chunk_index"]
+NEW_COLUMNS = ["document_id", "version", "chunk_index"]
+
+
+def _chunks_table(primary_key):
+    """Таблица с нужным ключом для пересоздания в SQLite
+
+    Без отражения: отраженный старый первичный ключ конфликтует с новым.
+    """
+    return sa.Table(
+        "document_content_chunks",
+        sa.MetaData(),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("data", sa.Text(), nullable=False),
+        sa.Column("byte_length", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint(*primary_key, name=PRIMARY_KEY),
+    )
+
+
+def _replace_primary_key(columns):
+    with op.batch_alter_table("document_content_chunks", copy_from=_chunks_table(columns)) as batch:
+        if op.get_bind().dialect.name == "postgresql":
+            batch.drop_constraint(PRIMARY_KEY, type_="primary")
+        batch.create_primary_key(PRIMARY_KEY, columns)
+
+
+def upgrade():
+    _replace_primary_key(NEW_COLUMNS)
+
+
+def downgrade():
+    # В старом ключе помещается только один набор фрагментов на документ
+    op.execute(
+        "DELETE FROM document_content_chunks WHERE version < ("
+        "SELECT max(c.version) FROM document_content_chunks c "
+        "WHERE c.document_id = document_content_chunks.document_id)"
+    )
+    _replace_primary_key(OLD_COLUMNS)
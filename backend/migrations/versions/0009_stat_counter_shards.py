@@ -0,0 +1,41 @@
+"""Шарды счетчиков статистики
+
+Каждый счетчик stat_counters хранится в нескольких строках (scope, key, shard):
+транзакции изменяют случайный шард, а чтение суммирует шарды. Запись больше
+не упирается в блокировку одной строки, например documents/total.
+
+Счетчики - производные данные: таблица пересоздается пустой и заполняется
+пересчетом при первом чтении статистики.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def _create_stat_counters(*shard_columns):
+    op.create_table(
+        "stat_counters",
+        sa.Column("scope", sa.String(32), primary_key=True),
+        sa.Column("key", sa.String(64), primary_key=True),
+        *shard_columns,
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.current_timestamp()),
+    )
+
+
+def upgrade():
+    op.drop_table("stat_counters")
+    _create_stat_counters(sa.Column("shard", sa.Integer(), primary_key=True, server_default="0"))
+
+
+def downgrade():
+    op.drop_table("stat_counters")
+    _create_stat_counters()
@@ -1,25 +1,192 @@
 #!/usr/bin/env python3
 """
 Скрипт запуска VaultDoc API сервера
+
+    python run.py --dev                 # разработка: один процесс, перезагрузка при изменении кода
+    python run.py                       # production: воркеров по числу доступных ядер
+    python run.py --workers 8 --no-preload
+
+В production-режиме HTTP обслуживают uvloop и httptools (входят в
+uvicorn[standard]). При установленном gunicorn приложение загружается один
+раз в мастер-процессе до запуска воркеров (preload): ошибки импорта видны
+сразу, а воркеры делят память импортированных модулей. Без gunicorn воркеры
+запускает uvicorn, и каждый импортирует приложение сам.
+
+SIGTERM/SIGINT - плавная остановка: новые соединения не принимаются, начатые
+запросы дорабатываются не дольше --graceful-timeout секунд.
+
+Значения по умолчанию берутся из настроек SERVER_* (app/core/config.py).
 """
-import uvicorn
+import argparse
+import math
+import os
+import shutil
 import sys
+import tempfile
+
+from app.core.config import settings
+
+
+def available_cpus() -> int:
+    """Число ядер, доступных процессу: привязка к CPU и квота cgroup контейнера"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # нет на macOS/Windows
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def module_available(name: str) -> bool:
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Запуск VaultDoc API")
+    parser.add_argument("--dev", action="store_true",
+                        help="режим разработки: один процесс с перезагрузкой при изменении кода")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="число процессов-воркеров (0 - по числу доступных ядер)")
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVER_KEEP_ALIVE,
+                        help="сколько секунд держать простаивающее keep-alive соединение")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG,
+                        help="длина очереди ожидающих соединений")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT,
+                        help="сколько секунд дорабатывать начатые запросы при остановке")
+    parser.add_argument("--preload", dest="preload", action="store_true", default=settings.SERVER_PRELOAD,
+                        help="загрузить приложение в мастер-процессе до запуска воркеров (нужен gunicorn)")
+    parser.add_argument("--no-preload", dest="preload", action="store_false")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers <= 0:
+        args.workers = available_cpus()
+    return args
+
+
+def prepare_metrics_dir(workers: int, port: int):
+    """Общий каталог метрик Prometheus для нескольких воркеров (очищается при старте)"""
+    if workers < 2 or not settings.METRICS_ENABLED:
+        return
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(
+        tempfile.gettempdir(), f"vaultdoc-metrics-{port}"
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    # Переменная должна быть задана до импорта prometheus_client в воркерах
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+# ============ РЕЖИМЫ ЗАПУСКА ============
+
+def run_dev(args: argparse.Namespace):
+    import uvicorn
 
-def main():
-    """Запускаем FastAPI сервер"""
-    print("🚀 Запускаем VaultDoc API сервер...")
-    print(f"📁 Директория: {sys.path[0]}")
-    print("🌐 API будет доступно по: http://localhost:8000")
-    print("📚 Документация: http://localhost:8000/docs")
-    print("⏳ Для остановки нажмите Ctrl+C\n")
-    
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=args.host,
+        port=args.port,
         reload=True,
-        log_level="info"
+        log_level=args.log_level
     )
 
+
+def run_uvicorn(args: argparse.Namespace):
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if module_available("uvloop") else "asyncio",
+        http="httptools" if module_available("httptools") else "h11",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level
+    )
+
+
+def post_fork(server, worker):
+    # Соединения, открытые мастером при загрузке приложения, воркерам не
+    # передаются: каждый воркер открывает собственный пул
+    from app.core.database import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Значения livesum-метрик завершившегося воркера больше не учитываются
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(args: argparse.Namespace):
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        # UvicornWorker сам выбирает uvloop и httptools, если они установлены
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "keepalive": args.keep_alive,
+        "backlog": args.backlog,
+        "graceful_timeout": args.graceful_timeout,
+        "loglevel": args.log_level,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+
+    class VaultDocApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    VaultDocApplication().run()
+
+
+def main(argv=None):
+    """Запускаем FastAPI сервер"""
+    args = parse_args(argv)
+    print("🚀 Запускаем VaultDoc API сервер...")
+    print(f"📁 Директория: {sys.path[0]}")
+    print(f"🌐 API будет доступно по: http://{args.host}:{args.port}")
+    print(f"📚 Документация: http://{args.host}:{args.port}/docs")
+
+    if args.dev:
+        print("🔧 Режим разработки: перезагрузка при изменении кода")
+        print("⏳ Для остановки нажмите Ctrl+C\n")
+        run_dev(args)
+        return
+
+    prepare_metrics_dir(args.workers, args.port)
+    use_gunicorn = args.preload and module_available("gunicorn")
+    print(f"⚙️  Воркеров: {args.workers}, сервер: {'gunicorn + uvicorn (preload)' if use_gunicorn else 'uvicorn'}")
+    print("⏳ Для остановки нажмите Ctrl+C\n")
+    if use_gunicorn:
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,152 @@
+"""
+Общие фикстуры тестов
+
+Тесты работают на SQLite (aiosqlite) во временном каталоге со строгим
+бюджетом SQL-запросов: маршрут, выполнивший больше запросов, чем позволяет
+его бюджет, выбрасывает QueryBudgetExceeded, и тест падает. Настройки
+читаются при импорте app.core.config, поэтому переменные окружения задаются
+до импорта приложения.
+
+Запуск из каталога backend:
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="vaultdoc-tests-")
+PRIMARY_DB = os.path.join(TEST_DIR, "primary.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY_DB}"
+os.environ["QUERY_BUDGET_STRICT"] = "True"
+os.environ["SQL_INSTRUMENTATION_ENABLED"] = "True"
+os.environ["READ_REPLICA_URLS"] = ""
+os.environ["STATS_USE_COUNTERS"] = "False"
+os.environ["COMMENTS_GROUP_COMMIT"] = "False"
+# Небольшие фрагменты: документы тестов занимают несколько фрагментов
+os.environ["CONTENT_CHUNK_SIZE"] = "64"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import http_cache, permissions, replicas
+from app.core.database import SessionLocal, engine
+from app.core.migrations import upgrade_database
+from app.main import app
+from app.models.comment import DocumentComment
+from app.models.document import Document
+from app.models.folder import Folder
+from app.models.permission import Permission
+from app.models.user import User
+from app.services import search
+
+# Больше строк, чем бюджет запросов по умолчанию: запрос на каждую строку (N+1)
+# превысит бюджет
+DOCUMENT_COUNT = 30
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    upgrade_database()
+    yield
+    engine.dispose()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def data(database):
+    """Базовый набор данных: пользователи, дерево папок, документы, права, комментарии
+
+    Возвращает словарь с id созданных объектов. Тесты, меняющие данные,
+    создают собственные объекты или меняют только то, что проверяют.
+    """
+    db = SessionLocal()
+    try:
+        admin = User(email="admin@test.ru", password_hash="x", full_name="Администратор", role="admin")
+        manager = User(email="manager@test.ru", password_hash="x", full_name="Менеджер", role="manager")
+        employee = User(email="employee@test.ru", password_hash="x", full_name="Сотрудник")
+        db.add_all([admin, manager, employee])
+        db.commit()
+
+        root = Folder(name="Общие", owner_id=admin.id)
+        db.add(root)
+        db.commit()
+        child = Folder(name="Отчеты", owner_id=manager.id, parent_id=root.id)
+        db.add(child)
+        db.commit()
+
+        documents = []
+        for i in range(DOCUMENT_COUNT):
+            documents.append(Document(
+                title=f"Документ {i}",
+                content=f"Текст документа номер {i}. " * (i + 1),
+                owner_id=(admin, manager, employee)[i % 3].id,
+                folder_id=(None, root.id, child.id)[i % 3],
+                status=("draft", "approved")[i % 2],
+            ))
+        db.add_all(documents)
+        db.commit()
+
+        db.add_all([
+            Permission(user_id=employee.id, entity_type="folder", entity_id=root.id, granted_by=admin.id,
+                       can_view=True),
+            Permission(user_id=manager.id, entity_type="document", entity_id=documents[0].id,
+                       granted_by=admin.id, can_view=True, can_edit=True),
+        ])
+        for i, document in enumerate(documents):
+            db.add(DocumentComment(document_id=document.id, user_id=employee.id, comment=f"Комментарий {i}"))
+        db.commit()
+        # Счетчик комментариев ведут эндпоинты - заполняем его вручную
+        for document in documents:
+            document.comment_count = 1
+        db.commit()
+
+        return {
+            "admin": admin.id,
+            "manager": manager.id,
+            "employee": employee.id,
+            "root_folder": root.id,
+            "child_folder": child.id,
+            "documents": [document.id for document in documents],
+        }
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Кэши процесса не переживают тест"""
+    yield
+    http_cache.response_cache.clear()
+    permissions.permission_cache.clear()
+    search.search_index.clear()
+
+
+@pytest.fixture
+def client(data):
+    # Без with: события startup (фоновые задачи ленты изменений) тестам не нужны
+    return TestClient(app)
+
+
+@pytest.fixture
+def replica(data, monkeypatch):
+    """Реплика для чтения: копия основной БД в отдельном файле SQLite
+
+    Копия снимается при создании фикстуры и дальше не обновляется - как
+    реплика, отстающая от основной БД на все последующие изменения.
+    """
+    path = os.path.join(TEST_DIR, "replica.db")
+    source = sqlite3.connect(PRIMARY_DB)
+    target = sqlite3.connect(path)
+    source.backup(target)
+    target.close()
+    source.close()
+    router = replicas.ReplicaRouter([f"sqlite:///{path}"])
+    monkeypatch.setattr(replicas, "router", router)
+    yield router
+    asyncio.run(router.close())
+    os.remove(path)
@@ -0,0 +1,70 @@
+"""
+Кэш ответов (app/core/cache.py, app/core/http_cache.py): устаревшее значение не
+попадает в кэш после инвалидации
+"""
+from app import main
+from app.core import http_cache
+from app.core.cache import MISSING, TTLCache
+
+
+def test_set_skipped_after_delete():
+    cache = TTLCache(max_entries=10, ttl=60)
+    generation = cache.generation()
+    cache.delete("a")
+    cache.set("a", "старое", generation=generation)
+    cache.set("b", "другой ключ", generation=generation)
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == "другой ключ"
+    cache.set("a", "новое", generation=cache.generation())
+    assert cache.get("a") == "новое"
+
+
+def test_set_skipped_after_delete_where_and_clear():
+    cache = TTLCache(max_entries=10, ttl=60)
+    for invalidate in (lambda: cache.delete_where(lambda key: key == "x"), cache.clear):
+        generation = cache.generation()
+        invalidate()
+        cache.set("a", 1, generation=generation)
+        assert cache.get("a") is MISSING
+
+
+def test_invalidation_log_bounded():
+    cache = TTLCache(max_entries=2, ttl=60)
+    generation = cache.generation()
+    for key in range(5):
+        cache.delete(key)
+    assert len(cache._invalidated) <= 2
+    # Вытесненные из журнала ключи считаются удаленными
+    cache.set(0, "старое", generation=generation)
+    assert cache.get(0) is MISSING
+
+
+def test_user_changed_during_read_not_cached(client, data, monkeypatch):
+    user_id = data["employee"]
+    user_payload = main.user_payload
+
+    def changed_after_read(user):
+        # Параллельный запрос изменил пользователя и сбросил кэш после чтения
+        http_cache.invalidate_user(user.id)
+        return user_payload(user)
+
+    monkeypatch.setattr(main, "user_payload", changed_after_read)
+    assert client.get(f"/api/users/{user_id}").status_code == 200
+    assert http_cache.response_cache.get(http_cache.user_key(user_id)) is MISSING
+
+    monkeypatch.setattr(main, "user_payload", user_payload)
+    assert client.get(f"/api/users/{user_id}").status_code == 200
+    assert http_cache.response_cache.get(http_cache.user_key(user_id)) is not MISSING
+
+
+def test_document_changed_during_read_not_cached(client, data, monkeypatch):
+    document_id = data["documents"][3]
+    document_payload = main.document_payload
+
+    def changed_after_read(document):
+        http_cache.invalidate_document(document.id)
+        return document_payload(document)
+
+    monkeypatch.setattr(main, "document_payload", changed_after_read)
+    assert client.get(f"/api/documents/{document_id}").status_code == 200
+    assert http_cache.response_cache.get(http_cache.document_key(document_id)) is MISSING
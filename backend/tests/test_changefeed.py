@@ -0,0 +1,170 @@
+"""
+Лента изменений (app/services/changefeed.py) на резервной раздаче внутри процесса
+
+Поток SSE читается напрямую из changefeed.stream в том же event loop, где
+фиксируются изменения: в режиме SQLite события раздаются подписчикам после
+COMMIT сессии.
+"""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import delete
+
+from app.core.database import AsyncSessionLocal
+from app.models.change_event import ChangeEvent
+from app.services import changefeed
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Отдельный брокер с очередью на два события: переполнение легко вызвать"""
+    broker = changefeed.ChangeBroker(queue_size=2)
+    monkeypatch.setattr(changefeed, "broker", broker)
+    return broker
+
+
+def parse(frame: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.decode("utf-8").strip().split("\n"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+async def read_events(stream, count: int) -> list:
+    events = []
+    while len(events) < count:
+        frame = await asyncio.wait_for(stream.__anext__(), TIMEOUT)
+        if frame.startswith(b"id: "):
+            events.append(parse(frame))
+    return events
+
+
+async def record_updates(document_id: int, count: int, start: int = 0):
+    """count событий одной транзакцией: подписчик получает их разом после COMMIT"""
+    async with AsyncSessionLocal() as db:
+        for n in range(start, start + count):
+            await changefeed.record(db, "document.updated", document_id=document_id, data={"n": n})
+        await db.commit()
+
+
+async def subscribe(key, last_event_id=None):
+    """Поток, уже подписанный и ожидающий событий"""
+    stream = changefeed.stream(key, last_event_id)
+    first = asyncio.ensure_future(stream.__anext__())
+    # Генератор подписывается и читает границы ленты до первого ожидания очереди
+    while changefeed.broker.subscriber_count == 0:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    return stream, first
+
+
+def test_live_events_in_commit_order(broker, data):
+    document_id = data["documents"][6]
+
+    async def scenario():
+        stream, first = await subscribe(("document_id", document_id))
+        try:
+            await record_updates(document_id, 1)
+            event = parse(await asyncio.wait_for(first, TIMEOUT))
+            await record_updates(document_id, 1, start=1)
+            events = [event] + await read_events(stream, 1)
+        finally:
+            await stream.aclose()
+        return events
+
+    events = asyncio.run(scenario())
+    assert [event["data"]["data"]["n"] for event in events] == [0, 1]
+    assert events[0]["id"] < events[1]["id"]
+    assert broker.subscriber_count == 0
+
+
+def test_overflow_resyncs_from_table(broker, data, monkeypatch):
+    document_id = data["documents"][7]
+    resyncs = []
+    resync = changefeed.Subscription.resync
+
+    def counting_resync(subscription):
+        resyncs.append(subscription)
+        resync(subscription)
+
+    monkeypatch.setattr(changefeed.Subscription, "resync", counting_resync)
+
+    async def scenario():
+        stream, first = await subscribe(("document_id", document_id))
+        try:
+            # Пять событий в очередь на два: очередь заменяется маркером RESYNC
+            await record_updates(document_id, 5)
+            events = [parse(await asyncio.wait_for(first, TIMEOUT))]
+            events += await read_events(stream, 4)
+        finally:
+            await stream.aclose()
+        return events
+
+    events = asyncio.run(scenario())
+    assert resyncs
+    # Пропущенное догружено из таблицы: все события, по порядку и без повторов
+    assert [event["data"]["data"]["n"] for event in events] == [0, 1, 2, 3, 4]
+    assert [event["id"] for event in events] == sorted({event["id"] for event in events})
+
+
+def test_resume_from_last_event_id(broker, data):
+    document_id = data["documents"][8]
+
+    async def scenario():
+        await record_updates(document_id, 3)
+        stream, first = await subscribe(("document_id", document_id))
+        try:
+            await record_updates(document_id, 1, start=3)
+            live = [parse(await asyncio.wait_for(first, TIMEOUT))]
+        finally:
+            await stream.aclose()
+
+        history = [event async for event in changefeed._backfill(("document_id", document_id), 0)]
+        resume_after = history[0]["id"]
+        stream, first = await subscribe(("document_id", document_id), last_event_id=resume_after)
+        try:
+            resumed = [parse(await asyncio.wait_for(first, TIMEOUT))]
+            resumed += await read_events(stream, 2)
+        finally:
+            await stream.aclose()
+        return live, resumed
+
+    live, resumed = asyncio.run(scenario())
+    assert [event["data"]["data"]["n"] for event in live] == [3]
+    assert [event["data"]["data"]["n"] for event in resumed] == [1, 2, 3]
+
+
+def test_reset_when_history_pruned(broker, data):
+    document_id = data["documents"][9]
+
+    async def scenario():
+        await record_updates(document_id, 3)
+        async with AsyncSessionLocal() as db:
+            history = [
+                event async for event in changefeed._backfill(("document_id", document_id), 0)
+            ]
+            # События до последнего удалены по сроку хранения
+            await db.execute(delete(ChangeEvent).where(ChangeEvent.position < history[-1]["id"]))
+            await db.commit()
+
+        stream = changefeed.stream(("document_id", document_id), last_event_id=1)
+        try:
+            first = await asyncio.wait_for(stream.__anext__(), TIMEOUT)
+            events = await read_events(stream, 1)
+        finally:
+            await stream.aclose()
+        return first, events, history
+
+    first, events, history = asyncio.run(scenario())
+    assert first.startswith(b"event: reset")
+    assert [event["id"] for event in events] == [history[-1]["id"]]
+
+
+def test_subscription_requires_one_existing_target(client, data):
+    assert client.get("/api/changes").status_code == 400
+    response = client.get(
+        "/api/changes", params={"document_id": data["documents"][0], "user_id": data["admin"]}
+    )
+    assert response.status_code == 400
+    assert client.get("/api/changes", params={"folder_id": 999999}).status_code == 404
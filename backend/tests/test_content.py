@@ -0,0 +1,96 @@
+"""
+Содержимое документа фрагментами (app/services/content_store.py, GET /api/documents/{id}/content)
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app.core.database import AsyncSessionLocal, SessionLocal, get_db
+from app.main import app
+from app.models.document import Document
+from app.services import content_store
+
+
+@pytest.fixture
+def document(data):
+    """Документ на несколько порций перестройки (фрагменты по 64 символа)"""
+    with SessionLocal() as db:
+        document = Document(title="Длинный", content="".join(f"строка {i}\n" for i in range(300)),
+                            owner_id=data["admin"])
+        db.add(document)
+        db.commit()
+        return document.id, document.version, document.content
+
+
+def test_content_and_range(client, document):
+    document_id, _, content = document
+    raw = content.encode("utf-8")
+    response = client.get(f"/api/documents/{document_id}/content")
+    assert response.status_code == 200
+    assert response.content == raw
+    response = client.get(f"/api/documents/{document_id}/content", headers={"Range": "bytes=100-999"})
+    assert response.status_code == 206
+    assert response.content == raw[100:1000]
+
+
+def test_rebuild_reads_only_its_version(document):
+    document_id, version, _ = document
+
+    async def read(version):
+        async with AsyncSessionLocal() as db:
+            return [piece async for pieces in content_store.iter_text(db, document_id, version)
+                    for piece in pieces]
+
+    with pytest.raises(content_store.ContentChanged):
+        asyncio.run(read(version + 1))
+
+
+def test_document_changed_during_rebuild(document):
+    document_id, version, _ = document
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            text = content_store.iter_text(db, document_id, version, batch=2)
+            await text.__anext__()
+            # Другой запрос меняет документ между порциями перестройки
+            async with AsyncSessionLocal() as writer:
+                await writer.execute(
+                    update(Document).where(Document.id == document_id)
+                    .values(content="другой текст", version=version + 1)
+                )
+                await writer.commit()
+            with pytest.raises(content_store.ContentChanged):
+                await text.__anext__()
+
+    asyncio.run(scenario())
+
+
+def test_changed_during_rebuild_returns_409(client, document, monkeypatch):
+    document_id, version, _ = document
+
+    async def changed(db, document_id, version, batch=content_store.REBUILD_BATCH):
+        raise content_store.ContentChanged("изменен")
+        yield
+
+    monkeypatch.setattr(content_store, "iter_text", changed)
+    assert client.get(f"/api/documents/{document_id}/content").status_code == 409
+
+
+def test_rebuild_leaves_request_session_read_only(client, document):
+    document_id, _, content = document
+
+    async def read_only_db():
+        async with AsyncSessionLocal() as db:
+            async def commit():
+                raise AssertionError("Сессия запроса на чтение зафиксировала изменения")
+            db.commit = commit
+            yield db
+
+    app.dependency_overrides[get_db] = read_only_db
+    try:
+        response = client.get(f"/api/documents/{document_id}/content")
+    finally:
+        del app.dependency_overrides[get_db]
+    assert response.status_code == 200
+    assert response.content == content.encode("utf-8")
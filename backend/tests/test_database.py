@@ -0,0 +1,62 @@
+"""
+Асинхронный слой БД (app/core/database.py): запросы не блокируют event loop
+
+aiosqlite выполняет запросы в отдельном потоке, поэтому пока идет медленный
+запрос, event loop продолжает обслуживать другие корутины и запросы.
+"""
+import asyncio
+
+import httpx
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.main import app
+
+# Рекурсивный запрос на несколько сотен миллисекунд
+SLOW_QUERY = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+    "SELECT count(*) FROM n"
+)
+SLOW_COUNT = 1_000_000
+
+
+async def slow_query() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(SLOW_QUERY, {"count": SLOW_COUNT})).scalar_one()
+
+
+def test_async_engine_uses_aiosqlite():
+    assert async_engine.url.drivername == "sqlite+aiosqlite"
+
+
+def test_slow_query_does_not_block_event_loop():
+    async def scenario():
+        ticks = 0
+        query = asyncio.ensure_future(slow_query())
+        while not query.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return await query, ticks
+
+    count, ticks = asyncio.run(scenario())
+    assert count == SLOW_COUNT
+    # Блокирующий запрос не дал бы циклу выполнить ни одной итерации до конца запроса
+    assert ticks > 5
+
+
+def test_requests_served_during_slow_query(data):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            query = asyncio.ensure_future(slow_query())
+            await asyncio.sleep(0)
+            served = 0
+            while not query.done():
+                response = await client.get(f"/api/users/{data['admin']}")
+                assert response.status_code == 200
+                served += 1
+            await query
+            return served
+
+    # Пока медленный запрос выполняется, приложение отвечает на другие запросы
+    assert asyncio.run(scenario()) > 1
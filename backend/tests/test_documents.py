@@ -0,0 +1,30 @@
+"""
+Список документов: курсорная пагинация (GET /api/documents)
+"""
+import pytest
+
+from app.core.pagination import MAX_PAGE_SIZE
+
+
+def test_cursor_pages_cover_all_documents(client, data):
+    seen = []
+    params = {"pagination": "cursor", "limit": 7}
+    while True:
+        body = client.get("/api/documents", params=params).json()
+        seen.extend(document["id"] for document in body["documents"])
+        if body["next_cursor"] is None:
+            break
+        params = {"cursor": body["next_cursor"], "limit": 7}
+    assert seen == sorted(seen)
+    assert set(data["documents"]) <= set(seen)
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_cursor_limit_out_of_range(client, limit):
+    response = client.get("/api/documents", params={"pagination": "cursor", "limit": limit})
+    assert response.status_code == 400
+
+
+def test_offset_negative_values(client):
+    assert client.get("/api/documents", params={"limit": -1}).status_code == 400
+    assert client.get("/api/documents", params={"skip": -5}).status_code == 400
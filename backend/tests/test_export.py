@@ -0,0 +1,75 @@
+"""
+Потоковая выгрузка (app/services/export.py, GET /api/export/{entity})
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.document import Document
+from app.services import content_store, export
+
+
+@pytest.fixture
+def documents(data, monkeypatch):
+    """Короткий документ и документ, текст которого выгружается частями"""
+    monkeypatch.setattr(export, "INLINE_TEXT_CHARS", 100)
+    long_text = "".join(f'строка "{i}", с \\ и ;\n' for i in range(50))
+    created = datetime.utcnow()
+    with SessionLocal() as db:
+        short = Document(title="Короткий, с запятой", content="коротко", owner_id=data["admin"])
+        long = Document(title='Длинный "текст"', content=long_text, owner_id=data["admin"])
+        db.add_all([short, long])
+        db.commit()
+        return created, {short.id: short.content, long.id: long.content}
+
+
+def exported(client, documents, export_format, **params):
+    params = {"format": export_format, "updated_since": documents[0].isoformat(), **params}
+    response = client.get("/api/export/documents", params=params)
+    assert response.status_code == 200
+    body = gzip.decompress(response.content) if params.get("gzip") else response.content
+    return body.decode("utf-8")
+
+
+@pytest.fixture
+def streamed(monkeypatch):
+    """id документов, текст которых выгружен частями"""
+    ids = []
+    iter_text = content_store.iter_text
+
+    def recording(db, document_id, version, batch=content_store.REBUILD_BATCH):
+        ids.append(document_id)
+        return iter_text(db, document_id, version, batch)
+
+    monkeypatch.setattr(content_store, "iter_text", recording)
+    return ids
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_ndjson_streams_long_content(client, documents, streamed, compressed):
+    text = exported(client, documents, "ndjson", gzip=compressed)
+    rows = [json.loads(line) for line in text.splitlines()]
+    assert {row["id"]: row["content"] for row in rows} == documents[1]
+    assert all(list(row) == [column.name for column in export.EXPORTS["documents"].columns] for row in rows)
+    assert streamed == [max(documents[1])]
+
+
+def test_csv_streams_long_content(client, documents, streamed):
+    rows = list(csv.DictReader(io.StringIO(exported(client, documents, "csv"))))
+    assert {int(row["id"]): row["content"] for row in rows} == documents[1]
+    assert all(row["status"] == "draft" and row["title"] for row in rows)
+    assert streamed == [max(documents[1])]
+
+
+@pytest.mark.parametrize("entity", ["comments", "permissions"])
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_other_entities(client, data, entity, export_format):
+    response = client.get(f"/api/export/{entity}", params={"format": export_format})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) >= (len(data["documents"]) if entity == "comments" else 2)
@@ -0,0 +1,134 @@
+"""
+Бюджет SQL-запросов маршрутов (app/core/instrumentation.py)
+
+Каждый маршрут с бюджетом вызывается на данных, где строк больше бюджета
+по умолчанию: запрос на каждую строку (N+1) превысит бюджет, и строгий
+режим уронит тест исключением QueryBudgetExceeded.
+"""
+import pytest
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.instrumentation import BUDGET_ATTRIBUTE, UNLIMITED, QueryBudgetExceeded
+from app.main import app
+
+
+def budgeted_routes() -> set:
+    """(метод, путь) всех маршрутов, для которых проверяется бюджет"""
+    routes = set()
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        if getattr(route.endpoint, BUDGET_ATTRIBUTE, None) is UNLIMITED:
+            continue
+        for method in route.methods:
+            routes.add((method, route.path))
+    return routes
+
+
+def route_calls(data: dict) -> dict:
+    """(метод, путь) -> список запросов (метод, url, параметры httpx, ожидаемый статус)"""
+    documents = data["documents"]
+    document = documents[1]
+    root = data["root_folder"]
+    employee = data["employee"]
+    return {
+        ("GET", "/"): [("GET", "/", {}, 200)],
+        ("GET", "/health"): [("GET", "/health", {}, 200)],
+        ("GET", "/health/db"): [("GET", "/health/db", {}, 200)],
+        ("GET", "/metrics"): [("GET", "/metrics", {}, 200)],
+        ("GET", "/api/users"): [("GET", "/api/users", {}, 200)],
+        ("GET", "/api/users/{user_id}"): [
+            ("GET", f"/api/users/{employee}", {}, 200),
+            # Второй раз - из кэша ответов
+            ("GET", f"/api/users/{employee}", {}, 200),
+            ("GET", "/api/users/999999", {}, 404),
+        ],
+        ("POST", "/api/users:batchGet"): [
+            ("POST", "/api/users:batchGet", {"json": {"ids": [data["admin"], employee, 999999]}}, 200),
+        ],
+        ("PUT", "/api/users/{user_id}"): [
+            ("PUT", f"/api/users/{data['manager']}", {"params": {"full_name": "Менеджер"}}, 200),
+        ],
+        ("GET", "/api/folders"): [("GET", "/api/folders", {}, 200)],
+        ("POST", "/api/folders"): [
+            ("POST", "/api/folders", {"params": {"name": "Новая", "owner_id": employee, "parent_id": root}}, 200),
+        ],
+        ("PUT", "/api/folders/{folder_id}"): [
+            ("PUT", f"/api/folders/{data['child_folder']}", {"params": {"name": "Отчеты"}}, 200),
+        ],
+        ("GET", "/api/folders/{folder_id}/tree"): [("GET", f"/api/folders/{root}/tree", {}, 200)],
+        ("GET", "/api/folders/{folder_id}/documents"): [
+            ("GET", f"/api/folders/{root}/documents", {"params": {"recursive": True}}, 200),
+        ],
+        ("GET", "/api/documents"): [
+            ("GET", "/api/documents", {}, 200),
+            ("GET", "/api/documents", {"params": {"pagination": "cursor", "limit": 10}}, 200),
+            ("GET", "/api/documents", {"params": {"pagination": "cursor", "sort": "updated_at"}}, 200),
+        ],
+        ("GET", "/api/documents/search"): [
+            ("GET", "/api/documents/search", {"params": {"q": "текст документа"}}, 200),
+        ],
+        ("GET", "/api/documents/{document_id}"): [
+            ("GET", f"/api/documents/{document}", {}, 200),
+            ("GET", f"/api/documents/{document}", {"headers": {"If-None-Match": '"stale"'}}, 200),
+        ],
+        ("POST", "/api/documents:batchGet"): [
+            ("POST", "/api/documents:batchGet", {"json": {"ids": documents + [999999]}}, 200),
+        ],
+        ("PUT", "/api/documents/{document_id}"): [
+            ("PUT", f"/api/documents/{document}", {"params": {"status": "under_review"}}, 200),
+            ("PUT", f"/api/documents/{document}", {"params": {"content": "Новый текст документа"}}, 200),
+        ],
+        ("GET", "/api/documents/{document_id}/versions"): [
+            ("GET", f"/api/documents/{document}/versions", {}, 200),
+        ],
+        ("GET", "/api/documents/{document_id}/versions/{version}"): [
+            ("GET", f"/api/documents/{documents[2]}/versions/1", {}, 200),
+        ],
+        ("GET", "/api/documents/{document_id}/content"): [
+            ("GET", f"/api/documents/{documents[-1]}/content", {}, 200),
+            ("GET", f"/api/documents/{documents[-1]}/content", {"headers": {"Range": "bytes=10-200"}}, 206),
+        ],
+        ("GET", "/api/documents/{document_id}/comments"): [
+            ("GET", f"/api/documents/{document}/comments", {}, 200),
+        ],
+        ("POST", "/api/documents/{document_id}/comments"): [
+            ("POST", f"/api/documents/{document}/comments", {"params": {"comment": "Новый", "user_id": employee}}, 200),
+        ],
+        ("GET", "/api/permissions"): [("GET", "/api/permissions", {}, 200)],
+        ("GET", "/api/documents/{document_id}/effective-permissions"): [
+            ("GET", f"/api/documents/{documents[4]}/effective-permissions", {"params": {"user_id": employee}}, 200),
+        ],
+        ("GET", "/api/statistics"): [("GET", "/api/statistics", {}, 200)],
+    }
+
+
+def test_every_budgeted_route_is_called(data):
+    assert budgeted_routes() == set(route_calls(data))
+
+
+@pytest.mark.parametrize("route", sorted(budgeted_routes()), ids=" ".join)
+def test_route_within_budget(client, data, route):
+    for method, url, kwargs, status_code in route_calls(data)[route]:
+        response = client.request(method, url, **kwargs)
+        assert response.status_code == status_code, response.text
+
+
+def test_statistics_counters_within_budget(client, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", True)
+    # Первый запрос пересчитывает счетчики, второй читает их
+    for _ in range(2):
+        response = client.get("/api/statistics")
+        assert response.status_code == 200
+
+
+def test_budget_exceeded_fails_in_strict_mode(client, data, monkeypatch):
+    route = next(
+        route for route in app.routes
+        if isinstance(route, APIRoute) and route.path == "/api/folders/{folder_id}/tree"
+    )
+    # Маршрут выполняет два запроса
+    monkeypatch.setattr(route.endpoint, BUDGET_ATTRIBUTE, 1, raising=False)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(f"/api/folders/{data['root_folder']}/tree")
@@ -0,0 +1,98 @@
+"""
+Чтение с реплик (app/core/replicas.py): маршрутизация, чтение своих записей, здоровье
+
+Основная БД и реплика - два файла SQLite (фикстура replica): реплика - снимок
+основной БД, поэтому изменения после снимка видны только на основной.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import replicas
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def rw_app(replica):
+    """Приложение с cookie чтения своих записей (включается, только если заданы реплики)"""
+    return replicas.ReadYourWritesMiddleware(app, window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+
+def folder_names(client: TestClient) -> set:
+    response = client.get("/api/folders")
+    assert response.status_code == 200
+    return {folder["name"] for folder in response.json()["folders"]}
+
+
+def create_folder(client: TestClient, data: dict, name: str):
+    response = client.post("/api/folders", params={"name": name, "owner_id": data["admin"]})
+    assert response.status_code == 200
+    return response
+
+
+def test_reads_go_to_replica(rw_app, data):
+    create_folder(TestClient(rw_app), data, "Только на основной")
+    # Новый клиент не писал - читает реплику, где папки еще нет
+    assert "Только на основной" not in folder_names(TestClient(rw_app))
+
+
+def test_writer_reads_primary(rw_app, data):
+    writer = TestClient(rw_app)
+    response = create_folder(writer, data, "Своя запись")
+    assert replicas.PRIMARY_COOKIE in response.cookies
+    assert "Своя запись" in folder_names(writer)
+
+
+def test_expired_cookie_reads_replica(rw_app, data):
+    writer = TestClient(rw_app)
+    create_folder(writer, data, "Окно истекло")
+    writer.cookies.set(replicas.PRIMARY_COOKIE, f"{time.time() - 1:.3f}")
+    assert "Окно истекло" not in folder_names(writer)
+
+
+def test_read_only_post_sets_no_cookie(rw_app, data):
+    response = TestClient(rw_app).post("/api/users:batchGet", json={"ids": [data["admin"]]})
+    assert response.status_code == 200
+    assert replicas.PRIMARY_COOKIE not in response.cookies
+
+
+def test_failed_write_sets_no_cookie(rw_app):
+    response = TestClient(rw_app).post("/api/folders", params={"name": "x", "owner_id": 999999})
+    assert response.status_code == 404
+    assert replicas.PRIMARY_COOKIE not in response.cookies
+
+
+def test_unhealthy_replica_falls_back_to_primary(rw_app, replica, data):
+    create_folder(TestClient(rw_app), data, "Реплика недоступна")
+    replica.replicas[0].mark_down("тест")
+    assert "Реплика недоступна" in folder_names(TestClient(rw_app))
+
+
+def test_health_check(replica, tmp_path):
+    broken = replicas.Replica(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    try:
+        asyncio.run(broken.check())
+        assert not broken.healthy
+
+        healthy = replica.replicas[0]
+        healthy.mark_down("тест")
+        asyncio.run(healthy.check())
+        assert healthy.healthy
+    finally:
+        asyncio.run(broken.engine.dispose())
+
+
+def test_round_robin(replica):
+    url = str(replica.replicas[0].engine.url)
+    router = replicas.ReplicaRouter([url, url])
+    try:
+        first, second = router.replicas
+        assert router.candidates() == [first, second]
+        assert router.candidates() == [second, first]
+        second.mark_down("тест")
+        assert router.candidates() == [first]
+    finally:
+        asyncio.run(router.close())
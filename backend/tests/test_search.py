@@ -0,0 +1,78 @@
+"""
+Поиск документов на SQLite: резервный инвертированный индекс (app/services/search.py)
+
+Документы теста используют слова, которых нет в остальных данных, поэтому
+порядок результатов определяется только ими.
+"""
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.document import Document
+
+
+@pytest.fixture(scope="module")
+def corpus(data):
+    """Заголовок весит больше текста; при равном весе выше более плотное совпадение"""
+    specs = {
+        "title": ("Квазар и пульсар", "Обзор наблюдений", "approved", data["root_folder"]),
+        "dense": ("Заметки", "квазар квазар квазар пульсар", "approved", None),
+        "sparse": (
+            "Отчет",
+            "квазар пульсар " + " ".join(f"слово{i}" for i in range(40)),
+            "draft",
+            data["root_folder"],
+        ),
+        "single": ("Другое", "только квазар без второго слова", "approved", None),
+    }
+    with SessionLocal() as db:
+        documents = {
+            name: Document(title=title, content=content, status=status, folder_id=folder_id,
+                           owner_id=data["admin"])
+            for name, (title, content, status, folder_id) in specs.items()
+        }
+        db.add_all(documents.values())
+        db.commit()
+        return {name: document.id for name, document in documents.items()}
+
+
+def search(client, **params) -> list:
+    response = client.get("/api/documents/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_ranking(client, corpus):
+    results = search(client, q="квазар пульсар")
+    assert [result["id"] for result in results] == [corpus["title"], corpus["dense"], corpus["sparse"]]
+    ranks = [result["rank"] for result in results]
+    assert ranks == sorted(ranks, reverse=True) and len(set(ranks)) == 3
+
+
+def test_all_terms_required(client, corpus):
+    ids = {result["id"] for result in search(client, q="квазар пульсар")}
+    assert corpus["single"] not in ids
+    assert corpus["single"] in {result["id"] for result in search(client, q="квазар")}
+
+
+def test_filters(client, corpus, data):
+    assert [r["id"] for r in search(client, q="квазар пульсар", status="draft")] == [corpus["sparse"]]
+    in_folder = search(client, q="квазар пульсар", folder_id=data["root_folder"])
+    assert [r["id"] for r in in_folder] == [corpus["title"], corpus["sparse"]]
+
+
+def test_pagination(client, corpus):
+    page = search(client, q="квазар пульсар", skip=1, limit=1)
+    assert [result["id"] for result in page] == [corpus["dense"]]
+
+
+def test_snippet_highlight(client, corpus):
+    snippets = {result["id"]: result["snippet"] for result in search(client, q="пульсар")}
+    assert snippets[corpus["dense"]] == "квазар квазар квазар <b>пульсар</b>"
+
+
+def test_index_follows_updates(client, corpus):
+    assert search(client, q="квазар пульсар")
+    document_id = corpus["single"]
+    response = client.put(f"/api/documents/{document_id}", params={"content": "пульсар квазар пульсар"})
+    assert response.status_code == 200
+    assert document_id in {result["id"] for result in search(client, q="квазар пульсар")}
@@ -0,0 +1,82 @@
+"""
+Статистика системы (GET /api/statistics, app/services/statistics.py)
+"""
+import asyncio
+import itertools
+import time
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.models.stat_counter import StatCounter
+from app.services import statistics
+
+
+async def rebuild():
+    async with AsyncSessionLocal() as db:
+        await statistics.rebuild_counters(db)
+
+
+def refreshed_at() -> int:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(StatCounter.value).where(
+                StatCounter.scope == statistics.META_SCOPE, StatCounter.key == statistics.REFRESHED_AT_KEY
+            )
+        ) or 0
+
+
+def test_counters_follow_api_writes(client, data, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", True)
+    asyncio.run(rebuild())
+    document = data["documents"][5]
+
+    client.post("/api/folders", params={"name": "Счетчики", "owner_id": data["admin"]})
+    client.post(f"/api/documents/{document}/comments", params={"comment": "Счетчики", "user_id": data["admin"]})
+    client.put(f"/api/documents/{document}", params={"status": "rejected"})
+    client.put(f"/api/users/{data['employee']}", params={"role": "accountant"})
+    counters = client.get("/api/statistics").json()
+
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", False)
+    aggregate = client.get("/api/statistics").json()
+    assert (counters["source"], aggregate["source"]) == ("counters", "aggregate")
+    assert counters["statistics"] == aggregate["statistics"]
+
+
+def test_stale_counters_on_replica_rebuilt_on_primary(client, replica, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", True)
+    monkeypatch.setattr(settings, "STATS_COUNTERS_MAX_AGE", 0)
+    started = int(time.time())
+    time.sleep(1)
+
+    response = client.get("/api/statistics")
+
+    assert response.status_code == 200
+    # Реплика не пересчитывает счетчики сама, но и не переходит на агрегаты навсегда
+    assert response.json()["source"] == "counters"
+    assert refreshed_at() > started
+
+
+def test_sessions_bump_separate_shards(client, data, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", True)
+    monkeypatch.setattr(settings, "STATS_COUNTER_SHARDS", 4)
+    asyncio.run(rebuild())
+    # Сессии запросов по очереди выбирают шарды 0, 1, 2, 3
+    shards = itertools.cycle(range(4))
+    monkeypatch.setattr(statistics.random, "randrange", lambda stop: next(shards))
+
+    for n in range(4):
+        client.post("/api/folders", params={"name": f"Шард {n}", "owner_id": data["admin"]})
+
+    with SessionLocal() as db:
+        rows = dict(db.execute(
+            select(StatCounter.shard, StatCounter.value)
+            .where(StatCounter.scope == "folders", StatCounter.key == "total")
+        ).all())
+    assert set(rows) == {0, 1, 2, 3}
+    # Вклад каждой сессии - в своем шарде
+    assert rows[1] == rows[2] == rows[3] == 1
+    counters = client.get("/api/statistics").json()
+    monkeypatch.setattr(settings, "STATS_USE_COUNTERS", False)
+    assert counters["statistics"]["folders"] == client.get("/api/statistics").json()["statistics"]["folders"]
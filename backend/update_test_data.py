@@ -1,142 +1,168 @@
 """
 Скрипт для добавления тестовых данных для Permission и Comment
+
+Данные вставляются пачками через app/services/bulk_loader.py. С параметром
+--synthetic-comments N дополнительно генерируется N синтетических комментариев
+к случайным документам.
 """
-from app.core.database import SessionLocal, engine, Base
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.migrations import upgrade_database
 from app.models.user import User
 from app.models.folder import Folder
 from app.models.document import Document
 from app.models.permission import Permission
 from app.models.comment import DocumentComment
-from datetime import datetime, timedelta
+from app.services import bulk_loader, statistics
+from app.services.comments import recount_comments
+
+COMMENT_TEMPLATES = [
+    "Нужно добавить раздел по бюджету",
+    "Согласен, добавьте пожалуйста",
+    "Проверьте сроки исполнения",
+    "Замечаний нет",
+    "Прошу уточнить формулировку пункта 3",
+]
+
 
-def add_permissions_and_comments():
+async def add_permissions_and_comments(db, users: dict):
     """Добавление прав доступа и комментариев"""
-    db = SessionLocal()
-    
-    try:
-        print("🔄 Создаем таблицы для Permission и Comment...")
-        Base.metadata.create_all(bind=engine)
-        
-        # Получаем существующих пользователей
-        admin = db.query(User).filter(User.email == "admin@vaultdoc.ru").first()
-        manager = db.query(User).filter(User.email == "manager@vaultdoc.ru").first()
-        employee = db.query(User).filter(User.email == "employee@vaultdoc.ru").first()
-        
-        print("🔐 Добавляем права доступа...")
-        
-        # Права на папки
-        folder_permissions = [
-            # Даем менеджеру доступ к папке "Проекты"
-            Permission(
-                user_id=manager.id,
-                entity_type="folder",
-                entity_id=3,  # Папка "Проекты"
-                can_view=True,
-                can_edit=True,
-                can_delete=False,
-                can_manage_access=False,
-                granted_by=admin.id
-            ),
-            # Даем сотруднику доступ к общей папке
-            Permission(
-                user_id=employee.id,
-                entity_type="folder",
-                entity_id=1,  # Папка "Общие документы"
-                can_view=True,
-                can_edit=False,
-                can_delete=False,
-                can_manage_access=False,
-                granted_by=admin.id
-            )
-        ]
-        
-        for perm in folder_permissions:
-            db.add(perm)
-        
-        # Права на документы
-        document_permissions = [
-            # Менеджер может редактировать документ в проектах
-            Permission(
-                user_id=manager.id,
-                entity_type="document",
-                entity_id=4,  # Документ "Техническое задание проекта 'Альфа'"
-                can_view=True,
-                can_edit=True,
-                can_delete=False,
-                granted_by=admin.id
-            ),
-            # Сотрудник может просматривать правила
-            Permission(
-                user_id=employee.id,
-                entity_type="document",
-                entity_id=1,  # Документ "Правила внутреннего распорядка"
-                can_view=True,
-                can_edit=False,
-                can_delete=False,
-                granted_by=admin.id
+    admin = users["admin@vaultdoc.ru"]
+    manager = users["manager@vaultdoc.ru"]
+    employee = users["employee@vaultdoc.ru"]
+
+    print("🔐 Добавляем права доступа...")
+
+    # Права на папки
+    folder_permissions = [
+        # Даем менеджеру доступ к папке "Проекты"
+        dict(user_id=manager, entity_type="folder", entity_id=3,  # Папка "Проекты"
+             can_view=True, can_edit=True, can_delete=False, can_manage_access=False, granted_by=admin),
+        # Даем сотруднику доступ к общей папке
+        dict(user_id=employee, entity_type="folder", entity_id=1,  # Папка "Общие документы"
+             can_view=True, can_edit=False, can_delete=False, can_manage_access=False, granted_by=admin)
+    ]
+
+    # Права на документы
+    document_permissions = [
+        # Менеджер может редактировать документ в проектах
+        dict(user_id=manager, entity_type="document", entity_id=4,  # Документ "План работ на февраль"
+             can_view=True, can_edit=True, can_delete=False, can_manage_access=False, granted_by=admin),
+        # Сотрудник может просматривать правила
+        dict(user_id=employee, entity_type="document", entity_id=1,  # Документ "Добро пожаловать в VaultDoc!"
+             can_view=True, can_edit=False, can_delete=False, can_manage_access=False, granted_by=admin)
+    ]
+
+    now = datetime.utcnow()
+    permissions = [dict(row, granted_at=now) for row in folder_permissions + document_permissions]
+    await bulk_loader.insert_many(db, Permission.__table__, permissions)
+    await statistics.bump(db, "permissions", "total", len(permissions))
+
+    print("💬 Добавляем комментарии...")
+
+    # Комментарии к документам
+    comments = [
+        dict(document_id=4, user_id=manager,  # План работ на февраль
+             comment="Нужно добавить раздел по бюджету", created_at=now - timedelta(days=4)),
+        dict(document_id=4, user_id=admin,
+             comment="Согласен, добавьте пожалуйста", created_at=now - timedelta(days=3)),
+        dict(document_id=3, user_id=admin,  # Отчет за январь 2024
+             comment="Отличный план! Когда будет готов окончательный вариант?", created_at=now - timedelta(days=2)),
+        dict(document_id=3, user_id=employee,
+             comment="Будет готов к концу недели", created_at=now - timedelta(days=1))
+    ]
+    await bulk_loader.insert_many(db, DocumentComment.__table__, comments)
+    await statistics.bump(db, "comments", "total", len(comments))
+    await recount_comments(db, {row["document_id"] for row in comments})
+    await db.commit()
+
+    print("✅ Добавлено:")
+    print(f"   🔐 Прав доступа: {len(permissions)}")
+    print(f"   💬 Комментариев: {len(comments)}")
+
+
+async def add_synthetic_comments(db, count: int, seed: int = 42):
+    """Синтетические комментарии пачками по BULK_CHUNK_SIZE"""
+    print(f"💬 Генерируем {count} синтетических комментариев...")
+    rng = random.Random(seed)
+    user_ids = (await db.execute(select(User.id))).scalars().all()
+    document_ids = (await db.execute(select(Document.id))).scalars().all()
+    if not user_ids or not document_ids:
+        print("ℹ️ Нет пользователей или документов для комментариев")
+        return
+
+    method = bulk_loader.choose_method(db)
+    chunk_size = settings.BULK_CHUNK_SIZE
+    now = datetime.utcnow()
+    inserted = 0
+    while inserted < count:
+        size = min(chunk_size, count - inserted)
+        rows = [
+            dict(
+                document_id=rng.choice(document_ids),
+                user_id=rng.choice(user_ids),
+                comment=rng.choice(COMMENT_TEMPLATES),
+                created_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
             )
+            for _ in range(size)
         ]
-        
-        for perm in document_permissions:
-            db.add(perm)
-        
-        print("💬 Добавляем комментарии...")
-        
-        # Комментарии к документам
-        comments = [
-            DocumentComment(
-                document_id=4,  # Техническое задание
-                user_id=manager.id,
-                comment="Нужно добавить раздел по бюджету",
-                created_at=datetime.now() - timedelta(days=4)
-            ),
-            DocumentComment(
-                document_id=4,
-                user_id=admin.id,
-                comment="Согласен, добавьте пожалуйста",
-                created_at=datetime.now() - timedelta(days=3)
-            ),
-            DocumentComment(
-                document_id=3,  # Финансовый план
-                user_id=admin.id,
-                comment="Отличный план! Когда будет готов окончательный вариант?",
-                created_at=datetime.now() - timedelta(days=2)
-            ),
-            DocumentComment(
-                document_id=3,
-                user_id=employee.id,
-                comment="Будет готов к концу недели",
-                created_at=datetime.now() - timedelta(days=1)
+        await bulk_loader.insert_many(db, DocumentComment.__table__, rows, method=method)
+        await statistics.bump(db, "comments", "total", size)
+        await recount_comments(db, {row["document_id"] for row in rows})
+        await db.commit()
+        inserted += size
+    print(f"✅ Загружено синтетических комментариев: {inserted}")
+
+
+async def main(synthetic_comments: int):
+    print("🔄 Обновляем схему БД...")
+    upgrade_database()
+
+    async with AsyncSessionLocal() as db:
+        try:
+            # Получаем существующих пользователей одним запросом
+            result = await db.execute(
+                select(User.email, User.id).where(User.email.in_([
+                    "admin@vaultdoc.ru", "manager@vaultdoc.ru", "employee@vaultdoc.ru"
+                ]))
             )
-        ]
-        
-        for comment in comments:
-            db.add(comment)
-        
-        db.commit()
-        
-        print("✅ Добавлено:")
-        print(f"   🔐 Прав доступа: {len(folder_permissions) + len(document_permissions)}")
-        print(f"   💬 Комментариев: {len(comments)}")
-        
-        # Статистика
-        perm_count = db.query(Permission).count()
-        comment_count = db.query(DocumentComment).count()
-        
-        print(f"\n📊 Всего в системе:")
-        print(f"   👥 Пользователей: {db.query(User).count()}")
-        print(f"   📁 Папок: {db.query(Folder).count()}")
-        print(f"   📄 Документов: {db.query(Document).count()}")
-        print(f"   🔐 Прав доступа: {perm_count}")
-        print(f"   💬 Комментариев: {comment_count}")
-        
-    except Exception as e:
-        db.rollback()
-        print(f"❌ Ошибка: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        db.close()
+            users = dict(result.all())
+            if len(users) < 3:
+                print("❌ Сначала запустите add_test_data.py")
+                return
+
+            await add_permissions_and_comments(db, users)
+            if synthetic_comments:
+                await add_synthetic_comments(db, synthetic_comments)
+
+            # Статистика
+            print("\n📊 Всего в системе:")
+            print(f"   👥 Пользователей: {await db.scalar(select(func.count()).select_from(User))}")
+            print(f"   📁 Папок: {await db.scalar(select(func.count()).select_from(Folder))}")
+            print(f"   📄 Документов: {await db.scalar(select(func.count()).select_from(Document))}")
+            print(f"   🔐 Прав доступа: {await db.scalar(select(func.count()).select_from(Permission))}")
+            print(f"   💬 Комментариев: {await db.scalar(select(func.count()).select_from(DocumentComment))}")
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Ошибка: {e}")
+            import traceback
+            traceback.print_exc()
+
 
 if __name__ == "__main__":
-    add_permissions_and_comments()
+    parser = argparse.ArgumentParser(description="Права доступа и комментарии для тестовых данных VaultDoc")
+    parser.add_argument(
+        "--synthetic-comments",
+        type=int,
+        default=0,
+        help="Сколько синтетических комментариев сгенерировать дополнительно"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.synthetic_comments))